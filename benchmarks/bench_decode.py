@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+This module benchmarks the decoding of YNAB responses into model objects.
+It compares the former namedtuple-per-object factory with the cached model classes.
+Run it from the repository root with:
+    python -m benchmarks.bench_decode [transactions]
+"""
+
+from collections import namedtuple
+import json
+import sys
+import timeit
+import uuid
+from pynab.models import build_model
+from pynab.ynap_api import YNABSession, JSON_BACKENDS, _select_json_backend
+
+
+def build_transactions_json(count):
+    """
+    builds a json string looking like a YNAB transactions response
+    :param count: number of transactions to generate
+    :return: json string
+    """
+    transactions = []
+    for index in range(count):
+        transactions.append({
+            "id": str(uuid.uuid4()),
+            "date": "2018-03-31",
+            "amount": -index * 1000,
+            "memo": None,
+            "cleared": "cleared",
+            "approved": True,
+            "flag_color": None,
+            "account_id": str(uuid.uuid4()),
+            "payee_id": str(uuid.uuid4()),
+            "category_id": str(uuid.uuid4()),
+            "transfer_account_id": None,
+            "import_id": None,
+            "account_name": "Bank",
+            "payee_name": "Payee %d" % (index % 50),
+            "category_name": "Groceries",
+            "subtransactions": []
+        })
+    return json.dumps(transactions)
+
+
+def namedtuple_factory(json_string):
+    """
+    the former decoding strategy: a new namedtuple class for every json object
+    :param json_string: json string representation
+    :return: python object
+    """
+    return json.loads(json_string, object_hook=lambda d: namedtuple('X', d.keys())(*d.values()))
+
+
+def triple_pass(body):
+    """
+    the former response handling: parse, dump the sub tree, parse again into objects
+    :param body: response body as bytes
+    :return: python object
+    """
+    text = body.decode('utf-8')
+    return YNABSession._build_json_object(json.dumps(json.loads(text)['data']['transactions']),
+                                          'transactions')
+
+
+def bench_backends(count, repeat):
+    """
+    compares the former triple pass with single pass decoding for every installed json backend
+    :param count: number of transactions per decode
+    :param repeat: number of repetitions; the best one is reported
+    :return: nothing
+    """
+    body = ('{"data": {"transactions": %s}}' % build_transactions_json(count)).encode('utf-8')
+    old = min(timeit.repeat(lambda: triple_pass(body), number=1, repeat=repeat))
+    print("decoding a response with %d transactions" % count)
+    print("  triple pass (json):    %8.3f s" % old)
+    for backend in JSON_BACKENDS:
+        try:
+            loads = _select_json_backend(backend)[1]
+        except Exception:  # pylint: disable=broad-except
+            continue
+        new = min(timeit.repeat(
+            lambda: build_model(loads(body)['data']['transactions'], 'transactions'),
+            number=1, repeat=repeat))
+        print("  single pass (%-7s): %8.3f s (%.1fx)" % (backend, new, old / new))
+
+
+def main(count=10000, repeat=3):
+    """
+    runs the benchmark and prints the results
+    :param count: number of transactions per decode
+    :param repeat: number of repetitions; the best one is reported
+    :return: nothing
+    """
+    json_string = build_transactions_json(count)
+    old = min(timeit.repeat(lambda: namedtuple_factory(json_string), number=1, repeat=repeat))
+    new = min(timeit.repeat(lambda: YNABSession._build_json_object(json_string, 'transactions'),
+                            number=1, repeat=repeat))
+    print("decoding %d transactions" % count)
+    print("  namedtuple per object: %8.3f s (%10.0f objects/s)" % (old, count / old))
+    print("  cached model classes:  %8.3f s (%10.0f objects/s)" % (new, count / new))
+    print("  speedup:               %8.1fx" % (old / new))
+    bench_backends(count, repeat)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
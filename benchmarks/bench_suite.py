@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+"""
+This module benchmarks pynab end to end against the local mock YNAB server.
+Every benchmark reports operations per second and the peak of the memory allocated by python
+(tracemalloc) while it ran. Run it with:
+    python -m benchmarks.bench_suite [--transactions N] [--latency S] [--only NAME ...]
+"""
+
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from benchmarks.mock_server import BUDGET_ID, MockYNABServer, synthetic_id
+from pynab.models import build_model
+from pynab.pynab import YNAB
+from pynab.rate_limit import RateLimiter
+
+
+def bench_decode(ynab, server, count):
+    """
+    decodes a transactions response body into model objects
+    :return: number of operations (transactions)
+    """
+    body = b''.join(server.budget.iter_transactions_json('{"data": {"transactions": ', '}}'))
+    build_model(ynab._json_loads(body)['data']['transactions'], 'transactions')
+    return server.budget.transactions
+
+
+def bench_get_transactions(ynab, server, count):
+    """
+    fetches all transactions with one list request
+    :return: number of operations (transactions)
+    """
+    return len(ynab.get_transactions(BUDGET_ID))
+
+
+def bench_iter_transactions(ynab, server, count):
+    """
+    streams all transactions
+    :return: number of operations (transactions)
+    """
+    return sum(1 for _ in ynab.iter_transactions(BUDGET_ID))
+
+
+def bench_budget_export(ynab, server, count):
+    """
+    fetches the full budget export; only the transactions are built into model objects
+    :return: number of operations (transactions)
+    """
+    budget, _ = ynab.get_budgets(BUDGET_ID, lazy=True)
+    return len(budget.transactions)
+
+
+def bench_bulk_post(ynab, server, count):
+    """
+    posts count new transactions with import ids in chunks
+    :return: number of operations (transactions)
+    """
+    run = server.created
+    transactions = [ynab.build_transaction_json(synthetic_id(1, 0), '2018-01-01', -1000,
+                                                None, 'Payee', None, None, 'cleared', False,
+                                                None, 'BENCH:%d:%d' % (run, index))
+                    for index in range(count)]
+    result = ynab.post_transaction_bulk(BUDGET_ID, ynab.build_transactions_json(transactions))
+    return len(result.transaction_ids)
+
+
+def bench_name_lookups(ynab, server, count):
+    """
+    resolves payee and category names one at a time through the name index
+    :return: number of operations (lookups)
+    """
+    payees = len(server.budget.payees)
+    categories = len(server.budget.categories)
+    ynab.invalidate_names(BUDGET_ID)
+    for index in range(count):
+        ynab.get_payee_id(BUDGET_ID, 'Payee %d' % (index % payees))
+        ynab.get_category_id(BUDGET_ID, 'Category %d' % (index % categories))
+    return 2 * count
+
+
+def bench_csv_import(ynab, server, count, csv_filename=None):
+    """
+    imports a csv file with count rows
+    :return: number of operations (rows)
+    """
+    imported, skipped = ynab.import_csv(BUDGET_ID, synthetic_id(1, 0), csv_filename)
+    return imported + skipped
+
+
+BENCHMARKS = (
+    ('decode', bench_decode),
+    ('get_transactions', bench_get_transactions),
+    ('iter_transactions', bench_iter_transactions),
+    ('budget_export', bench_budget_export),
+    ('bulk_post', bench_bulk_post),
+    ('name_lookups', bench_name_lookups),
+    ('csv_import', bench_csv_import),
+)
+
+
+def write_csv(filename, count, run):
+    """
+    writes a csv file in the YNAB format
+    :param filename: filename of the csv file
+    :param count: number of rows
+    :param run: number making the rows of this file unique
+    :return: nothing
+    """
+    with open(filename, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(('Date', 'Payee', 'Category', 'Memo', 'Outflow', 'Inflow'))
+        for index in range(count):
+            writer.writerow(('2019-%02d-%02d' % (index % 12 + 1, index % 28 + 1),
+                             'Payee %d' % (index % 250), 'Category %d' % (index % 50),
+                             'run %d' % run, '%d.%02d' % (run + index // 100, index % 100), ''))
+
+
+def measure(function, trace_memory):
+    """
+    runs a benchmark once
+    :param function: function without arguments returning the number of operations
+    :param trace_memory: if True the peak python memory is measured too, which slows it down
+    :return: 3 values are returned: operations, seconds, peak bytes (None if not measured)
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        operations = function()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return operations, seconds, peak
+
+
+# pylint: disable-msg=too-many-arguments,too-many-locals
+def run(transactions=10000, writes=10000, latency=0.0, rate_limit=None, rate_period=3600.0,
+        only=None, trace_memory=True):
+    """
+    runs the benchmarks and prints the results
+    :param transactions: number of transactions of the synthetic budget
+    :param writes: number of transactions posted, rows imported and names looked up
+    :param latency: seconds the mock server delays every request
+    :param rate_limit: optional; requests per rate_period allowed by the mock server
+    :param rate_period: length of the rate limit window in seconds
+    :param only: optional; names of the benchmarks to run. If not set all are run
+    :param trace_memory: if True every benchmark is run a second time under tracemalloc
+    :return: dictionary name -> (operations per second, peak bytes)
+    """
+    results = {}
+    with MockYNABServer(transactions, latency=latency, rate_limit=rate_limit,
+                        rate_period=rate_period) as server, \
+            YNAB('token', rate_limiter=RateLimiter(limit=rate_limit or 10 ** 9,
+                                                   period=rate_period)) as ynab, \
+            tempfile.TemporaryDirectory() as directory:
+        ynab.base_url = server.url
+        csv_filename = os.path.join(directory, 'import.csv')
+        print("%d transactions, %d writes, %.3f s latency" % (transactions, writes, latency))
+        print("  %-18s %12s %10s %12s" % ('benchmark', 'ops/s', 'seconds', 'peak MB'))
+        for index, (name, function) in enumerate(BENCHMARKS):
+            if only and name not in only:
+                continue
+            runs = []
+            for attempt in range(2 if trace_memory else 1):
+                kwargs = {}
+                if name == 'csv_import':
+                    write_csv(csv_filename, writes, 2 * index + attempt)
+                    kwargs['csv_filename'] = csv_filename
+                runs.append(measure(lambda: function(ynab, server, writes, **kwargs),
+                                    trace_memory and attempt == 1))
+            operations, seconds, _ = runs[0]
+            peak = runs[-1][2]
+            results[name] = (operations / seconds, peak)
+            print("  %-18s %12.0f %10.3f %12s" % (
+                name, operations / seconds, seconds,
+                '-' if peak is None else '%.1f' % (peak / 1048576.0)))
+    return results
+# pylint: enable-msg=too-many-arguments,too-many-locals
+
+
+def main():
+    """
+    parses the command line and runs the benchmarks
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=10000,
+                        help="transactions of the synthetic budget (1000 to 1000000)")
+    parser.add_argument('--writes', type=int, default=10000,
+                        help="transactions posted, csv rows imported and names looked up")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="seconds the mock server delays every request")
+    parser.add_argument('--rate-limit', type=int, default=None,
+                        help="requests per rate period allowed by the mock server")
+    parser.add_argument('--rate-period', type=float, default=3600.0,
+                        help="length of the rate limit window in seconds")
+    parser.add_argument('--only', nargs='+', choices=[name for name, _ in BENCHMARKS],
+                        help="benchmarks to run")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip the tracemalloc run measuring the peak memory")
+    parser.add_argument('--json', help="also write the results to this json file")
+    args = parser.parse_args()
+    results = run(args.transactions, args.writes, args.latency, args.rate_limit,
+                  args.rate_period, args.only, not args.no_memory)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump({name: {'ops_per_second': ops, 'peak_bytes': peak}
+                       for name, (ops, peak) in results.items()}, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
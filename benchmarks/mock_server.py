@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a local stand-in for the YNAB API serving a synthetic budget.
+It simulates network latency and the YNAB rate limit and needs nothing but the standard library.
+Run it on its own to serve a budget until interrupted:
+    python -m benchmarks.mock_server [transactions] [port]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import json
+import sys
+import threading
+import time
+import uuid
+
+BUDGET_ID = '00000000-0000-4000-8000-000000000000'
+
+# bytes collected before a chunk of a streamed response is written
+_WRITE_SIZE = 1 << 16
+
+
+def synthetic_id(kind, index):
+    """
+    builds a stable uuid for a synthetic object
+    :param kind: small number distinguishing the object types
+    :param index: index of the object
+    :return: uuid string
+    """
+    return str(uuid.UUID(int=(kind << 96) | index))
+
+
+class SyntheticBudget(object):
+    """
+    This class describes a synthetic budget. Transactions are generated from their index when
+    they are served, so even a budget with 1M transactions takes no memory.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, transactions=1000, accounts=5, payees=200, category_groups=5,
+                 categories_per_group=10):
+        """
+        Constructor
+        :param transactions: number of transactions
+        :param accounts: number of accounts
+        :param payees: number of payees
+        :param category_groups: number of category groups
+        :param categories_per_group: number of categories per group
+        """
+        self.transactions = transactions
+        self.accounts = [{"id": synthetic_id(1, index), "name": "Account %d" % index,
+                          "type": "checking", "on_budget": True, "closed": False, "note": None,
+                          "balance": 0, "cleared_balance": 0, "uncleared_balance": 0,
+                          "deleted": False} for index in range(accounts)]
+        self.payees = [{"id": synthetic_id(2, index), "name": "Payee %d" % index,
+                        "transfer_account_id": None, "deleted": False}
+                       for index in range(payees)]
+        self.categories = [{"id": synthetic_id(3, index), "name": "Category %d" % index,
+                            "category_group_id": synthetic_id(4, index // categories_per_group),
+                            "hidden": False, "note": None, "budgeted": 0, "activity": 0,
+                            "balance": 0, "deleted": False}
+                           for index in range(category_groups * categories_per_group)]
+        self.category_groups = [{"id": synthetic_id(4, group), "name": "Group %d" % group,
+                                 "hidden": False, "deleted": False,
+                                 "categories": self.categories[
+                                     group * categories_per_group:
+                                     (group + 1) * categories_per_group]}
+                                for group in range(category_groups)]
+    # pylint: enable-msg=too-many-arguments
+
+    def transaction(self, index):
+        """
+        generates one transaction
+        :param index: index of the transaction
+        :return: dictionary like the YNAB transaction json
+        """
+        account = self.accounts[index % len(self.accounts)]
+        payee = self.payees[index % len(self.payees)]
+        category = self.categories[index % len(self.categories)]
+        return {"id": synthetic_id(5, index),
+                "date": "%04d-%02d-%02d" % (2018 + index // 336 % 10, index // 28 % 12 + 1,
+                                            index % 28 + 1),
+                "amount": -(index % 100000) * 10,
+                "memo": None if index % 3 else "memo %d" % index,
+                "cleared": "cleared" if index % 2 else "uncleared",
+                "approved": True,
+                "flag_color": None,
+                "account_id": account["id"],
+                "account_name": account["name"],
+                "payee_id": payee["id"],
+                "payee_name": payee["name"],
+                "category_id": category["id"],
+                "category_name": category["name"],
+                "transfer_account_id": None,
+                "import_id": None,
+                "deleted": False,
+                "subtransactions": []}
+
+    def iter_transactions_json(self, prefix, suffix):
+        """
+        generator yielding a transactions response in pieces of about _WRITE_SIZE bytes
+        :param prefix: json text before the transactions array
+        :param suffix: json text after the transactions array
+        :return: yields bytes
+        """
+        parts = [prefix + '[']
+        size = len(parts[0])
+        for index in range(self.transactions):
+            part = ('' if index == 0 else ',') + json.dumps(self.transaction(index))
+            parts.append(part)
+            size += len(part)
+            if size >= _WRITE_SIZE:
+                yield ''.join(parts).encode('utf-8')
+                parts = []
+                size = 0
+        parts.append(']' + suffix)
+        yield ''.join(parts).encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    This class answers the requests of one connection.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """
+        keeps the benchmark output clean
+        """
+
+    def _send(self, status, parts, headers=None):
+        """
+        sends a response body with chunked transfer encoding
+        :param status: http status code
+        :param parts: iterable of bytes
+        :param headers: optional; additional headers
+        :return: nothing
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        for part in parts:
+            if part:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _send_json(self, status, data, headers=None):
+        """
+        sends a json response
+        :param status: http status code
+        :param data: json serializable data
+        :param headers: optional; additional headers
+        :return: nothing
+        """
+        self._send(status, [json.dumps(data).encode('utf-8')], headers)
+
+    def _error(self, status, error_id, name, headers=None):
+        """
+        sends a YNAB error response
+        :return: nothing
+        """
+        self._send_json(status, {"error": {"id": error_id, "name": name, "detail": name}},
+                        headers)
+
+    def _read_body(self):
+        """
+        reads the request body, sent with Content-Length or chunked transfer encoding
+        :return: the decoded json body; None if there is none
+        """
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if not size:
+                    # skip trailers up to the empty line
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b''.join(parts)
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+        return json.loads(body) if body else None
+
+    def _handle(self, method):
+        """
+        dispatches a request
+        :param method: http method
+        :return: nothing
+        """
+        server = self.server.mock
+        body = self._read_body()
+        if server.latency:
+            time.sleep(server.latency)
+        allowed, used = server.count_request()
+        headers = {}
+        if server.rate_limit is not None:
+            headers['X-Rate-Limit'] = '%d/%d' % (min(used, server.rate_limit), server.rate_limit)
+        if not allowed:
+            headers['Retry-After'] = '%d' % max(1, server.window_end - time.monotonic())
+            self._error(429, '429', 'too_many_requests', headers)
+            return
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')[1:]
+        query = parse_qs(url.query)
+        budget = server.budget
+        knowledge = {"server_knowledge": server.server_knowledge}
+        if method == 'GET' and parts == ['user']:
+            self._send_json(200, {"data": {"user": {"id": synthetic_id(0, 1)}}}, headers)
+        elif method == 'GET' and parts == ['budgets']:
+            self._send_json(200, {"data": {"budgets": [
+                {"id": BUDGET_ID, "name": "Mock Budget"}]}}, headers)
+        elif len(parts) < 2 or parts[0] != 'budgets' or parts[1] != BUDGET_ID:
+            self._error(404, '404.2', 'resource_not_found', headers)
+        elif method == 'GET' and len(parts) == 2:
+            prefix = json.dumps({"id": BUDGET_ID, "name": "Mock Budget",
+                                 "accounts": budget.accounts, "payees": budget.payees,
+                                 "category_groups": budget.category_groups,
+                                 "categories": budget.categories})[:-1]
+            self._send(200, budget.iter_transactions_json(
+                '{"data": {"budget": ' + prefix + ', "transactions": ',
+                '}, "server_knowledge": %d}}' % server.server_knowledge), headers)
+        elif method == 'GET' and parts[2:] in (['accounts'], ['payees'], ['categories']):
+            data = {'accounts': budget.accounts, 'payees': budget.payees,
+                    'categories': budget.category_groups}[parts[2]]
+            key = 'category_groups' if parts[2] == 'categories' else parts[2]
+            data = {key: data}
+            if 'last_knowledge_of_server' in query:
+                data.update(knowledge)
+            self._send_json(200, {"data": data}, headers)
+        elif method == 'GET' and parts[2:] == ['transactions']:
+            self._send(200, budget.iter_transactions_json(
+                '{"data": {"transactions": ',
+                ', "server_knowledge": %d}}' % server.server_knowledge), headers)
+        elif method == 'POST' and parts[2:] == ['transactions', 'bulk']:
+            self._send_json(201, {"data": {"bulk": server.create(body['transactions'])}},
+                            headers)
+        elif method == 'POST' and parts[2:] == ['transactions']:
+            created = server.create([body['transaction']])
+            if created['duplicate_import_ids']:
+                self._error(422, '422', 'unprocessable_entity', headers)
+            else:
+                body['transaction']['id'] = created['transaction_ids'][0]
+                self._send_json(201, {"data": {"transaction": body['transaction']}}, headers)
+        elif method in ('PUT', 'PATCH') and parts[2:3] == ['transactions']:
+            transactions = body['transactions'] if 'transactions' in body \
+                else [dict(body['transaction'], id=parts[3])]
+            data = {"transaction_ids": [t.get('id') for t in transactions],
+                    "transactions": transactions}
+            data.update(knowledge)
+            if method == 'PUT':
+                data = {"transaction": transactions[0]}
+            self._send_json(209 if method == 'PATCH' else 200, {"data": data}, headers)
+        else:
+            self._error(404, '404.1', 'not_found', headers)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        handles GET
+        """
+        self._handle('GET')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        handles POST
+        """
+        self._handle('POST')
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        """
+        handles PUT
+        """
+        self._handle('PUT')
+
+    def do_PATCH(self):  # pylint: disable=invalid-name
+        """
+        handles PATCH
+        """
+        self._handle('PATCH')
+
+
+class MockYNABServer(object):
+    """
+    This class runs a local HTTP server answering like the YNAB API for one synthetic budget
+    (BUDGET_ID). Point a session at it with session.base_url = server.url.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, transactions=1000, latency=0.0, rate_limit=None, rate_period=3600.0,
+                 host='127.0.0.1', port=0):
+        """
+        Constructor
+        :param transactions: number of transactions of the synthetic budget
+        :param latency: optional; seconds every request is delayed
+        :param rate_limit: optional; requests allowed per rate_period, answered with 429 and
+                reported with X-Rate-Limit like YNAB does. If not set there is no limit
+        :param rate_period: optional; length of the rate limit window in seconds
+        :param host: optional; address to listen on
+        :param port: optional; port to listen on; 0 picks a free port
+        """
+        self.budget = SyntheticBudget(transactions)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.window_end = time.monotonic() + rate_period
+        self.used = 0
+        self.server_knowledge = 1
+        self.import_ids = set()
+        self.created = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self._thread = None
+    # pylint: enable-msg=too-many-arguments
+
+    @property
+    def url(self):
+        """
+        base url to be used instead of the YNAB one
+        :return: the url ending with '/v1/'
+        """
+        host, port = self.httpd.server_address[:2]
+        return "http://%s:%d/v1/" % (host, port)
+
+    def __enter__(self):
+        """
+        context manager entry; starts the server
+        :return: the server itself
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager exit; stops the server
+        """
+        self.stop()
+
+    def start(self):
+        """
+        serves requests in a background thread
+        :return: nothing
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="MockYNABServer",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        stops serving and closes the listening socket
+        :return: nothing
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def count_request(self):
+        """
+        counts a request against the rate limit
+        :return: 2 values are returned: True if the request is allowed, requests in the window
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now >= self.window_end:
+                self.window_end = now + self.rate_period
+                self.used = 0
+            self.used += 1
+            return self.rate_limit is None or self.used <= self.rate_limit, self.used
+
+    def create(self, transactions):
+        """
+        creates transactions, skipping known import ids
+        :param transactions: list of transaction dictionaries
+        :return: dictionary like the data of a bulk response
+        """
+        transaction_ids = []
+        duplicate_import_ids = []
+        with self._lock:
+            for transaction in transactions:
+                import_id = transaction.get('import_id')
+                if import_id is not None and import_id in self.import_ids:
+                    duplicate_import_ids.append(import_id)
+                    continue
+                if import_id is not None:
+                    self.import_ids.add(import_id)
+                self.created += 1
+                transaction_ids.append(synthetic_id(6, self.created))
+            self.server_knowledge += 1
+        return {"transaction_ids": transaction_ids, "duplicate_import_ids": duplicate_import_ids}
+
+
+if __name__ == '__main__':
+    with MockYNABServer(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+                        port=int(sys.argv[2]) if len(sys.argv) > 2 else 8000) as mock_server:
+        print("serving budget %s at %s" % (BUDGET_ID, mock_server.url))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a column-wise container for transactions to be posted in bulk.
+"""
+
+from array import array
+from itertools import compress
+import json
+import re
+
+# fields of a transaction to be posted, in the order of build_transaction_json
+FIELDS = ('account_id', 'date', 'amount', 'payee_id', 'payee_name', 'category_id', 'memo',
+          'cleared', 'approved', 'flag_color', 'import_id')
+
+CLEARED_VALUES = ('cleared', 'uncleared', 'reconciled')
+FLAG_COLORS = (None, 'red', 'orange', 'yellow', 'green', 'blue', 'purple')
+
+# maximum lengths YNAB accepts for string fields
+MAX_LENGTHS = {'payee_name': 50, 'memo': 200, 'import_id': 36}
+
+# one json object per transaction; every %s takes an already encoded value
+_ROW_TEMPLATE = '{' + ','.join('"%s":%%s' % field for field in FIELDS) + '}'
+
+_DATES = re.compile(r"(?:\d{4}-\d\d-\d\d\n)*")
+
+
+def _encode_strings(values):
+    """
+    json encodes a column of strings or None
+    Columns like account_id, date or cleared repeat few values, so every distinct value is
+    encoded once.
+    :param values: list of str or None
+    :return: list of json texts
+    """
+    distinct = set(values)
+    if 2 * len(distinct) < len(values):
+        encoded = {value: json.dumps(value) for value in distinct}
+        return list(map(encoded.__getitem__, values))
+    return list(map(json.dumps, values))
+
+
+class TransactionBatch(object):
+    """
+    This class stores transactions to be posted column by column instead of one dict per
+    transaction. It is validated a column at a time and serialized straight into the body of
+    a bulk request; post_transaction_bulk accepts it in place of build_transactions_json.
+    Slicing (batch[start:stop]) returns a batch sharing nothing with the original.
+    """
+
+    def __init__(self, stream=False):
+        """
+        Constructor
+        :param stream: optional; if True the request body is sent with chunked transfer
+                encoding while it is serialized, see iter_json
+        """
+        self.stream = stream
+        self.columns = {field: [] for field in FIELDS}
+        # milliunits as 64 bit integers; other types are rejected on append
+        self.columns['amount'] = array('q')
+        self.columns['approved'] = array('b')
+
+    # pylint: disable-msg=too-many-arguments
+    def append(self, account_id, date, amount, payee_id, payee_name, category_id, memo,
+               cleared, approved, flag_color, import_id):
+        """
+        appends a transaction; the parameters are the ones of build_transaction_json
+        :return: nothing
+        :throws: TypeError or OverflowError if amount is no 64 bit integer
+        """
+        columns = self.columns
+        columns['amount'].append(amount)
+        columns['account_id'].append(account_id)
+        columns['date'].append(date)
+        columns['payee_id'].append(payee_id)
+        columns['payee_name'].append(payee_name)
+        columns['category_id'].append(category_id)
+        columns['memo'].append(memo)
+        columns['cleared'].append(cleared)
+        columns['approved'].append(bool(approved))
+        columns['flag_color'].append(flag_color)
+        columns['import_id'].append(import_id)
+    # pylint: enable-msg=too-many-arguments
+
+    def extend(self, transactions):
+        """
+        appends many transactions column by column
+        :param transactions: iterable of tuples with the parameters of append
+        :return: nothing
+        :throws: TypeError or OverflowError if an amount is no 64 bit integer; the batch is
+                 left unchanged
+        """
+        rows = list(transactions)
+        if not rows:
+            return
+        if any(len(row) != len(FIELDS) for row in rows):
+            raise TypeError("every transaction needs the %d fields %s" % (len(FIELDS), FIELDS))
+        # the typed columns are converted first, so a bad value leaves all columns untouched
+        converted = {}
+        for field, values in zip(FIELDS, zip(*rows)):
+            column = self.columns[field]
+            if field == 'approved':
+                values = map(bool, values)
+            converted[field] = array(column.typecode, values) if isinstance(column, array) \
+                else values
+        for field, values in converted.items():
+            self.columns[field].extend(values)
+
+    @property
+    def import_id(self):
+        """
+        the import ids of all transactions, used to decide whether a post can be replayed
+        :return: list of import ids (str or None)
+        """
+        return self.columns['import_id']
+
+    def __len__(self):
+        """
+        number of transactions
+        :return: the number of transactions
+        """
+        return len(self.columns['amount'])
+
+    def __getitem__(self, index):
+        """
+        returns a part of the batch
+        :param index: a slice
+        :return: TransactionBatch with the transactions of the slice
+        """
+        if not isinstance(index, slice):
+            raise TypeError("TransactionBatch only supports slicing")
+        part = TransactionBatch(self.stream)
+        part.columns = {field: column[index] for field, column in self.columns.items()}
+        return part
+
+    def compress(self, selectors):
+        """
+        returns the transactions for which selectors is True
+        :param selectors: list of booleans, one per transaction
+        :return: TransactionBatch with the selected transactions
+        """
+        part = TransactionBatch(self.stream)
+        part.columns = {field: array(column.typecode, compress(column, selectors))
+                        if isinstance(column, array) else list(compress(column, selectors))
+                        for field, column in self.columns.items()}
+        return part
+
+    def validate(self):
+        """
+        checks every column at once
+        :return: nothing
+        :throws: an exception naming the first invalid field and row
+        """
+        columns = self.columns
+        if len(self) and None in set(columns['account_id']):
+            self._invalid('account_id', lambda value: value is None)
+        dates = columns['date']
+        try:
+            # one regex run over all dates; the length check rules out embedded newlines
+            valid = _DATES.fullmatch('\n'.join(dates) + ('\n' if dates else '')) and \
+                sum(map(len, dates)) == 10 * len(dates)
+        except TypeError:
+            valid = False
+        if not valid:
+            self._invalid('date', lambda value: not isinstance(value, str) or len(value) != 10 or
+                          not _DATES.fullmatch(value + '\n'))
+        if not set(columns['cleared']) <= set(CLEARED_VALUES):
+            self._invalid('cleared', lambda value: value not in CLEARED_VALUES)
+        if not set(columns['flag_color']) <= set(FLAG_COLORS):
+            self._invalid('flag_color', lambda value: value not in FLAG_COLORS)
+        for field, max_length in MAX_LENGTHS.items():
+            lengths = [len(value) for value in columns[field] if value is not None]
+            if lengths and max(lengths) > max_length:
+                self._invalid(field, lambda value, limit=max_length:
+                              value is not None and len(value) > limit)
+        import_ids = [value for value in columns['import_id'] if value is not None]
+        if len(set(import_ids)) != len(import_ids):
+            seen = set()
+            self._invalid('import_id', lambda value: value is not None and
+                          (value in seen or seen.add(value)))
+
+    def _invalid(self, field, check):
+        """
+        internal helper raising the exception for the first invalid value of a column
+        :param field: the field name
+        :param check: function returning True for an invalid value
+        :return: nothing
+        :throws: always
+        """
+        for row, value in enumerate(self.columns[field]):
+            if check(value):
+                raise Exception("invalid %s in transaction %d: %r" % (field, row, value))
+
+    def _encoded_rows(self):
+        """
+        internal helper encoding the columns
+        :return: iterator over tuples of json texts, one tuple per transaction
+        """
+        columns = self.columns
+        encoded = []
+        for field in FIELDS:
+            if field == 'amount':
+                encoded.append(map(str, columns[field]))
+            elif field == 'approved':
+                encoded.append(map(('false', 'true').__getitem__, columns[field]))
+            else:
+                encoded.append(_encode_strings(columns[field]))
+        return zip(*encoded)
+
+    def to_json(self):
+        """
+        serializes the batch into the body of a bulk request
+        :return: the body as bytes, like json.dumps(build_transactions_json(...))
+        """
+        return ('{"transactions":[' + ','.join(map(_ROW_TEMPLATE.__mod__, self._encoded_rows())) +
+                ']}').encode('ascii')
+
+    def iter_json(self, chunk_size=1000):
+        """
+        serializes the batch into the body of a bulk request piece by piece
+        :param chunk_size: optional; number of transactions per piece
+        :return: yields the body in bytes pieces
+        """
+        rows = self._encoded_rows()
+        yield b'{"transactions":['
+        separator = ''
+        while True:
+            piece = []
+            for row in rows:
+                piece.append(_ROW_TEMPLATE % row)
+                if len(piece) == chunk_size:
+                    break
+            if not piece:
+                break
+            yield (separator + ','.join(piece)).encode('ascii')
+            separator = ','
+        yield b']}'
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
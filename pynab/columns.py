@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a columnar (NumPy) representation of transactions for analytics.
+It requires the optional dependency numpy; pandas and pyarrow are only needed for
+columns_to_frame and write_parquet.
+"""
+
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# id like columns stored as categorical codes
+CATEGORICAL_COLUMNS = ('id', 'parent_id', 'account_id', 'payee_id', 'category_id',
+                       'transfer_account_id', 'cleared', 'flag_color')
+
+# codes of a categorical column index into categories; -1 stands for None
+CategoricalColumn = namedtuple('CategoricalColumn', ('codes', 'categories'))
+
+
+class _CategoricalBuilder(object):
+    """
+    This class collects the codes of one categorical column.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.codes = array('i')
+        self.lookup = {None: -1}
+
+    def append(self, value):
+        """
+        appends a value
+        :param value: the value (hashable) or None
+        :return: nothing
+        """
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.lookup) - 1
+            self.lookup[value] = code
+        self.codes.append(code)
+
+    def build(self):
+        """
+        builds the column
+        :return: CategoricalColumn with int32 codes and an object array of categories
+        """
+        categories = numpy.empty(len(self.lookup) - 1, dtype=object)
+        for value, code in self.lookup.items():
+            if code >= 0:
+                categories[code] = value
+        return CategoricalColumn(numpy.frombuffer(self.codes, dtype=numpy.int32).copy(),
+                                 categories)
+
+
+def to_columns(transactions, flatten_subtransactions=True):
+    """
+    decodes transactions into typed column arrays
+    :param transactions: iterable of transaction objects as returned by get_transactions,
+            get_transactions_for_* or iter_transactions
+    :param flatten_subtransactions: if True a split transaction is replaced by its
+            subtransactions, which inherit date, account, cleared, approved and flag_color,
+            and the payee unless they have their own; parent_id then holds the id of the split
+            transaction
+    :return: dictionary column name -> array: 'amount' int64 milliunits, 'date' datetime64[D],
+             'approved' bool, 'memo' object and CategoricalColumn for CATEGORICAL_COLUMNS
+    :throws: if numpy is not installed an exception is raised
+    """
+    if numpy is None:
+        raise Exception("to_columns requires numpy")
+    categorical = {name: _CategoricalBuilder() for name in CATEGORICAL_COLUMNS}
+    amounts = array('q')
+    dates = []
+    approved = array('b')
+    memos = []
+
+    def append(row, parent, parent_id):
+        categorical['id'].append(row.id)
+        categorical['parent_id'].append(parent_id)
+        categorical['account_id'].append(parent.account_id)
+        payee_id = getattr(row, 'payee_id', None)
+        categorical['payee_id'].append(getattr(parent, 'payee_id', None) if payee_id is None
+                                       else payee_id)
+        categorical['category_id'].append(getattr(row, 'category_id', None))
+        categorical['transfer_account_id'].append(getattr(row, 'transfer_account_id', None))
+        categorical['cleared'].append(parent.cleared)
+        categorical['flag_color'].append(getattr(parent, 'flag_color', None))
+        amounts.append(row.amount)
+        dates.append(parent.date)
+        approved.append(bool(parent.approved))
+        memos.append(getattr(row, 'memo', None))
+
+    for transaction in transactions:
+        subtransactions = getattr(transaction, 'subtransactions', None)
+        if flatten_subtransactions and subtransactions:
+            for subtransaction in subtransactions:
+                if not getattr(subtransaction, 'deleted', False):
+                    append(subtransaction, transaction, transaction.id)
+        else:
+            append(transaction, transaction, None)
+    columns = {name: builder.build() for name, builder in categorical.items()}
+    columns['amount'] = numpy.frombuffer(amounts, dtype=numpy.int64).copy()
+    columns['date'] = numpy.array(dates, dtype='datetime64[D]')
+    columns['approved'] = numpy.frombuffer(approved, dtype=numpy.int8).astype(bool)
+    columns['memo'] = numpy.array(memos, dtype=object)
+    return columns
+
+
+def columns_to_frame(columns):
+    """
+    turns columns from to_columns into a pandas DataFrame with categorical id columns
+    :param columns: dictionary from to_columns
+    :return: the DataFrame
+    :throws: if pandas is not installed an ImportError is raised
+    """
+    import pandas  # pylint: disable=import-outside-toplevel
+    data = {}
+    for name, column in columns.items():
+        if isinstance(column, CategoricalColumn):
+            data[name] = pandas.Categorical.from_codes(column.codes, column.categories)
+        else:
+            data[name] = column
+    return pandas.DataFrame(data)
+
+
+def write_parquet(columns, filename):
+    """
+    writes columns from to_columns into a Parquet file; id columns are dictionary encoded
+    :param columns: dictionary from to_columns
+    :param filename: filename of the Parquet file
+    :return: nothing
+    :throws: if pyarrow is not installed an ImportError is raised
+    """
+    import pyarrow  # pylint: disable=import-outside-toplevel
+    import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+    arrays = {}
+    for name, column in columns.items():
+        if isinstance(column, CategoricalColumn):
+            arrays[name] = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(column.codes, mask=column.codes < 0),
+                pyarrow.array(column.categories, type=pyarrow.string()))
+        else:
+            arrays[name] = pyarrow.array(column)
+    pyarrow.parquet.write_table(pyarrow.table(arrays), filename)
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
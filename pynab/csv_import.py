@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+This module provides streaming helpers to read csv files in the format of the YNAB web app.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import re
+
+# date formats tried in this order if no date format is given
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y', '%Y/%m/%d')
+
+CsvTransaction = namedtuple('CsvTransaction', ('date', 'amount', 'payee', 'category', 'memo'))
+
+_NOT_A_NUMBER = re.compile(r"[^0-9.\-]")
+
+# accounting style negative amount e.g. '(12.34)' or '$(1,234.56)'
+_PARENTHESIZED = re.compile(r"[^()\-]*\([^()\-]*\)[^()\-]*")
+
+
+def parse_date(value, date_format=None):
+    """
+    converts a csv date into an iso date
+    :param value: the date as found in the csv
+    :param date_format: optional; strptime format. If not set DATE_FORMATS are tried
+    :return: iso date string 'YYYY-MM-DD'
+    :throws: if the date cannot be parsed an exception is raised
+    """
+    value = value.strip()
+    for candidate in (DATE_FORMATS if date_format is None else (date_format,)):
+        try:
+            return datetime.strptime(value, candidate).date().isoformat()
+        except ValueError:
+            continue
+    raise Exception("invalid date: " + value)
+
+
+def parse_amount(value, decimal_separator='.'):
+    """
+    converts a csv amount into milliunits
+    :param value: the amount as found in the csv e.g. '$1,234.56', '-5' or '(12.34)' for a
+            negative amount
+    :param decimal_separator: the decimal separator used in the csv
+    :return: the amount in milliunits (int); 0 for an empty or blank value
+    :throws: ValueError if the amount cannot be parsed, e.g. 'N/A'
+    """
+    value = value.strip()
+    if not value:
+        return 0
+    negative = '(' in value or ')' in value
+    if negative and not _PARENTHESIZED.fullmatch(value):
+        raise ValueError("invalid amount: " + value)
+    number = value
+    if decimal_separator != '.':
+        number = number.replace('.', '').replace(decimal_separator, '.')
+    number = _NOT_A_NUMBER.sub('', number)
+    try:
+        amount = int((Decimal(number) * 1000).to_integral_value())
+    except InvalidOperation:
+        raise ValueError("invalid amount: " + value)
+    return -amount if negative else amount
+
+
+def read_csv_transactions(csv_filename, date_format=None, decimal_separator='.'):
+    """
+    generator reading a csv file row by row. The header has to contain Date and either
+    Outflow/Inflow or Amount; Payee, Category and Memo are optional.
+    :param csv_filename: filename of the csv file containing the transactions
+    :param date_format: optional; strptime format of the Date column
+    :param decimal_separator: the decimal separator of the amount columns
+    :return: yields one CsvTransaction per row
+    :throws: if a row cannot be parsed a ValueError including the line number is raised
+    """
+    with open(csv_filename, newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.DictReader(csv_file)
+        for row in reader:
+            row = {(key or '').strip().lower(): (value or '') for key, value in row.items()}
+            if not any(row.values()):
+                continue
+            try:
+                if 'amount' in row:
+                    amount = parse_amount(row['amount'], decimal_separator)
+                else:
+                    amount = parse_amount(row.get('inflow', ''), decimal_separator) - \
+                             parse_amount(row.get('outflow', ''), decimal_separator)
+                date = parse_date(row['date'], date_format)
+            except Exception as error:  # pylint: disable=broad-except
+                raise ValueError("line %d of %s: %s" % (reader.line_num, csv_filename, error))
+            yield CsvTransaction(date,
+                                 amount,
+                                 row.get('payee', '').strip() or None,
+                                 row.get('category', '').strip() or None,
+                                 row.get('memo', '').strip() or None)
+
+
+def ynab_import_id(amount, date, occurrences):
+    """
+    builds an import id following the YNAB scheme YNAB:[milliunit amount]:[iso date]:[occurrence]
+    :param amount: amount in milliunits
+    :param date: iso date
+    :param occurrences: dictionary (amount, date) -> count, updated by this function
+    :return: the import id
+    """
+    key = (amount, date)
+    occurrence = occurrences.get(key, 0) + 1
+    occurrences[key] = occurrence
+    return "YNAB:%d:%s:%d" % (amount, date, occurrence)
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
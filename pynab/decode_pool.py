@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a process pool decoding large budget exports outside the GIL of the
+calling process. Workers return compact records (field names plus one tuple per object) and
+optionally the transactions as NumPy columns, which are pickled as plain buffers.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pynab.columns import to_columns
+from pynab.models import MODEL_NAMES, DEFAULT_MODEL_NAME, build_model, model_class
+from pynab.sync import BUDGET_ENTITIES
+from pynab.ynap_api import _select_json_backend
+
+# json decoder of the worker process, selected on first use
+_WORKER_LOADS = {}
+
+
+class DecodedBudget(namedtuple('DecodedBudget', ('info', 'records', 'columns',
+                                                 'server_knowledge'))):
+    """
+    This class holds a budget export decoded by a worker.
+    info is the dictionary of the scalar budget attributes (name, currency_format, ...),
+    records maps entity names to (field names, list of row tuples) with nested values as json
+    data, and columns holds the transactions as returned by columns.to_columns (None unless
+    columnar decoding was requested).
+    """
+
+    __slots__ = ()
+
+    def models(self, entity):
+        """
+        builds model objects from the records of an entity
+        :param entity: entity name e.g. 'accounts'
+        :return: list of model objects like in a budget from get_budgets(budget_id)
+        """
+        if entity not in self.records:
+            return []
+        fields, rows = self.records[entity]
+        cls = model_class(MODEL_NAMES.get(entity, DEFAULT_MODEL_NAME), fields)
+        nested = [index for index, row in enumerate(zip(*rows))
+                  if any(isinstance(value, (dict, list)) for value in row)]
+        if not nested:
+            return [cls._make(row) for row in rows]
+        objects = []
+        for row in rows:
+            row = list(row)
+            for index in nested:
+                row[index] = build_model(row[index], fields[index])
+            objects.append(cls._make(row))
+        return objects
+
+
+def _records(items):
+    """
+    internal helper turning a list of json objects into compact records
+    :param items: list of dicts
+    :return: (field names, list of row tuples); missing fields are None
+    """
+    fields = tuple(dict.fromkeys(field for item in items for field in item))
+    return fields, [tuple(item.get(field) for field in fields) for item in items]
+
+
+def decode_budget(body, json_backend=None, columnar=False):
+    """
+    decodes the body of a budget export response; runs in the worker processes
+    :param body: the response body as bytes
+    :param json_backend: optional; json backend, see ynap_api.JSON_BACKENDS
+    :param columnar: optional; if True the transactions are returned as columns (needs numpy)
+            instead of records
+    :return: DecodedBudget
+    """
+    loads = _WORKER_LOADS.get(json_backend)
+    if loads is None:
+        loads = _WORKER_LOADS[json_backend] = _select_json_backend(json_backend)[1]
+    data = loads(body)['data']
+    info = {}
+    records = {}
+    columns = None
+    for name, value in data['budget'].items():
+        if name not in BUDGET_ENTITIES:
+            info[name] = value
+        elif columnar and name == 'transactions':
+            # subtransactions of an export are a separate entity
+            columns = to_columns(build_model(value or [], name), flatten_subtransactions=False)
+        else:
+            records[name] = _records(value or [])
+    return DecodedBudget(info, records, columns, data.get('server_knowledge'))
+
+
+class DecodePool(object):
+    """
+    This class decodes budget export bodies in worker processes, so decoding several large
+    budgets scales with the number of cores. See YNAB.fetch_all_budgets.
+    """
+
+    def __init__(self, processes=None, json_backend=None, columnar=False):
+        """
+        Constructor
+        :param processes: optional; number of worker processes. If not set one per core
+        :param json_backend: optional; json backend of the workers, see ynap_api.JSON_BACKENDS
+        :param columnar: optional; if True transactions are decoded into columns (needs numpy)
+        """
+        self.json_backend = json_backend
+        self.columnar = columnar
+        self.executor = ProcessPoolExecutor(max_workers=processes)
+
+    def __enter__(self):
+        """
+        context manager entry
+        :return: the pool itself
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager exit; stops the worker processes
+        """
+        self.close()
+
+    def submit(self, body):
+        """
+        hands a budget export body to a worker
+        :param body: the response body as bytes
+        :return: Future resolving to a DecodedBudget
+        """
+        return self.executor.submit(decode_budget, body, self.json_backend, self.columnar)
+
+    def close(self):
+        """
+        stops the worker processes after the submitted bodies are decoded
+        :return: nothing
+        """
+        self.executor.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a local index of known import ids, so imports can drop duplicates before
+sending them instead of learning about them from YNAB.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from pynab.csv_import import ynab_import_id
+
+
+def duplicate_key(account_id, import_id):
+    """
+    builds the key of an import id; YNAB only rejects an import id again in the same account
+    :param account_id: the account id
+    :param import_id: the import id
+    :return: the key
+    """
+    return account_id + ':' + import_id
+
+
+class MemoryDuplicateBackend(object):
+    """
+    This class keeps the keys in a set.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.keys = set()
+
+    def add(self, keys):
+        """
+        adds keys
+        :param keys: iterable of keys
+        :return: nothing
+        """
+        self.keys.update(keys)
+
+    def contains(self, keys):
+        """
+        looks keys up
+        :param keys: list of keys
+        :return: list of booleans, True for known keys
+        """
+        return [key in self.keys for key in keys]
+
+
+class SqliteDuplicateBackend(object):
+    """
+    This class keeps the keys in a SQLite database, so the index survives between runs.
+    """
+
+    def __init__(self, filename):
+        """
+        Constructor
+        :param filename: filename of the SQLite database (created if it does not exist)
+        """
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS import_ids (key TEXT PRIMARY KEY)")
+
+    def add(self, keys):
+        """
+        adds keys
+        :param keys: iterable of keys
+        :return: nothing
+        """
+        with self._lock, self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO import_ids VALUES (?)",
+                                        ((key,) for key in keys))
+
+    def contains(self, keys):
+        """
+        looks keys up
+        :param keys: list of keys
+        :return: list of booleans, True for known keys
+        """
+        known = set()
+        with self._lock:
+            # stay below the SQLite limit of host parameters per statement
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                known.update(row[0] for row in self.connection.execute(
+                    "SELECT key FROM import_ids WHERE key IN (%s)" % ','.join('?' * len(part)),
+                    part))
+        return [key in known for key in keys]
+
+
+class BloomDuplicateBackend(object):
+    """
+    This class keeps the keys in a Bloom filter of fixed size, optionally stored in a file.
+    Lookups can report an unknown key as known with probability error_rate, and such a
+    transaction would not be imported; use SqliteDuplicateBackend where that is not acceptable.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=1e-6, filename=None):
+        """
+        Constructor
+        :param capacity: number of keys the filter is sized for
+        :param error_rate: probability of a false positive at capacity keys
+        :param filename: optional; file the filter is loaded from and saved to with save().
+                A stored filter keeps its size
+        """
+        self.filename = filename
+        bits = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, int(round(bits / capacity * math.log(2))))
+        self.bits = bytearray((bits + 7) // 8)
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'rb') as bloom_file:
+                self.hashes = bloom_file.read(1)[0]
+                self.bits = bytearray(bloom_file.read())
+        self._size = len(self.bits) * 8
+
+    def _positions(self, key):
+        """
+        internal helper computing the bit positions of a key (double hashing)
+        :param key: the key
+        :return: list of bit positions
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self._size for index in range(self.hashes)]
+
+    def add(self, keys):
+        """
+        adds keys
+        :param keys: iterable of keys
+        :return: nothing
+        """
+        bits = self.bits
+        for key in keys:
+            for position in self._positions(key):
+                bits[position >> 3] |= 1 << (position & 7)
+
+    def contains(self, keys):
+        """
+        looks keys up
+        :param keys: list of keys
+        :return: list of booleans, True for (probably) known keys
+        """
+        bits = self.bits
+        return [all(bits[position >> 3] & (1 << (position & 7))
+                    for position in self._positions(key)) for key in keys]
+
+    def save(self):
+        """
+        writes the filter to its file
+        :return: nothing
+        """
+        with open(self.filename, 'wb') as bloom_file:
+            bloom_file.write(bytes((self.hashes,)))
+            bloom_file.write(self.bits)
+
+
+class DuplicateIndex(object):
+    """
+    This class indexes the import ids of transactions known to YNAB per account.
+    With fingerprints, fetched transactions without import id (e.g. entered by hand) are
+    indexed under the id the YNAB scheme YNAB:[milliunit amount]:[iso date]:[occurrence] would
+    give them, so a csv row matching such a transaction is treated as duplicate too.
+    """
+
+    def __init__(self, backend=None, fingerprints=False):
+        """
+        Constructor
+        :param backend: optional; MemoryDuplicateBackend, SqliteDuplicateBackend or
+                BloomDuplicateBackend. If not set a memory backend is used
+        :param fingerprints: optional; if True transactions without import id are indexed
+                under their YNAB scheme id
+        """
+        self.backend = MemoryDuplicateBackend() if backend is None else backend
+        self.fingerprints = fingerprints
+
+    def add_transactions(self, transactions):
+        """
+        indexes fetched transactions, e.g. from iter_transactions
+        Occurrences for fingerprints are counted in the order of the transactions, which YNAB
+        returns sorted by date.
+        :param transactions: iterable of transaction objects
+        :return: nothing
+        """
+        occurrences = {}
+        keys = []
+        for transaction in transactions:
+            if getattr(transaction, 'deleted', False):
+                continue
+            import_id = getattr(transaction, 'import_id', None)
+            if import_id is None and self.fingerprints:
+                import_id = ynab_import_id(transaction.amount, transaction.date,
+                                           occurrences.setdefault(transaction.account_id, {}))
+            if import_id is not None:
+                keys.append(duplicate_key(transaction.account_id, import_id))
+        self.backend.add(keys)
+
+    def add(self, account_id, import_ids):
+        """
+        indexes import ids, e.g. after they were posted
+        :param account_id: the account the import ids belong to
+        :param import_ids: iterable of import ids; None is skipped like in known
+        :return: nothing
+        """
+        self.backend.add(duplicate_key(account_id, import_id) for import_id in import_ids
+                         if import_id is not None)
+
+    def known(self, account_id, import_ids):
+        """
+        looks up import ids
+        :param account_id: the account the import ids belong to
+        :param import_ids: list of import ids; None is never known
+        :return: list of booleans, True for known import ids
+        """
+        keys = [None if import_id is None else duplicate_key(account_id, import_id)
+                for import_id in import_ids]
+        found = iter(self.backend.contains([key for key in keys if key is not None]))
+        return [key is not None and next(found) for key in keys]
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
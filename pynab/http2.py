@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+This module provides an HTTP/2 transport for YNABSession. It requires the optional dependency
+httpx with its http2 extra (pip install httpx[http2]).
+"""
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class HTTP2Response(object):
+    """
+    This class wraps a httpx.Response with the parts of requests.Response used by YNABSession.
+    """
+
+    def __init__(self, response):
+        """
+        Constructor
+        :param response: the httpx.Response
+        """
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    @property
+    def content(self):
+        """
+        the response body, read on first access
+        :return: the body as bytes
+        """
+        return self._response.read()
+
+    def iter_content(self, chunk_size=1):
+        """
+        yields the body in chunks without reading it completely
+        :param chunk_size: size of the chunks in bytes
+        :return: yields the chunks
+        """
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        """
+        releases the connection back to the pool
+        :return: nothing
+        """
+        self._response.close()
+
+
+class HTTP2Session(object):
+    """
+    This class stands in for requests.Session and multiplexes all requests over HTTP/2
+    connections of a httpx.Client. It is safe to share between threads.
+    Transport errors are raised as the matching requests exceptions so the retry handling of
+    YNABSession applies unchanged.
+    """
+
+    def __init__(self, max_connections=10, max_keepalive=10):
+        """
+        Constructor
+        :param max_connections: maximum number of open connections
+        :param max_keepalive: maximum number of idle connections kept alive
+        :throws: if httpx is not installed an exception is raised
+        """
+        if httpx is None:
+            raise Exception("HTTP/2 requires httpx (pip install httpx[http2])")
+        self.headers = {}
+        self.client = httpx.Client(http2=True, limits=httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_keepalive))
+
+    # pylint: disable-msg=too-many-arguments
+    def request(self, method, url, timeout=None, json=None, data=None, headers=None,
+                stream=False):
+        """
+        sends a request
+        :param method: http method e.g. 'GET'
+        :param url: the complete url
+        :param timeout: optional; (connect timeout, read timeout) in seconds
+        :param json: optional; json data to be sent
+        :param data: optional; request body as bytes or an iterator of bytes, which is sent
+                with chunked transfer encoding
+        :param headers: optional; additional request headers
+        :param stream: optional; if True the body is not read before returning the response
+        :return: HTTP2Response
+        :throws: requests.exceptions.ConnectTimeout, Timeout or ConnectionError
+        """
+        if timeout is not None:
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        request = self.client.build_request(method, url, json=json, content=data,
+                                            headers=request_headers, timeout=timeout)
+        try:
+            response = self.client.send(request, stream=stream)
+        except httpx.ConnectTimeout as error:
+            raise requests.exceptions.ConnectTimeout(str(error))
+        except httpx.TimeoutException as error:
+            raise requests.exceptions.Timeout(str(error))
+        except httpx.TransportError as error:
+            raise requests.exceptions.ConnectionError(str(error))
+        return HTTP2Response(response)
+    # pylint: enable-msg=too-many-arguments
+
+    def close(self):
+        """
+        closes all connections
+        :return: nothing
+        """
+        self.client.close()
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
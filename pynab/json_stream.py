@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+"""
+This module provides incremental decoding of a json array from a stream of byte chunks.
+"""
+
+import codecs
+import json
+import re
+
+# whitespace and separators between array elements
+_SKIP = re.compile(r"[\s,]*")
+
+# buffered text is only compacted once this many characters have been consumed
+_COMPACT_AT = 1 << 16
+
+
+def iter_json_array(chunks, key):
+    """
+    generator yielding the elements of the first array found under key, one at a time.
+    Only the element currently decoded and one chunk are held in memory.
+    :param chunks: iterable of bytes chunks of a json document e.g. response.iter_content()
+    :param key: the key of the array e.g. 'transactions'. Keys of nested objects ending with
+            the same name (e.g. 'subtransactions') do not match.
+    :return: yields the decoded elements (dicts, lists or scalars)
+    :throws: if the document ends early or is malformed an exception is raised
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    start = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    chunks = iter(chunks)
+    buffer = ''
+    position = None
+    exhausted = False
+    while True:
+        if position is None:
+            # still looking for the start of the array
+            match = start.search(buffer)
+            if match is not None:
+                buffer = buffer[match.end():]
+                position = 0
+                continue
+            # keep a tail in case the key is split across chunks
+            buffer = buffer[-(len(key) + 64):]
+        else:
+            position = _SKIP.match(buffer, position).end()
+            if position < len(buffer):
+                if buffer[position] == ']':
+                    return
+                try:
+                    element, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if exhausted:
+                        raise Exception("malformed json array '" + key + "'")
+                else:
+                    # a number could continue in the next chunk
+                    if end < len(buffer) or exhausted or not isinstance(element, (int, float)):
+                        position = end
+                        if position > _COMPACT_AT:
+                            buffer = buffer[position:]
+                            position = 0
+                        yield element
+                        continue
+        if exhausted:
+            raise Exception("json array '" + key + "' not found or incomplete")
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += text_decoder.decode(b'', final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
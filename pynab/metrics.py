@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+This module provides request instrumentation for YNABSession: the events reported to observers
+and an observer collecting counters and histograms in Prometheus text format.
+"""
+
+from collections import namedtuple
+import bisect
+import threading
+
+# one finished API call; latency covers the requests sent to YNAB (summed over retries) or
+# the cache lookup, decode_time covers json decoding and building the model objects,
+# wait_time covers waiting for the rate limiter and between retries and attempts counts the
+# requests sent (0 if the cache answered); a call failing without response (connection error
+# or timeout after the retries) has status None and the exception as error
+RequestEvent = namedtuple('RequestEvent', ('method', 'endpoint', 'status', 'bytes', 'latency',
+                                           'decode_time', 'from_cache', 'wait_time', 'attempts',
+                                           'error'),
+                          defaults=(0.0, 1, None))
+
+# upper bounds in seconds of the latency, decode time and wait time histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# url parts which are not ids although they are at an id position
+_LITERAL_PARTS = ('bulk',)
+
+
+def endpoint_template(url):
+    """
+    derives the endpoint template from a request url, replacing ids and dropping the query
+    e.g. 'budgets/<id>/transactions/<id>?type=x' -> 'budgets/{id}/transactions/{id}'
+    :param url: url part relative to the base url
+    :return: the endpoint template
+    """
+    parts = url.split('?', 1)[0].strip('/').split('/')
+    return '/'.join('{id}' if index % 2 and part not in _LITERAL_PARTS else part
+                    for index, part in enumerate(parts))
+
+
+class _Histogram(object):
+    """
+    This class counts observations per bucket.
+    """
+
+    def __init__(self, buckets):
+        """
+        Constructor
+        :param buckets: sorted upper bounds of the buckets
+        """
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, buckets, value):
+        """
+        adds an observation
+        :param buckets: sorted upper bounds of the buckets
+        :param value: the observed value
+        :return: nothing
+        """
+        self.counts[bisect.bisect_left(buckets, value)] += 1
+        self.sum += value
+
+
+class RequestMetrics(object):
+    """
+    This class is an observer for YNABSession.add_observer collecting request counters, bytes
+    received and histograms of latency, decode time and wait time per method, endpoint and
+    status.
+    Every event is passed on to the optional callback as well.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, callback=None, prefix='pynab'):
+        """
+        Constructor
+        :param buckets: optional; upper bounds in seconds of the histogram buckets
+        :param callback: optional; function called with every RequestEvent
+        :param prefix: optional; prefix of the metric names
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.callback = callback
+        self.prefix = prefix
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        """
+        records a RequestEvent
+        :param event: the RequestEvent
+        :return: nothing
+        """
+        labels = (event.method, event.endpoint,
+                  'error' if event.status is None else str(event.status),
+                  'true' if event.from_cache else 'false')
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0, 0, _Histogram(self.buckets),
+                                                 _Histogram(self.buckets),
+                                                 _Histogram(self.buckets)]
+            series[0] += 1
+            series[1] += event.bytes
+            series[2].observe(self.buckets, event.latency)
+            series[3].observe(self.buckets, event.decode_time)
+            series[4].observe(self.buckets, event.wait_time)
+        if self.callback is not None:
+            self.callback(event)
+
+    def requests(self, endpoint=None, from_cache=None):
+        """
+        counts the recorded requests
+        :param endpoint: optional; only count requests of this endpoint template
+        :param from_cache: optional; True or False to only count cached or sent requests
+        :return: the number of requests
+        """
+        with self._lock:
+            return sum(series[0] for labels, series in self._series.items()
+                       if (endpoint is None or labels[1] == endpoint) and
+                       (from_cache is None or (labels[3] == 'true') == from_cache))
+
+    def to_prometheus(self):
+        """
+        exports all metrics in the Prometheus text exposition format
+        :return: the metrics as string
+        """
+        names = ('method', 'endpoint', 'status', 'cache')
+        with self._lock:
+            series = sorted((labels, (values[0], values[1], list(values[2].counts),
+                                      values[2].sum, list(values[3].counts), values[3].sum,
+                                      list(values[4].counts), values[4].sum))
+                            for labels, values in self._series.items())
+        lines = []
+
+        def label_string(labels, extra=None):
+            pairs = ['%s="%s"' % (name, value.replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in zip(names, labels)]
+            if extra is not None:
+                pairs.append('le="%s"' % extra)
+            return '{' + ','.join(pairs) + '}'
+
+        for index, name, help_text in ((0, 'requests_total', 'Requests to the YNAB API'),
+                                       (1, 'response_bytes_total', 'Response bytes received')):
+            lines.append('# HELP %s_%s %s' % (self.prefix, name, help_text))
+            lines.append('# TYPE %s_%s counter' % (self.prefix, name))
+            for labels, values in series:
+                lines.append('%s_%s%s %d' % (self.prefix, name, label_string(labels),
+                                             values[index]))
+        for index, name, help_text in ((2, 'request_latency_seconds', 'Network latency'),
+                                       (4, 'decode_seconds', 'Time spent decoding responses'),
+                                       (6, 'wait_seconds',
+                                        'Time spent waiting for the rate limit and retries')):
+            lines.append('# HELP %s_%s %s' % (self.prefix, name, help_text))
+            lines.append('# TYPE %s_%s histogram' % (self.prefix, name))
+            for labels, values in series:
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), values[index]):
+                    cumulative += count
+                    lines.append('%s_%s_bucket%s %d' % (self.prefix, name,
+                                                        label_string(labels, bound), cumulative))
+                lines.append('%s_%s_sum%s %r' % (self.prefix, name, label_string(labels),
+                                                 values[index + 1]))
+                lines.append('%s_%s_count%s %d' % (self.prefix, name, label_string(labels),
+                                                   values[0]))
+        return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
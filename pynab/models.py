@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the model classes used to represent YNAB API objects.
+
+Every JSON object returned by YNAB is turned into an instance of a slotted (namedtuple based)
+model class. The classes are created once per entity type and field layout and are cached,
+so decoding a response never builds new classes for objects that were seen before.
+Large payloads can be wrapped in a LazyModel instead, which builds the model objects of a field
+only when it is accessed.
+"""
+
+from collections import namedtuple
+
+# maps the json key an object (or a list of objects) is found under to its model name
+MODEL_NAMES = {
+    'user': 'User',
+    'budgets': 'Budget',
+    'budget': 'Budget',
+    'date_format': 'DateFormat',
+    'currency_format': 'CurrencyFormat',
+    'accounts': 'Account',
+    'account': 'Account',
+    'category_groups': 'CategoryGroup',
+    'category_group': 'CategoryGroup',
+    'categories': 'Category',
+    'category': 'Category',
+    'payees': 'Payee',
+    'payee': 'Payee',
+    'payee_locations': 'PayeeLocation',
+    'payee_location': 'PayeeLocation',
+    'months': 'Month',
+    'month': 'Month',
+    'transactions': 'Transaction',
+    'transaction': 'Transaction',
+    'subtransactions': 'SubTransaction',
+    'scheduled_transactions': 'ScheduledTransaction',
+    'scheduled_transaction': 'ScheduledTransaction',
+    'scheduled_subtransactions': 'ScheduledSubTransaction',
+    'bulk': 'BulkResult',
+}
+
+# name used for objects found under keys not listed in MODEL_NAMES
+DEFAULT_MODEL_NAME = 'YNABObject'
+
+# cache of the model classes keyed on (model name, field tuple)
+_MODEL_CLASSES = {}
+
+
+def model_class(name, fields):
+    """
+    returns the model class for the given name and fields, creating it only on first use
+    :param name: name of the model class e.g. 'Transaction'
+    :param fields: tuple of field names in the order they appear in the json object
+    :return: a namedtuple based model class
+    """
+    key = (name, fields)
+    cls = _MODEL_CLASSES.get(key)
+    if cls is None:
+        # rename=True keeps decoding alive for keys which are not valid identifiers
+        cls = namedtuple(name, fields, rename=True)
+        _MODEL_CLASSES[key] = cls
+    return cls
+
+
+def build_model(data, key=None):
+    """
+    turns decoded json data (dicts, lists and scalars) into model objects
+    :param data: the decoded json data
+    :param key: optional; the json key the data was found under, used to name the model
+    :return: (list of) model object(s); scalars are returned unchanged
+    """
+    if isinstance(data, dict):
+        values = []
+        append = values.append
+        for field, value in data.items():
+            if isinstance(value, (dict, list)):
+                append(build_model(value, field))
+            else:
+                append(value)
+        return model_class(MODEL_NAMES.get(key, DEFAULT_MODEL_NAME), tuple(data))._make(values)
+    if isinstance(data, list):
+        return [build_model(item, key) for item in data]
+    return data
+
+
+class LazyModel(object):
+    """
+    This class stands in for the model object of a decoded json object. It keeps the decoded
+    json data and builds the model objects of a field on its first access, so reading a few
+    fields of a large budget export never decodes the rest into model objects.
+    Fields are reachable by attribute, by index and by iteration like on the model classes;
+    comparison, hashing, _asdict and _replace behave like on the model object it stands for.
+    """
+
+    __slots__ = ('_data', '_key', '_values')
+
+    def __init__(self, data, key=None):
+        """
+        Constructor
+        :param data: the decoded json object (dict)
+        :param key: optional; the json key the data was found under, used to name the model
+        """
+        self._data = data
+        self._key = key
+        self._values = {}
+
+    def __getattr__(self, name):
+        """
+        builds the value of a field on first access
+        :param name: the field name
+        :return: the value as built by build_model
+        :throws: AttributeError if the json object has no such field
+        """
+        if name in LazyModel.__slots__:
+            # not initialized yet, e.g. while copying
+            raise AttributeError(name)
+        values = self._values
+        if name in values:
+            return values[name]
+        try:
+            value = self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+        value = values[name] = build_model(value, name)
+        return value
+
+    @property
+    def _fields(self):
+        """
+        the field names in the order they appear in the json object
+        :return: tuple of field names
+        """
+        return tuple(self._data)
+
+    def __getitem__(self, index):
+        """
+        returns a field by its position
+        :param index: the position of the field
+        :return: the value of the field
+        """
+        return getattr(self, self._fields[index])
+
+    def __iter__(self):
+        """
+        iterates over the values of all fields, building them
+        :return: yields the values
+        """
+        for name in self._data:
+            yield getattr(self, name)
+
+    def __len__(self):
+        """
+        number of fields
+        :return: the number of fields
+        """
+        return len(self._data)
+
+    def __eq__(self, other):
+        """
+        compares the values like the model object it stands for (a tuple) would
+        :param other: model object, LazyModel or tuple
+        :return: True if the values are equal
+        """
+        if isinstance(other, (LazyModel, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        """
+        hash like the model object it stands for
+        :return: the hash of the values
+        """
+        return hash(tuple(self))
+
+    def _asdict(self):
+        """
+        returns the fields as dictionary like namedtuple._asdict
+        :return: dictionary field name -> value
+        """
+        return {name: getattr(self, name) for name in self._data}
+
+    def _replace(self, **fields):
+        """
+        returns a copy with some fields replaced like namedtuple._replace
+        :param fields: the new values by field name
+        :return: LazyModel with the new values
+        :throws: ValueError for names which are not fields
+        """
+        unknown = set(fields) - set(self._data)
+        if unknown:
+            raise ValueError("Got unexpected field names: %r" % sorted(unknown))
+        data = dict(self._data)
+        data.update((name, model_to_data(value)) for name, value in fields.items())
+        copy = LazyModel(data, self._key)
+        copy._values.update(fields)  # pylint: disable=protected-access
+        return copy
+
+    def __repr__(self):
+        """
+        representation listing the field names only
+        :return: the representation
+        """
+        return "Lazy%s(%s)" % (MODEL_NAMES.get(self._key, DEFAULT_MODEL_NAME),
+                               ", ".join(self._data))
+
+    def materialize(self):
+        """
+        builds the complete model object
+        :return: the model object as returned by build_model
+        """
+        return build_model(self._data, self._key)
+
+
+def lazy_model(data, key=None):
+    """
+    like build_model, but a json object is wrapped in a LazyModel instead of being built
+    :param data: the decoded json data
+    :param key: optional; the json key the data was found under, used to name the model
+    :return: LazyModel for a dict; (list of) model object(s) for other data
+    """
+    if isinstance(data, dict):
+        return LazyModel(data, key)
+    return build_model(data, key)
+
+
+def model_to_data(obj):
+    """
+    turns model objects back into plain json data (dicts, lists and scalars)
+    :param obj: (list of) model object(s)
+    :return: the json data; for a LazyModel its decoded json data, which must not be changed
+    """
+    if isinstance(obj, LazyModel):
+        return obj._data  # pylint: disable=protected-access
+    if isinstance(obj, tuple) and hasattr(obj, '_fields'):
+        return {field: model_to_data(value) for field, value in zip(obj._fields, obj)}
+    if isinstance(obj, list):
+        return [model_to_data(item) for item in obj]
+    return obj
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
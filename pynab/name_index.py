@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+This module provides cached name to id indexes for YNAB collections.
+"""
+
+from collections import OrderedDict
+import re
+import threading
+import time
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_name(name, case_sensitive=True, normalize=False):
+    """
+    builds the lookup key for a name
+    :param name: the name as stored in YNAB or as searched for
+    :param case_sensitive: if False names are compared case insensitive
+    :param normalize: if True unicode forms and surrounding/repeated whitespace are normalized
+    :return: the lookup key
+    """
+    if name is None:
+        return None
+    if normalize:
+        name = _WHITESPACE.sub(" ", unicodedata.normalize('NFKC', name)).strip()
+    if not case_sensitive:
+        name = name.casefold()
+    return name
+
+
+class NameIndex(object):
+    """
+    This class maps the names of one collection to their ids.
+    """
+
+    def __init__(self, objects, case_sensitive=True, normalize=False):
+        """
+        Constructor
+        :param objects: iterable of objects with name and id attributes
+        :param case_sensitive: if False names are compared case insensitive
+        :param normalize: if True unicode forms and whitespace are normalized
+        """
+        self.case_sensitive = case_sensitive
+        self.normalize = normalize
+        self.ids = {}
+        for obj in objects:
+            # like a linear search the first object with a name wins
+            self.ids.setdefault(normalize_name(obj.name, case_sensitive, normalize), obj.id)
+
+    def lookup(self, name):
+        """
+        looks up the id for a name
+        :param name: the name to search for
+        :return: the id if the name was found; None if not
+        """
+        return self.ids.get(normalize_name(name, self.case_sensitive, self.normalize))
+
+
+class NameIndexCache(object):
+    """
+    This class caches NameIndex objects per (budget, collection) with TTL and LRU eviction.
+    """
+
+    def __init__(self, ttl=300, max_entries=64, case_sensitive=True, normalize=False):
+        """
+        Constructor
+        :param ttl: seconds an index stays valid; None for no expiry
+        :param max_entries: maximum number of indexes kept; the least recently used is evicted
+        :param case_sensitive: if False names are compared case insensitive
+        :param normalize: if True unicode forms and whitespace are normalized
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.case_sensitive = case_sensitive
+        self.normalize = normalize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, budget_id, collection, loader):
+        """
+        returns the index for a collection, loading it if missing or expired
+        :param budget_id: id of the budget the collection belongs to (None for budgets)
+        :param collection: collection name e.g. 'payees'
+        :param loader: function without arguments returning the objects of the collection
+        :return: the NameIndex
+        """
+        key = (budget_id, collection)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self._entries.move_to_end(key)
+                return entry[1]
+        index = NameIndex(loader() or [], self.case_sensitive, self.normalize)
+        with self._lock:
+            self._entries[key] = (None if self.ttl is None else now + self.ttl, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def invalidate(self, budget_id=None, collection=None):
+        """
+        drops cached indexes
+        :param budget_id: optional; only drop indexes of this budget
+        :param collection: optional; only drop indexes of this collection
+        :return: nothing
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if (budget_id is None or key[0] == budget_id) and \
+                        (collection is None or key[1] == collection):
+                    del self._entries[key]
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
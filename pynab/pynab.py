@@ -4,14 +4,45 @@
 This module provides classes for easy handling of the YNAB API.
 """
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from pynab.batch import TransactionBatch
+from pynab.columns import columns_to_frame, to_columns
+from pynab.csv_import import read_csv_transactions, ynab_import_id
+from pynab.duplicates import DuplicateIndex
+from pynab.name_index import NameIndexCache
+from pynab.sync import LocalBudget
+from pynab.writer import TransactionWriter
 from pynab.ynap_api import YNABSession
 
+# per transaction result of YNAB.update_transactions; status is 'updated', 'unchanged' or
+# 'failed', error holds the exception of a failed chunk
+UpdateResult = namedtuple('UpdateResult', ('id', 'status', 'transaction', 'error'))
+
+# marks fields missing in a cached transaction
+_MISSING = object()
+
 
 class YNAB(YNABSession):
     """
     This class is a convenience layer to the direct YNAB API implementation.
     """
 
+    def __init__(self, ynab_access_token, name_index=None, **kwargs):
+        """
+        Constructor
+        :param ynab_access_token: the personal access token for the YNAB API
+        :param name_index: optional; NameIndexCache used by the get_*_id helpers. If not set
+                a case sensitive cache with a TTL of 5 minutes is used
+        :param kwargs: optional; further arguments for YNABSession
+        """
+        super().__init__(ynab_access_token, **kwargs)
+        # budget id -> LocalBudget kept up to date by sync()
+        self.local_budgets = {}
+        # cached name -> id indexes for the get_*_id helpers
+        self.name_index = NameIndexCache() if name_index is None else name_index
+
     # pylint: disable-msg=too-many-arguments
     @staticmethod
     def build_transaction_json(account_id,
@@ -73,6 +104,63 @@ class YNAB(YNABSession):
             result['transactions'].append(single_transaction['transaction'])
         return result
 
+    def _load_names(self, budget_id, collection):
+        """
+        internal helper to download the objects of a collection for the name index
+        :param budget_id: budget id the collection belongs to (None for budgets)
+        :param collection: 'budgets', 'accounts', 'payees' or 'categories'
+        :return: list of objects with name and id attributes
+        """
+        if collection == 'budgets':
+            return self.get_budgets()
+        if collection == 'accounts':
+            return self.get_accounts(budget_id)
+        if collection == 'payees':
+            return self.get_payees(budget_id)
+        if collection == 'categories':
+            return [category
+                    for category_group in self.get_categories(budget_id) or []
+                    for category in category_group.categories]
+        raise Exception("unknown collection: " + collection)
+
+    # pylint: disable-msg=too-many-arguments
+    def transaction_writer(self, budget_id, max_batch=500, max_delay=5.0, max_pending=5000):
+        """
+        creates a write-behind queue posting transactions in bulk, see TransactionWriter
+        Use it as context manager to flush on exit:
+            with ynab.transaction_writer(budget_id) as writer:
+                future = writer.submit(ynab.build_transaction_json(...))
+        :param budget_id: the budget id which the transactions are for
+        :param max_batch: number of waiting transactions triggering a flush
+        :param max_delay: seconds the oldest waiting transaction waits at most
+        :param max_pending: number of waiting transactions at which submit blocks
+        :return: the TransactionWriter
+        """
+        return TransactionWriter(self, budget_id, max_batch, max_delay, max_pending)
+    # pylint: enable-msg=too-many-arguments
+
+    def resolve_names(self, budget_id, collection, names):
+        """
+        resolves many names of one collection with at most one download
+        :param budget_id: budget id the collection belongs to (None for budgets)
+        :param collection: 'budgets', 'accounts', 'payees' or 'categories'
+        :param names: iterable of names to search for
+        :return: dictionary name -> id (None for names which were not found)
+        :throws: does not catch exceptions from the get_* calls
+        """
+        index = self.name_index.get(budget_id, collection,
+                                    lambda: self._load_names(budget_id, collection))
+        return {name: index.lookup(name) for name in names}
+
+    def invalidate_names(self, budget_id=None, collection=None):
+        """
+        drops cached name indexes, e.g. after names have been changed in YNAB
+        :param budget_id: optional; only drop indexes of this budget
+        :param collection: optional; only drop indexes of this collection
+        :return: nothing
+        """
+        self.name_index.invalidate(budget_id, collection)
+
     def get_budget_id(self, budget_name):
         """
         retrieves the budget id from budget name
@@ -80,12 +168,7 @@ class YNAB(YNABSession):
         :return: budget id if the budget was found; None if not
         :throws: does not catch exceptions from get_budgets()
         """
-        # get the budgets from ynab
-        budgets = self.get_budgets()
-        results = [budget.id for budget in budgets if budget.name == budget_name]
-        if not results:
-            return None
-        return results[0]
+        return self.resolve_names(None, 'budgets', [budget_name])[budget_name]
 
     def get_account_id(self, budget_id, account_name):
         """
@@ -95,12 +178,7 @@ class YNAB(YNABSession):
         :return: account id if the account was found; None if not
         :throws: does not catch exceptions from get_accounts()
         """
-        # get the accounts from YNAb
-        accounts = self.get_accounts(budget_id)
-        results = [account.id for account in accounts if account.name == account_name]
-        if not results:
-            return None
-        return results[0]
+        return self.resolve_names(budget_id, 'accounts', [account_name])[account_name]
 
     def get_payee_id(self, budget_id, payee_name):
         """
@@ -110,12 +188,7 @@ class YNAB(YNABSession):
         :return: payee id if the payee was found; None if not
         :throws: does not catch exceptions from get_payees()
         """
-        # get the payees from ynab
-        payees = self.get_payees(budget_id)
-        results = [payee.id for payee in payees if payee.name == payee_name]
-        if not results:
-            return None
-        return results[0]
+        return self.resolve_names(budget_id, 'payees', [payee_name])[payee_name]
 
     def get_category_id(self, budget_id, category_name):
         """
@@ -125,26 +198,249 @@ class YNAB(YNABSession):
         :return: category id if the category was found; None if not
         :throws: does not catch exceptions from get_categories()
         """
-        # get the categories from ynab
-        category_groups = self.get_categories(budget_id)
-        results = [category.id
-                   for category_group in category_groups
-                   for category in category_group.categories
-                   if category.name == category_name]
-        if not results:
-            return None
-        return results[0]
+        return self.resolve_names(budget_id, 'categories', [category_name])[category_name]
 
-    def import_csv(self, budget_id, account_id, csv_filename):
+    def transactions_columns(self, budget_id, account_id=None, since_date=None,
+                             flatten_subtransactions=True):
+        """
+        retrieves transactions decoded into typed column arrays, see columns.to_columns
+        :param budget_id: the budget the transactions belong to
+        :param account_id: optional; only transactions of this account are retrieved
+        :param since_date: optional; limit the retrieved data to transactions since this date
+        :param flatten_subtransactions: if True split transactions are replaced by their
+                subtransactions
+        :return: dictionary column name -> array
+        :throws: does not catch exceptions from the get_transactions* calls
+        """
+        if account_id is None:
+            transactions = self.iter_transactions(budget_id, since_date)
+        else:
+            transactions = self.get_transactions_for_account(budget_id, account_id,
+                                                             since_date) or []
+        return to_columns(transactions, flatten_subtransactions)
+
+    def transactions_frame(self, budget_id, account_id=None, since_date=None,
+                           flatten_subtransactions=True):
+        """
+        retrieves transactions as pandas DataFrame with categorical id columns
+        :param budget_id: the budget the transactions belong to
+        :param account_id: optional; only transactions of this account are retrieved
+        :param since_date: optional; limit the retrieved data to transactions since this date
+        :param flatten_subtransactions: if True split transactions are replaced by their
+                subtransactions
+        :return: the DataFrame
+        :throws: does not catch exceptions from the get_transactions* calls
+        """
+        return columns_to_frame(self.transactions_columns(budget_id, account_id, since_date,
+                                                          flatten_subtransactions))
+
+    @staticmethod
+    def _changed_fields(edit, original):
+        """
+        internal helper reducing an edit to the fields differing from the cached transaction
+        :param edit: dictionary with 'id' and the fields to be set
+        :param original: the cached transaction object or None if unknown
+        :return: dictionary with 'id' and the changed fields; None if nothing changed
+        """
+        if original is None:
+            return dict(edit)
+        changed = {key: value for key, value in edit.items()
+                   if key == 'id' or getattr(original, key, _MISSING) != value}
+        return changed if len(changed) > 1 else None
+
+    def update_transactions(self, budget_id, edits, originals=None):
+        """
+        updates many transactions with as few requests as possible. Only fields differing
+        from the cached copy are sent; the edits are sent in chunks of bulk_chunk_size through
+        the multi-transaction update endpoint using up to bulk_workers threads.
+        :param budget_id: the budget id which these transactions are for
+        :param edits: iterable of dictionaries with 'id' and the fields to be set,
+                e.g. {'id': ..., 'category_id': ...}; every id may appear only once
+        :param originals: optional; dictionary id -> transaction object to diff against, it is
+                not changed. If not set the local copy of sync() is used if the budget has been
+                synced; that copy is updated with the returned transactions
+        :return: list of UpdateResult in the order of the edits
+        :throws: ValueError if an id appears more than once in edits
+        """
+        edits = list(edits)
+        ids = [edit['id'] for edit in edits]
+        if len(set(ids)) != len(ids):
+            raise ValueError("duplicate transaction ids in edits: " +
+                             ", ".join(sorted({i for i in ids if ids.count(i) > 1})))
+        local_budget = self.local_budgets.get(budget_id)
+        if originals is None:
+            originals = {} if local_budget is None else local_budget.entities['transactions']
+        results = {}
+        changes = []
+        for edit in edits:
+            change = self._changed_fields(edit, originals.get(edit['id']))
+            if change is None:
+                results[edit['id']] = UpdateResult(edit['id'], 'unchanged',
+                                                   originals[edit['id']], None)
+            else:
+                changes.append(change)
+        for chunk, result, error in self._dispatch_chunks(
+                lambda chunk: self.patch_transactions(budget_id, {'transactions': chunk}),
+                changes):
+            updated = {} if error is not None else \
+                {transaction.id: transaction for transaction in result.transactions}
+            # later calls are diffed against what YNAB stores now
+            if local_budget is not None:
+                local_budget.merge_entity('transactions', list(updated.values()))
+            for change in chunk:
+                if error is not None:
+                    results[change['id']] = UpdateResult(change['id'], 'failed', None, error)
+                else:
+                    results[change['id']] = UpdateResult(change['id'], 'updated',
+                                                         updated.get(change['id']), None)
+        return [results[edit['id']] for edit in edits]
+
+    def fetch_all_budgets(self, concurrency=4, budget_ids=None, decode_pool=None):
+        """
+        downloads full budget exports in parallel over the connection pool of the session.
+        All requests pass the rate limiter of the session.
+        :param concurrency: optional; number of budgets downloaded at the same time
+        :param budget_ids: optional; ids of the budgets to download. If not set all budgets
+                are downloaded
+        :param decode_pool: optional; decode_pool.DecodePool. If set the exports are decoded
+                in its worker processes instead of this process
+        :return: yields (budget, server_knowledge) tuples in the order the downloads complete;
+                 with decode_pool decode_pool.DecodedBudget objects. A budget which was not
+                 found gives None
+        :throws: does not catch exceptions from get_budgets(); pending downloads are cancelled
+        """
+        if budget_ids is None:
+            budget_ids = [budget.id for budget in self.get_budgets()]
+        if decode_pool is None:
+            fetch = self.get_budgets
+        else:
+            def fetch(budget_id):
+                body = self.get_budget_export(budget_id)
+                # like get_budgets a budget which was not found gives None
+                return None if body is None else decode_pool.submit(body).result()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = [executor.submit(fetch, budget_id) for budget_id in budget_ids]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def build_duplicate_index(self, budget_id, since_date=None, backend=None, fingerprints=False):
+        """
+        builds a duplicate index from the transactions of a budget, see import_csv
+        :param budget_id: the budget whose transactions are indexed
+        :param since_date: optional; only index transactions since this date, e.g. the first
+                date of the file to be imported
+        :param backend: optional; backend of duplicates.DuplicateIndex
+        :param fingerprints: optional; if True transactions without import id are indexed
+                under their YNAB scheme id
+        :return: the DuplicateIndex
+        :throws: does not catch exceptions from iter_transactions()
+        """
+        duplicate_index = DuplicateIndex(backend, fingerprints)
+        duplicate_index.add_transactions(self.iter_transactions(budget_id, since_date))
+        return duplicate_index
+
+    def sync(self, budget_id):
+        """
+        brings the local copy of a budget up to date. The first call downloads the full budget,
+        later calls only fetch the entities changed since the previous call and merge them.
+        :param budget_id: id of the budget to be synced
+        :return: 2 values are returned: the LocalBudget, dictionary entity name -> list of
+                 (old, new) tuples describing the merged changes
+        :throws: does not catch exceptions from get_budgets(); an exception is raised if the
+                 budget was not found
+        """
+        local_budget = self.local_budgets.get(budget_id)
+        if local_budget is None:
+            local_budget = LocalBudget(budget_id)
+            self.local_budgets[budget_id] = local_budget
+        result = self.get_budgets(budget_id, local_budget.server_knowledge)
+        if result is None:
+            raise Exception("budget not found: " + budget_id)
+        budget, server_knowledge = result
+        return local_budget, local_budget.merge(budget, server_knowledge)
+
+    # pylint: disable-msg=too-many-arguments
+    def import_csv(self, budget_id, account_id, csv_filename, chunk_size=1000, date_format=None,
+                   decimal_separator='.', duplicate_index=None):
         """
         imports a csv like the website does. requires same csv format as apps.youneedabudget.com
+        The file is streamed row by row and posted in chunks of chunk_size transactions, so
+        memory does not grow with the file size. Import ids follow the YNAB scheme
+        YNAB:[milliunit amount]:[iso date]:[occurrence], so importing a file again only skips.
         :param budget_id: the budget the transactions should be imported to
         :param account_id: the account the transactions should be imported to
         :param csv_filename: filename of the csv file containing the transactions
+        :param chunk_size: optional; number of transactions per bulk request
+        :param date_format: optional; strptime format of the Date column
+        :param decimal_separator: optional; decimal separator of the amount columns
+        :param duplicate_index: optional; duplicates.DuplicateIndex. Rows with known import ids
+                are skipped without sending them and posted import ids are added to it
         :return: 2 values are returned: amount_imported, amount_skipped
         :throws: if an error occurs an exception is raised
         """
-        raise Exception("NOT YET IMPLEMENTED")
+        transactions = self._csv_transactions(budget_id, account_id, csv_filename, date_format,
+                                              decimal_separator)
+        imported = 0
+        skipped = 0
+        while True:
+            chunk = TransactionBatch()
+            chunk.extend(islice(transactions, chunk_size))
+            if not len(chunk):
+                return imported, skipped
+            if duplicate_index is not None:
+                known = duplicate_index.known(account_id, chunk.import_id)
+                if any(known):
+                    skipped += sum(known)
+                    chunk = chunk.compress([not duplicate for duplicate in known])
+                    if not len(chunk):
+                        continue
+            result = self.post_transaction_bulk(budget_id, chunk)
+            if result is None:
+                skipped += len(chunk)
+            else:
+                imported += len(result.transaction_ids)
+                skipped += len(result.duplicate_import_ids)
+            if duplicate_index is not None:
+                duplicate_index.add(account_id, chunk.import_id)
+    # pylint: enable-msg=too-many-arguments
+
+    # pylint: disable-msg=too-many-arguments
+    def _csv_transactions(self, budget_id, account_id, csv_filename, date_format,
+                          decimal_separator):
+        """
+        generator turning the rows of a csv file into transactions
+        :param budget_id: the budget the transactions should be imported to
+        :param account_id: the account the transactions should be imported to
+        :param csv_filename: filename of the csv file containing the transactions
+        :param date_format: strptime format of the Date column or None
+        :param decimal_separator: decimal separator of the amount columns
+        :return: yields tuples of the arguments of build_transaction_json
+        """
+        occurrences = {}
+        for row in read_csv_transactions(csv_filename, date_format, decimal_separator):
+            # unknown payees are sent by name and created by YNAB
+            payee_id = None
+            if row.payee is not None:
+                payee_id = self.resolve_names(budget_id, 'payees', [row.payee])[row.payee]
+            category_id = None
+            if row.category is not None:
+                category_id = self.resolve_names(budget_id, 'categories',
+                                                 [row.category])[row.category]
+            yield (account_id,
+                   row.date,
+                   row.amount,
+                   payee_id,
+                   None if payee_id is not None else row.payee,
+                   category_id,
+                   row.memo,
+                   'cleared',
+                   False,
+                   None,
+                   ynab_import_id(row.amount, row.date, occurrences))
+    # pylint: enable-msg=too-many-arguments
 
 
 if __name__ == '__main__':
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+
+"""
+This module provides local queries over transactions which were fetched once, using secondary
+indexes instead of further API calls.
+"""
+
+import bisect
+
+# fields with an equality index; their values are taken from the subtransaction of a split
+# where it has them (not None) and from the transaction otherwise
+INDEXED_FIELDS = ('account_id', 'category_id', 'payee_id', 'cleared', 'flag_color', 'approved')
+
+# fields a subtransaction carries itself; all other fields are inherited from its transaction
+_SUBTRANSACTION_FIELDS = ('id', 'amount', 'memo', 'payee_id', 'payee_name', 'category_id',
+                          'category_name', 'transfer_account_id', 'deleted')
+
+
+def _value(row, field):
+    """
+    reads a field of an indexed row
+    :param row: (transaction, subtransaction or None) tuple
+    :param field: the field name
+    :return: the value; None if the object has no such field
+    """
+    transaction, subtransaction = row
+    if subtransaction is not None and field in _SUBTRANSACTION_FIELDS:
+        # YNAB sends null e.g. for the payee of most subtransactions
+        value = getattr(subtransaction, field, None)
+        if value is not None:
+            return value
+    if field == 'month':
+        return transaction.date[:7]
+    return getattr(transaction, field, None)
+
+
+class Filter(object):
+    """
+    This class is the base of the query filters. Filters are combined with & (and), | (or)
+    and ~ (not).
+    """
+
+    def select(self, index, candidates):
+        """
+        narrows down the rows of an index
+        :param index: the TransactionIndex
+        :param candidates: set of row ids to narrow down; None stands for all rows
+        :return: set of row ids matching the filter
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        """
+        :return: filter matching rows matching both filters
+        """
+        return _And(self, other)
+
+    def __or__(self, other):
+        """
+        :return: filter matching rows matching any of both filters
+        """
+        return _Or(self, other)
+
+    def __invert__(self):
+        """
+        :return: filter matching rows not matching this filter
+        """
+        return _Not(self)
+
+
+class _And(Filter):
+    """
+    rows matching both filters; the second filter only looks at the rows of the first one
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def select(self, index, candidates):
+        return self.second.select(index, self.first.select(index, candidates))
+
+
+class _Or(Filter):
+    """
+    rows matching any of both filters
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def select(self, index, candidates):
+        return self.first.select(index, candidates) | self.second.select(index, candidates)
+
+
+class _Not(Filter):
+    """
+    rows not matching a filter
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def select(self, index, candidates):
+        rows = set(index.rows) if candidates is None else candidates
+        return rows - self.inner.select(index, candidates)
+
+
+class Equals(Filter):
+    """
+    This filter matches rows whose field has one of the given values, e.g.
+    Equals('account_id', account_id) or Equals('cleared', 'cleared', 'reconciled').
+    Fields of INDEXED_FIELDS are answered from their index, others by a scan.
+    """
+
+    def __init__(self, field, *values):
+        """
+        Constructor
+        :param field: the field name
+        :param values: the accepted values
+        """
+        self.field = field
+        self.values = values
+
+    def select(self, index, candidates):
+        values = index.indexes.get(self.field)
+        if values is None:
+            rows = index.rows if candidates is None else candidates
+            return {row_id for row_id in rows
+                    if _value(index.rows[row_id], self.field) in self.values}
+        matches = set()
+        for value in self.values:
+            matches.update(values.get(value, ()))
+        return matches if candidates is None else matches & candidates
+
+
+class DateRange(Filter):
+    """
+    This filter matches rows dated between start and end (both inclusive), answered from the
+    sorted date index.
+    """
+
+    def __init__(self, start=None, end=None):
+        """
+        Constructor
+        :param start: optional; first iso date e.g. '2018-01-01'. If not set there is no limit
+        :param end: optional; last iso date. If not set there is no limit
+        """
+        self.start = start
+        self.end = end
+
+    def select(self, index, candidates):
+        dates = index.dates
+        low = 0 if self.start is None else bisect.bisect_left(dates, (self.start,))
+        high = len(dates) if self.end is None else bisect.bisect_left(dates, (self.end + '~',))
+        matches = {row_id for _, row_id in dates[low:high]}
+        return matches if candidates is None else matches & candidates
+
+
+class Where(Filter):
+    """
+    This filter matches rows for which a function returns True, e.g.
+    Where('amount', lambda amount: amount < -100000). It scans the candidate rows, so combine it
+    with indexed filters first: Equals(...) & Where(...).
+    """
+
+    def __init__(self, field, function):
+        """
+        Constructor
+        :param field: the field name passed to function; 'month' gives 'YYYY-MM'
+        :param function: function taking the value and returning True for matching rows
+        """
+        self.field = field
+        self.function = function
+
+    def select(self, index, candidates):
+        rows = index.rows if candidates is None else candidates
+        return {row_id for row_id in rows
+                if self.function(_value(index.rows[row_id], self.field))}
+
+
+class TransactionIndex(object):
+    """
+    This class indexes transactions in memory and answers queries locally.
+    A split transaction is indexed as its subtransactions, which inherit date, account, cleared,
+    approved and flag_color as well as payee and other fields they leave empty, so sums by
+    category are correct. select returns the transactions.
+    Transactions of a budget export (or LocalBudget) carry no subtransactions; these are passed
+    separately and joined to their transaction by transaction_id.
+    """
+
+    def __init__(self, transactions=(), subtransactions=()):
+        """
+        Constructor
+        :param transactions: optional; transaction objects as returned by get_transactions,
+                iter_transactions or a budget export
+        :param subtransactions: optional; subtransaction objects of a budget export, e.g.
+                LocalBudget.subtransactions
+        """
+        # row id -> (transaction, subtransaction or None)
+        self.rows = {}
+        # transaction id -> indexed transaction
+        self._transactions = {}
+        # transaction id -> row ids of the transaction
+        self._rows_of = {}
+        # transaction id -> {subtransaction id: subtransaction} received apart from a transaction
+        self._subtransactions = {}
+        # field -> value -> set of row ids
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+        # sorted list of (date, row id)
+        self.dates = []
+        self.update(transactions, subtransactions)
+
+    def __len__(self):
+        """
+        number of indexed transactions
+        :return: the number of transactions
+        """
+        return len(self._rows_of)
+
+    def update(self, transactions, subtransactions=()):
+        """
+        adds or replaces transactions; deleted transactions are removed
+        :param transactions: iterable of transaction objects
+        :param subtransactions: optional; iterable of subtransaction objects of a budget export;
+                deleted ones are removed
+        :return: nothing
+        """
+        changed = set()
+        for subtransaction in subtransactions:
+            self._store_subtransaction(subtransaction,
+                                       getattr(subtransaction, 'deleted', False))
+            changed.add(subtransaction.transaction_id)
+        for transaction in transactions:
+            self.remove(transaction.id)
+            if getattr(transaction, 'deleted', False):
+                self._subtransactions.pop(transaction.id, None)
+            else:
+                self._add(transaction)
+            changed.discard(transaction.id)
+        self._reindex(changed)
+
+    def apply(self, changes, subtransaction_changes=()):
+        """
+        applies the transaction changes of a sync, see YNAB.sync and LocalBudget.merge
+        :param changes: list of (old, new) tuples; new is None for deleted transactions
+        :param subtransaction_changes: optional; the same for the subtransactions
+        :return: nothing
+        """
+        changed = set()
+        for old, new in subtransaction_changes:
+            self._store_subtransaction(old if new is None else new, new is None)
+            changed.add((old if new is None else new).transaction_id)
+        for old, new in changes:
+            if new is None:
+                self.remove(old.id)
+                self._subtransactions.pop(old.id, None)
+            else:
+                self.remove(new.id)
+                self._add(new)
+                changed.discard(new.id)
+        self._reindex(changed)
+
+    def _store_subtransaction(self, subtransaction, deleted):
+        """
+        internal helper keeping a subtransaction received apart from its transaction
+        :param subtransaction: the subtransaction object
+        :param deleted: True if the subtransaction is to be forgotten
+        :return: nothing
+        """
+        subtransactions = self._subtransactions.setdefault(subtransaction.transaction_id, {})
+        if deleted:
+            subtransactions.pop(subtransaction.id, None)
+        else:
+            subtransactions[subtransaction.id] = subtransaction
+
+    def _reindex(self, transaction_ids):
+        """
+        internal helper indexing transactions again after their subtransactions changed
+        :param transaction_ids: ids of the transactions
+        :return: nothing
+        """
+        for transaction_id in transaction_ids:
+            transaction = self._transactions.get(transaction_id)
+            if transaction is not None:
+                self.remove(transaction_id)
+                self._add(transaction)
+
+    def remove(self, transaction_id):
+        """
+        removes a transaction
+        :param transaction_id: id of the transaction
+        :return: nothing
+        """
+        self._transactions.pop(transaction_id, None)
+        for row_id in self._rows_of.pop(transaction_id, ()):
+            row = self.rows.pop(row_id)
+            for field, values in self.indexes.items():
+                value = _value(row, field)
+                ids = values.get(value)
+                ids.discard(row_id)
+                if not ids:
+                    del values[value]
+            position = bisect.bisect_left(self.dates, (row[0].date, row_id))
+            del self.dates[position]
+
+    def _add(self, transaction):
+        """
+        internal helper indexing a transaction which is not indexed yet
+        :param transaction: the transaction object
+        :return: nothing
+        """
+        subtransactions = getattr(transaction, 'subtransactions', None)
+        if subtransactions is None:
+            # budget export: the subtransactions are a separate collection
+            subtransactions = self._subtransactions.get(transaction.id, {}).values()
+        subtransactions = [subtransaction for subtransaction in subtransactions
+                           if not getattr(subtransaction, 'deleted', False)]
+        rows = [(subtransaction.id, (transaction, subtransaction))
+                for subtransaction in subtransactions] or [(transaction.id, (transaction, None))]
+        self._transactions[transaction.id] = transaction
+        self._rows_of[transaction.id] = [row_id for row_id, _ in rows]
+        for row_id, row in rows:
+            self.rows[row_id] = row
+            for field, values in self.indexes.items():
+                values.setdefault(_value(row, field), set()).add(row_id)
+            bisect.insort(self.dates, (transaction.date, row_id))
+
+    def _matching(self, query):
+        """
+        internal helper returning the rows matching a filter
+        :param query: Filter or None for all rows
+        :return: iterable of row ids
+        """
+        return self.rows if query is None else query.select(self, None)
+
+    def select(self, query=None):
+        """
+        returns the transactions matching a filter
+        :param query: optional; Filter e.g. Equals('account_id', a) & DateRange('2018-01-01').
+                If not set all transactions are returned
+        :return: list of transaction objects ordered by date
+        """
+        transactions = {}
+        for row_id in self._matching(query):
+            transaction = self.rows[row_id][0]
+            transactions[transaction.id] = transaction
+        return sorted(transactions.values(), key=lambda transaction: transaction.date)
+
+    def total(self, query=None):
+        """
+        sums the amounts of the rows matching a filter
+        :param query: optional; Filter. If not set all rows are summed
+        :return: the sum in milliunits
+        """
+        return sum(_value(self.rows[row_id], 'amount') for row_id in self._matching(query))
+
+    def group_sum(self, by, query=None):
+        """
+        sums the amounts of the rows matching a filter per group
+        :param by: field name or tuple of field names to group by, e.g. 'category_id' or
+                ('month', 'category_id'); 'month' groups by 'YYYY-MM'
+        :param query: optional; Filter. If not set all rows are summed
+        :return: dictionary group value (tuple for several fields) -> sum in milliunits
+        """
+        fields = (by,) if isinstance(by, str) else tuple(by)
+        sums = {}
+        for row_id in self._matching(query):
+            row = self.rows[row_id]
+            key = tuple(_value(row, field) for field in fields)
+            if len(fields) == 1:
+                key = key[0]
+            sums[key] = sums.get(key, 0) + _value(row, 'amount')
+        return sums
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a client side token bucket limiter for the YNAB request quota.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# name of the response header reporting the quota usage as '<used>/<limit>'
+RATE_LIMIT_HEADER = 'X-Rate-Limit'
+
+
+class RateLimitError(Exception):
+    """
+    This exception is raised by a non blocking RateLimiter if the quota is used up.
+    """
+
+    def __init__(self, wait):
+        """
+        Constructor
+        :param wait: seconds until the next request would be allowed
+        """
+        super().__init__("rate limit exhausted, next request in %.1f s" % wait)
+        self.wait = wait
+
+
+class RateLimiter(object):
+    """
+    This class implements a token bucket refilled at limit requests per period. It is shared
+    by all calls of a session and optionally by several processes through a locked state file.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, limit=200, period=3600.0, state_file=None, block=True, sleep=time.sleep):
+        """
+        Constructor
+        :param limit: requests allowed per period (YNAB: 200 per hour and token)
+        :param period: length of the period in seconds
+        :param state_file: optional; file holding the bucket state to share it across processes
+        :param block: if True acquire() waits for a free token, else it raises RateLimitError
+        :param sleep: function used to wait, replaceable for tests
+        """
+        if state_file is not None and fcntl is None:
+            raise Exception("sharing a RateLimiter across processes requires fcntl")
+        self.limit = limit
+        self.period = float(period)
+        self.state_file = state_file
+        self.block = block
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._memory = {'tokens': float(limit), 'timestamp': time.time()}
+    # pylint: enable-msg=too-many-arguments
+
+    @contextmanager
+    def _state(self):
+        """
+        internal helper giving exclusive access to the bucket state
+        :return: yields the state dictionary; changes are saved on exit
+        """
+        with self._lock:
+            if self.state_file is None:
+                yield self._memory
+                return
+            with open(self.state_file, 'a+', encoding='utf-8') as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_EX)
+                try:
+                    state_file.seek(0)
+                    content = state_file.read()
+                    state = json.loads(content) if content else dict(self._memory)
+                    yield state
+                    state_file.seek(0)
+                    state_file.truncate()
+                    state_file.write(json.dumps(state))
+                    state_file.flush()
+                    os.fsync(state_file.fileno())
+                finally:
+                    fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def _refill(self, state):
+        """
+        internal helper adding the tokens earned since the last update
+        :param state: the bucket state
+        :return: nothing
+        """
+        now = time.time()
+        elapsed = max(0.0, now - state['timestamp'])
+        state['tokens'] = min(float(self.limit),
+                              state['tokens'] + elapsed * self.limit / self.period)
+        state['timestamp'] = now
+
+    def try_acquire(self):
+        """
+        takes one token for a request if one is left, never waits
+        :return: 0.0 if a token was taken, else the seconds until the next token is available
+        """
+        with self._state() as state:
+            self._refill(state)
+            if state['tokens'] >= 1.0:
+                state['tokens'] -= 1.0
+                return 0.0
+            return (1.0 - state['tokens']) * self.period / self.limit
+
+    def acquire(self):
+        """
+        takes one token for a request, waiting for it if necessary
+        :return: nothing
+        :throws: RateLimitError if the limiter does not block and no token is left
+        """
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            if not self.block:
+                raise RateLimitError(wait)
+            self._sleep(wait)
+
+    def update(self, header_value):
+        """
+        synchronizes the bucket with the quota usage reported by YNAB
+        :param header_value: value of the X-Rate-Limit header e.g. '36/200'
+        :return: nothing
+        """
+        try:
+            used, limit = (int(part) for part in header_value.split('/'))
+        except (AttributeError, ValueError):
+            return
+        with self._state() as state:
+            self._refill(state)
+            self.limit = limit
+            state['tokens'] = float(max(0, limit - used))
+
+    def exhaust(self):
+        """
+        empties the bucket, e.g. after YNAB answered with 429
+        :return: nothing
+        """
+        with self._state() as state:
+            self._refill(state)
+            state['tokens'] = 0.0
+
+    @property
+    def remaining(self):
+        """
+        number of requests which can be sent right now
+        :return: the remaining requests (int)
+        """
+        with self._state() as state:
+            self._refill(state)
+            return int(state['tokens'])
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
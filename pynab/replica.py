@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a persistent local replica of one YNAB budget backed by SQLite.
+"""
+
+import json
+import sqlite3
+from pynab.models import build_model, model_to_data
+from pynab.sync import BUDGET_ENTITIES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    entity TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (entity, id)
+);
+CREATE TABLE IF NOT EXISTS knowledge (
+    entity TEXT PRIMARY KEY,
+    server_knowledge INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS info (
+    budget_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class BudgetReplica(object):
+    """
+    This class keeps a full copy of one budget in a SQLite database. Reads are answered
+    locally; refresh() only pulls the entities changed since the stored server_knowledge.
+    """
+
+    def __init__(self, ynab_session, budget_id, filename):
+        """
+        Constructor
+        Opening an existing replica does not talk to YNAB.
+        :param ynab_session: YNABSession used to refresh the replica
+        :param budget_id: id of the budget to be replicated
+        :param filename: filename of the SQLite database (created if it does not exist)
+        """
+        self.ynab_session = ynab_session
+        self.budget_id = budget_id
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        """
+        closes the SQLite database
+        :return: nothing
+        """
+        self.connection.close()
+
+    def __enter__(self):
+        """
+        context manager entry
+        :return: the replica itself
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager exit; closes the SQLite database
+        """
+        self.close()
+
+    def server_knowledge(self, entity=None):
+        """
+        returns the server knowledge the replica is up to date with
+        :param entity: optional; entity name e.g. 'transactions'. If not set the lowest
+                knowledge of all entity types is returned
+        :return: the server knowledge; None if the replica has never been refreshed
+        """
+        if entity is None:
+            row = self.connection.execute(
+                "SELECT MIN(server_knowledge), COUNT(*) FROM knowledge").fetchone()
+            return row[0] if row[1] == len(BUDGET_ENTITIES) else None
+        row = self.connection.execute("SELECT server_knowledge FROM knowledge WHERE entity = ?",
+                                      (entity,)).fetchone()
+        return None if row is None else row[0]
+
+    def refresh(self):
+        """
+        brings the replica up to date. The first refresh downloads the full budget, later
+        refreshes only the changes since the stored server knowledge (a single request).
+        :return: dictionary entity name -> number of changed (or deleted) objects
+        :throws: does not catch exceptions from get_budgets(); an exception is raised if the
+                 budget was not found
+        """
+        result = self.ynab_session.get_budgets(self.budget_id, self.server_knowledge(),
+                                               lazy=True)
+        if result is None:
+            raise Exception("budget not found: " + self.budget_id)
+        budget, server_knowledge = result
+        # entity types missing in the export did not change
+        changes = dict.fromkeys(BUDGET_ENTITIES, 0)
+        info = {}
+        with self.connection:
+            # stored as json, so the decoded data is used without building model objects
+            for name, value in model_to_data(budget).items():
+                if name in BUDGET_ENTITIES:
+                    changes[name] = self._store(name, value or [])
+                else:
+                    info[name] = value
+            self.connection.executemany("INSERT OR REPLACE INTO knowledge VALUES (?, ?)",
+                                        [(name, server_knowledge) for name in BUDGET_ENTITIES])
+            self.connection.execute("INSERT OR REPLACE INTO info VALUES (?, ?)",
+                                    (self.budget_id, json.dumps(info)))
+        return changes
+
+    def _store(self, entity, changed):
+        """
+        writes changed objects of one entity type; deleted objects are removed
+        :param entity: entity name e.g. 'transactions'
+        :param changed: list of changed objects as decoded json data
+        :return: number of changed objects
+        """
+        key = BUDGET_ENTITIES[entity]
+        deleted = []
+        updated = []
+        for obj in changed:
+            if obj.get('deleted', False):
+                deleted.append((entity, obj[key]))
+            else:
+                if entity == 'months':
+                    obj = self._merge_month(obj)
+                updated.append((entity, obj[key], json.dumps(obj)))
+        self.connection.executemany("DELETE FROM entities WHERE entity = ? AND id = ?", deleted)
+        self.connection.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?)", updated)
+        return len(changed)
+
+    def _merge_month(self, month):
+        """
+        merges a month of a delta into the stored month; a delta month only carries the
+        changed categories, so the categories are merged by id and deleted ones are removed
+        :param month: the month as decoded json data
+        :return: the merged month as json data
+        """
+        row = self.connection.execute("SELECT data FROM entities WHERE entity = 'months' AND "
+                                      "id = ?", (month['month'],)).fetchone()
+        if row is None or month.get('categories') is None:
+            return month
+        categories = {category['id']: category
+                      for category in json.loads(row[0]).get('categories') or []}
+        for category in month['categories']:
+            if category.get('deleted', False):
+                categories.pop(category['id'], None)
+            else:
+                categories[category['id']] = category
+        return dict(month, categories=list(categories.values()))
+
+    def get(self, entity, entity_id=None):
+        """
+        reads objects from the replica
+        :param entity: entity name e.g. 'accounts', 'transactions' or 'months'
+        :param entity_id: optional; id (for months the month) of the object to be read.
+                If not set all objects of the entity type are read
+        :return: (list of) object(s); None if entity_id was not found
+        :throws: if the entity name is unknown an exception is raised
+        """
+        if entity not in BUDGET_ENTITIES:
+            raise Exception("unknown entity: " + entity)
+        if entity_id is None:
+            rows = self.connection.execute("SELECT data FROM entities WHERE entity = ?",
+                                           (entity,))
+            return [build_model(json.loads(row[0]), entity) for row in rows]
+        row = self.connection.execute("SELECT data FROM entities WHERE entity = ? AND id = ?",
+                                      (entity, entity_id)).fetchone()
+        return None if row is None else build_model(json.loads(row[0]), entity)
+
+    def get_info(self):
+        """
+        reads the scalar budget attributes (name, currency_format, ...) from the replica
+        :return: budget object without entity collections; None if never refreshed
+        """
+        row = self.connection.execute("SELECT data FROM info WHERE budget_id = ?",
+                                      (self.budget_id,)).fetchone()
+        return None if row is None else build_model(json.loads(row[0]), 'budget')
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a response cache for GET requests of YNABSession with in-memory LRU and
+on-disk (SQLite) backends.
+"""
+
+from collections import OrderedDict, namedtuple
+import hashlib
+import sqlite3
+import threading
+import time
+
+# seconds a response of these endpoints stays fresh; endpoints not listed are not cached
+DEFAULT_TTLS = {
+    'user': 3600,
+    'budgets': 300,
+    'accounts': 60,
+    'categories': 300,
+    'payees': 300,
+    'payee_locations': 3600,
+}
+
+# a cached response; expires is a time.time() timestamp
+CacheEntry = namedtuple('CacheEntry', ('content', 'etag', 'last_modified', 'expires'))
+
+
+class CachedResponse(object):
+    """
+    This class stands in for a requests.Response answered from the cache.
+    """
+
+    def __init__(self, entry):
+        """
+        Constructor
+        :param entry: the CacheEntry
+        """
+        self.status_code = 200
+        self.content = entry.content
+        self.headers = {}
+        self.from_cache = True
+
+
+def cache_key(url, authorization=''):
+    """
+    builds the cache key of a response; responses of different tokens never share an entry,
+    even if sessions of several users share a cache
+    :param url: url part relative to the base url
+    :param authorization: the Authorization header of the session
+    :return: the url followed by '#' and a fingerprint of the Authorization header
+    """
+    return url + '#' + hashlib.sha256(authorization.encode('utf-8')).hexdigest()[:16]
+
+
+def endpoint_of(url):
+    """
+    derives the endpoint name from a request url
+    e.g. 'budgets/<id>/payees' -> 'payees', 'budgets/<id>' -> 'budget', 'budgets' -> 'budgets'
+    :param url: url part relative to the base url, optionally with query string
+    :return: the endpoint name
+    """
+    parts = url.split('?', 1)[0].strip('/').split('/')
+    if len(parts) == 2:
+        return 'budget'
+    if len(parts) % 2:
+        return parts[-1]
+    return parts[-2]
+
+
+class MemoryCacheBackend(object):
+    """
+    This class stores cache entries in memory, evicting the least recently used ones when
+    the total size of the cached bodies exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        """
+        Constructor
+        :param max_bytes: upper bound for the summed size of all cached bodies
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        reads an entry and marks it as recently used
+        :param key: the cache key
+        :return: the CacheEntry; None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        """
+        stores an entry, evicting least recently used entries if needed
+        :param key: the cache key
+        :param entry: the CacheEntry
+        :return: nothing
+        """
+        with self._lock:
+            self._pop(key)
+            if len(entry.content) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self.size += len(entry.content)
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        """
+        internal helper removing an entry; the caller holds the lock
+        :param key: the cache key
+        :return: nothing
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.content)
+
+    def delete(self, key):
+        """
+        removes an entry
+        :param key: the cache key
+        :return: nothing
+        """
+        with self._lock:
+            self._pop(key)
+
+    def delete_prefix(self, prefix):
+        """
+        removes all entries whose key starts with prefix
+        :param prefix: the key prefix; '' removes everything
+        :return: nothing
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._pop(key)
+
+
+class DiskCacheBackend(object):
+    """
+    This class stores cache entries in a SQLite database, evicting the least recently used
+    ones when the total size of the cached bodies exceeds max_bytes.
+    """
+
+    def __init__(self, filename, max_bytes=256 * 1024 * 1024):
+        """
+        Constructor
+        :param filename: filename of the SQLite database (created if it does not exist)
+        :param max_bytes: upper bound for the summed size of all cached bodies
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS responses ("
+                                "key TEXT PRIMARY KEY, content BLOB NOT NULL, etag TEXT, "
+                                "last_modified TEXT, expires REAL NOT NULL, used REAL NOT NULL)")
+
+    def get(self, key):
+        """
+        reads an entry and marks it as recently used
+        :param key: the cache key
+        :return: the CacheEntry; None if not cached
+        """
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT content, etag, last_modified, expires "
+                                          "FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE responses SET used = ? WHERE key = ?",
+                                    (time.time(), key))
+            return CacheEntry(bytes(row[0]), row[1], row[2], row[3])
+
+    def set(self, key, entry):
+        """
+        stores an entry, evicting least recently used entries if needed
+        :param key: the cache key
+        :param entry: the CacheEntry
+        :return: nothing
+        """
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                                    (key, entry.content, entry.etag, entry.last_modified,
+                                     entry.expires, time.time()))
+            size = self.connection.execute(
+                "SELECT COALESCE(SUM(LENGTH(content)), 0) FROM responses").fetchone()[0]
+            rows = self.connection.execute("SELECT key, LENGTH(content) FROM responses "
+                                           "ORDER BY used").fetchall()
+            for old_key, length in rows:
+                if size <= self.max_bytes:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                size -= length
+
+    def delete(self, key):
+        """
+        removes an entry
+        :param key: the cache key
+        :return: nothing
+        """
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        """
+        removes all entries whose key starts with prefix
+        :param prefix: the key prefix; '' removes everything
+        :return: nothing
+        """
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?",
+                                    (len(prefix), prefix))
+
+
+class ResponseCache(object):
+    """
+    This class decides which GET responses are cached and for how long, and invalidates them
+    when the session changes the related budget.
+    """
+
+    def __init__(self, backend=None, ttls=None):
+        """
+        Constructor
+        :param backend: optional; MemoryCacheBackend or DiskCacheBackend. If not set a memory
+                backend bounded to 32 MB is used
+        :param ttls: optional; dictionary endpoint name -> seconds fresh. If not set
+                DEFAULT_TTLS is used
+        """
+        self.backend = MemoryCacheBackend() if backend is None else backend
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+
+    def ttl(self, url):
+        """
+        returns the time to live for responses of an url
+        :param url: url part relative to the base url
+        :return: seconds fresh; None if the url is not cached (e.g. delta requests)
+        """
+        if 'last_knowledge_of_server' in url:
+            return None
+        return self.ttls.get(endpoint_of(url))
+
+    def lookup(self, url, authorization=''):
+        """
+        looks up a cached response
+        :param url: url part relative to the base url
+        :param authorization: optional; the Authorization header of the session
+        :return: 2 values are returned: CacheEntry or None, True if the entry is still fresh
+        """
+        if self.ttl(url) is None:
+            return None, False
+        entry = self.backend.get(cache_key(url, authorization))
+        if entry is None:
+            return None, False
+        return entry, entry.expires > time.time()
+
+    def store(self, url, content, headers, authorization=''):
+        """
+        stores a successful response
+        :param url: url part relative to the base url
+        :param content: the response body as bytes
+        :param headers: the response headers
+        :param authorization: optional; the Authorization header of the session
+        :return: nothing
+        """
+        ttl = self.ttl(url)
+        if ttl is not None:
+            self.backend.set(cache_key(url, authorization), CacheEntry(content, headers.get('ETag'),
+                                             headers.get('Last-Modified'), time.time() + ttl))
+
+    def revalidated(self, url, entry, authorization=''):
+        """
+        marks an entry as fresh again after the server answered 304 Not Modified
+        :param url: url part relative to the base url
+        :param entry: the CacheEntry
+        :param authorization: optional; the Authorization header of the session
+        :return: nothing
+        """
+        self.backend.set(cache_key(url, authorization), entry._replace(expires=time.time() + (self.ttl(url) or 0)))
+
+    def invalidate(self, url=None):
+        """
+        drops entries touched by a change; a change below budgets/<id> drops every entry of
+        that budget and the budget list, for all tokens since budgets can be shared
+        :param url: optional; url part of the changing request. If not set everything is dropped
+        :return: nothing
+        """
+        parts = [] if url is None else url.split('?', 1)[0].strip('/').split('/')
+        if len(parts) < 2 or parts[0] != 'budgets':
+            self.backend.delete_prefix('')
+            return
+        budget_url = 'budgets/' + parts[1]
+        for prefix in ('budgets#', budget_url + '#', budget_url + '/', budget_url + '?'):
+            self.backend.delete_prefix(prefix)
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
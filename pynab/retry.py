@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the retry policy for transient failures of YNAB requests.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import copy
+import random
+import time
+
+# status codes which signal a transient failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def replay_safe(method, json_data):
+    """
+    tells whether a request may be sent again after an unknown outcome
+    GET, PUT and PATCH are idempotent. A POST is only safe if every transaction carries an
+    import_id, because YNAB then reports a replayed transaction as duplicate instead of
+    creating it a second time.
+    :param method: http method e.g. 'POST'
+    :param json_data: json data of the request or a batch.TransactionBatch
+    :return: True if the request can be replayed
+    """
+    if method != 'POST':
+        return True
+    if not isinstance(json_data, dict):
+        # a TransactionBatch carries its import ids as a column
+        import_ids = getattr(json_data, 'import_id', None)
+        return import_ids is not None and all(import_ids)
+    if 'transactions' in json_data:
+        transactions = json_data['transactions']
+    elif 'transaction' in json_data:
+        transactions = [json_data['transaction']]
+    else:
+        return False
+    return all(transaction.get('import_id') for transaction in transactions)
+
+
+class RetryPolicy(object):
+    """
+    This class decides whether and when a failed request is sent again.
+    Delays grow exponentially with full jitter; a Retry-After header takes precedence.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=60.0,
+                 retry_statuses=RETRY_STATUSES, sleep=time.sleep):
+        """
+        Constructor
+        :param max_retries: how often a request is sent again at most
+        :param backoff: base delay in seconds, doubled with every attempt
+        :param max_backoff: upper limit of a single delay in seconds
+        :param retry_statuses: status codes which are retried
+        :param sleep: function used to wait, replaceable for tests
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.sleep = sleep
+    # pylint: enable-msg=too-many-arguments
+
+    def with_max_retries(self, max_retries):
+        """
+        returns a copy of this policy with another retry limit
+        :param max_retries: how often a request is sent again at most
+        :return: RetryPolicy
+        """
+        policy = copy.copy(self)
+        policy.max_retries = max_retries
+        return policy
+
+    def retry_status(self, attempt, status_code, method, json_data):
+        """
+        tells whether a response with this status code is retried
+        429 is always retried since YNAB did not process the request.
+        :param attempt: number of retries done so far
+        :param status_code: status code of the response
+        :param method: http method of the request
+        :param json_data: json data of the request
+        :return: True if the request should be sent again
+        """
+        if attempt >= self.max_retries or status_code not in self.retry_statuses:
+            return False
+        return status_code == 429 or replay_safe(method, json_data)
+
+    def retry_error(self, attempt, sent, method, json_data):
+        """
+        tells whether a request failing with a connection error or timeout is retried
+        :param attempt: number of retries done so far
+        :param sent: False if the request surely did not reach YNAB (e.g. connect timeout)
+        :param method: http method of the request
+        :param json_data: json data of the request
+        :return: True if the request should be sent again
+        """
+        if attempt >= self.max_retries:
+            return False
+        return not sent or replay_safe(method, json_data)
+
+    def delay(self, attempt, retry_after=None):
+        """
+        computes the delay before the next attempt
+        :param attempt: number of retries done so far
+        :param retry_after: optional; value of the Retry-After header (seconds or http date)
+        :return: the delay in seconds
+        """
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def wait(self, attempt, retry_after=None):
+        """
+        waits before the next attempt
+        :param attempt: number of retries done so far
+        :param retry_after: optional; value of the Retry-After header
+        :return: nothing
+        """
+        self.sleep(self.delay(attempt, retry_after))
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+This module provides precomputed monthly rollups of a budget which are maintained
+incrementally from the changes of YNAB.sync.
+"""
+
+from collections import namedtuple
+
+# totals of one category in one month, in milliunits
+CategoryTotals = namedtuple('CategoryTotals', ('budgeted', 'activity', 'balance'))
+
+
+def month_of(date):
+    """
+    returns the month a date belongs to, in the format YNAB uses for months
+    :param date: iso date e.g. '2018-03-31'
+    :return: the first day of the month e.g. '2018-03-01'
+    """
+    return date[:8] + '01'
+
+
+class BudgetRollups(object):
+    """
+    This class holds category x month totals and per account monthly activity and balances.
+    Category totals are taken from the months YNAB sends with a (delta) budget export, since
+    balances follow the carry-over rules of YNAB. Account figures are maintained from the
+    transaction changes by subtracting the old and adding the new version of a transaction.
+    Reads never touch transactions, so they cost O(months x categories) at most.
+    """
+
+    def __init__(self, local_budget=None):
+        """
+        Constructor
+        :param local_budget: optional; LocalBudget (see YNAB.sync) to build the rollups from.
+                If not set the rollups start empty and are filled by apply
+        """
+        # month -> category id -> CategoryTotals
+        self.categories = {}
+        # account id -> month -> sum of the transaction amounts
+        self.account_activity = {}
+        # account id -> balance over all transactions
+        self.account_balances = {}
+        if local_budget is not None:
+            self.apply({name: [(None, obj) for obj in getattr(local_budget, name)]
+                        for name in ('months', 'transactions')})
+
+    def apply(self, changes):
+        """
+        updates the rollups with the changes of a sync
+        :param changes: dictionary entity name -> list of (old, new) tuples as returned by
+                YNAB.sync or LocalBudget.merge; only 'months' and 'transactions' are used
+        :return: nothing
+        """
+        for old, new in changes.get('months', ()):
+            if new is None:
+                self.categories.pop(old.month, None)
+            else:
+                self._merge_month(new)
+        for old, new in changes.get('transactions', ()):
+            if old is not None:
+                self._add_transaction(old, -1)
+            if new is not None:
+                self._add_transaction(new, 1)
+
+    def _merge_month(self, month):
+        """
+        internal helper storing the category totals of a month
+        :param month: month object; a delta only carries the changed categories
+        :return: nothing
+        """
+        totals = self.categories.setdefault(month.month, {})
+        for category in getattr(month, 'categories', None) or []:
+            if getattr(category, 'deleted', False):
+                totals.pop(category.id, None)
+            else:
+                totals[category.id] = CategoryTotals(category.budgeted, category.activity,
+                                                     category.balance)
+
+    def _add_transaction(self, transaction, sign):
+        """
+        internal helper adding (sign 1) or removing (sign -1) a transaction from the account
+        figures
+        :param transaction: the transaction object
+        :param sign: 1 or -1
+        :return: nothing
+        """
+        if getattr(transaction, 'deleted', False):
+            return
+        account_id = transaction.account_id
+        amount = sign * transaction.amount
+        activity = self.account_activity.setdefault(account_id, {})
+        month = month_of(transaction.date)
+        activity[month] = activity.get(month, 0) + amount
+        if not activity[month]:
+            del activity[month]
+        self.account_balances[account_id] = self.account_balances.get(account_id, 0) + amount
+
+    def months(self):
+        """
+        returns the months with category totals
+        :return: sorted list of months e.g. ['2018-01-01', '2018-02-01']
+        """
+        return sorted(self.categories)
+
+    def month_totals(self, month):
+        """
+        returns the totals of all categories in a month
+        :param month: the month e.g. '2018-03-01'
+        :return: dictionary category id -> CategoryTotals
+        """
+        return dict(self.categories.get(month, {}))
+
+    def category_totals(self, category_id):
+        """
+        returns the totals of a category in every month
+        :param category_id: the category id
+        :return: list of (month, CategoryTotals) tuples ordered by month
+        """
+        return [(month, self.categories[month][category_id]) for month in self.months()
+                if category_id in self.categories[month]]
+
+    def account_balance(self, account_id):
+        """
+        returns the balance of an account over all transactions
+        :param account_id: the account id
+        :return: the balance in milliunits
+        """
+        return self.account_balances.get(account_id, 0)
+
+    def account_running_balances(self, account_id):
+        """
+        returns the balance of an account at the end of every month with transactions
+        :param account_id: the account id
+        :return: list of (month, balance in milliunits) tuples ordered by month
+        """
+        balance = 0
+        running = []
+        activity = self.account_activity.get(account_id, {})
+        for month in sorted(activity):
+            balance += activity[month]
+            running.append((month, balance))
+        return running
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
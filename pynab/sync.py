@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a local copy of a budget which is kept up to date by merging deltas.
+"""
+
+# entity collections of a budget export and the field identifying their objects
+BUDGET_ENTITIES = {
+    'accounts': 'id',
+    'payees': 'id',
+    'payee_locations': 'id',
+    'category_groups': 'id',
+    'categories': 'id',
+    'months': 'month',
+    'transactions': 'id',
+    'subtransactions': 'id',
+    'scheduled_transactions': 'id',
+    'scheduled_subtransactions': 'id',
+}
+
+
+def merge_month(old, new):
+    """
+    merges a month of a delta into the stored month; a delta month only carries the changed
+    categories, so the categories are merged by id and deleted ones are removed
+    :param old: the stored month object or None
+    :param new: the month object of the delta
+    :return: the merged month object
+    """
+    if old is None or getattr(new, 'categories', None) is None:
+        return new
+    categories = {category.id: category for category in getattr(old, 'categories', None) or []}
+    for category in new.categories:
+        if getattr(category, 'deleted', False):
+            categories.pop(category.id, None)
+        else:
+            categories[category.id] = category
+    return new._replace(categories=list(categories.values()))
+
+
+class LocalBudget(object):
+    """
+    This class holds a local copy of one budget. Deltas received with
+    last_knowledge_of_server are merged into it.
+    """
+
+    def __init__(self, budget_id):
+        """
+        Constructor
+        :param budget_id: id of the budget this copy belongs to
+        """
+        self.budget_id = budget_id
+        # server knowledge of the last merged delta; None until the first merge
+        self.server_knowledge = None
+        # scalar budget attributes (name, currency_format, ...) of the last merged delta
+        self.info = {}
+        # entity name -> {id: object}
+        self.entities = {name: {} for name in BUDGET_ENTITIES}
+
+    def __getattr__(self, name):
+        """
+        gives access to the entity collections like budget.transactions
+        :param name: entity name e.g. 'transactions'
+        :return: list of objects currently held for this entity
+        """
+        if name in BUDGET_ENTITIES:
+            return list(self.entities[name].values())
+        info = self.__dict__.get('info', {})
+        if name in info:
+            return info[name]
+        raise AttributeError(name)
+
+    def merge_entity(self, name, changed):
+        """
+        merges changed objects of one entity collection; deleted objects are removed
+        :param name: entity name e.g. 'transactions'
+        :param changed: list of changed objects as received from YNAB
+        :return: list of (old, new) tuples; old is None for new objects, new is None for
+                 deleted objects
+        """
+        key = BUDGET_ENTITIES[name]
+        store = self.entities[name]
+        changes = []
+        for obj in changed:
+            obj_id = getattr(obj, key)
+            if getattr(obj, 'deleted', False):
+                old = store.pop(obj_id, None)
+                if old is not None:
+                    changes.append((old, None))
+            else:
+                old = store.get(obj_id)
+                if name == 'months':
+                    obj = merge_month(old, obj)
+                changes.append((old, obj))
+                store[obj_id] = obj
+        return changes
+
+    def merge(self, budget, server_knowledge):
+        """
+        merges a (delta) budget export into the local copy
+        :param budget: budget object as received from get_budgets(budget_id, ...)
+        :param server_knowledge: the server knowledge returned with the budget
+        :return: dictionary entity name -> list of (old, new) tuples, see merge_entity
+        """
+        changes = {}
+        for name, value in zip(budget._fields, budget):
+            if name in BUDGET_ENTITIES:
+                changes[name] = self.merge_entity(name, value or [])
+            else:
+                self.info[name] = value
+        self.server_knowledge = server_knowledge
+        return changes
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
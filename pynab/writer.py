@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+This module provides a write-behind queue batching single transactions into bulk posts.
+"""
+
+from concurrent.futures import Future
+import threading
+import time
+import uuid
+
+
+class TransactionWriter(object):
+    """
+    This class buffers transactions and posts them with post_transactions once max_batch
+    transactions are waiting or the oldest one waited max_delay seconds.
+    Every submitted transaction gets a future resolving to the id of the created transaction,
+    or None if YNAB skipped it as duplicate import_id. The futures are matched to the created
+    transactions by import_id, so transactions without one get a generated import_id.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, ynab_session, budget_id, max_batch=500, max_delay=5.0, max_pending=5000):
+        """
+        Constructor
+        Starts the background flush thread.
+        :param ynab_session: YNABSession used to post the transactions
+        :param budget_id: the budget id which the transactions are for
+        :param max_batch: number of waiting transactions triggering a flush; it is capped at the
+                bulk_chunk_size of the session so every batch is a single request
+        :param max_delay: seconds the oldest waiting transaction waits at most
+        :param max_pending: number of waiting transactions at which submit blocks until a flush
+                made room again
+        """
+        self.ynab_session = ynab_session
+        self.budget_id = budget_id
+        self.max_batch = min(max_batch, ynab_session.bulk_chunk_size)
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._pending = []
+        self._oldest = None
+        self._closed = False
+        self._condition = threading.Condition()
+        # serializes the flushes of the background thread and explicit flush() calls
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="TransactionWriter", daemon=True)
+        self._thread.start()
+    # pylint: enable-msg=too-many-arguments
+
+    def __enter__(self):
+        """
+        context manager entry
+        :return: the writer itself
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager exit; flushes everything and stops the background thread
+        """
+        self.close()
+
+    def submit(self, transaction):
+        """
+        queues a transaction to be posted; blocks while max_pending transactions are waiting
+        :param transaction: object from build_transaction_json; a transaction without import_id
+                is posted with a generated one, the object itself is not changed
+        :return: Future resolving to the id of the created transaction (None if skipped as
+                 duplicate) or to the exception of the failed request
+        :throws: if the writer is closed an exception is raised
+        """
+        transaction = transaction['transaction']
+        if transaction.get('import_id') is None:
+            transaction = dict(transaction, import_id=str(uuid.uuid4()))
+        future = Future()
+        with self._condition:
+            while not self._closed and len(self._pending) >= self.max_pending:
+                self._condition.wait()
+            if self._closed:
+                raise Exception("TransactionWriter is closed")
+            if not self._pending:
+                # wake the background thread to start the timer
+                self._oldest = time.monotonic()
+            self._pending.append((transaction, future))
+            # wakes the background thread and also submitters waiting for room; all of them
+            # check their condition again
+            self._condition.notify_all()
+        return future
+
+    def flush(self):
+        """
+        posts all waiting transactions now and waits until they are sent
+        :return: nothing
+        """
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    batch = self._pending[:self.max_batch]
+                    del self._pending[:self.max_batch]
+                    self._oldest = time.monotonic() if self._pending else None
+                    # wake submitters waiting for room
+                    self._condition.notify_all()
+                if not batch:
+                    return
+                self._post(batch)
+
+    def close(self):
+        """
+        flushes all waiting transactions and stops the background thread
+        :return: nothing
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        """
+        background thread flushing on size or time thresholds
+        :return: nothing
+        """
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._pending) >= self.max_batch:
+                        break
+                    if self._oldest is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._oldest + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _post(self, batch):
+        """
+        posts one batch and resolves its futures
+        YNAB returns the created transactions with their import_id; transactions not among them
+        were skipped as duplicates. An import_id sent twice in one batch resolves only once.
+        :param batch: list of (transaction json, future) tuples
+        :return: nothing
+        """
+        try:
+            result = self.ynab_session.post_transactions(
+                self.budget_id, {'transactions': [transaction for transaction, _ in batch]})
+        except Exception as error:  # pylint: disable=broad-except
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        created = {}
+        if result is not None:
+            created = {transaction.import_id: transaction.id
+                       for transaction in result.transactions}
+        for transaction, future in batch:
+            future.set_result(created.pop(transaction['import_id'], None))
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
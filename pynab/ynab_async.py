@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+
+"""
+This module provides an asyncio based class for direct handling of the YNAB API.
+It requires the optional dependency aiohttp.
+"""
+
+import asyncio
+from pynab.models import build_model
+from pynab.rate_limit import RATE_LIMIT_HEADER
+from pynab.ynap_api import YNABSession, _SessionSettings, _merge_bulk_results, \
+    _transactions_query
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+# entity collections fetched by get_budget_entities and the call to fetch them
+BUDGET_ENTITY_CALLS = ('accounts', 'categories', 'payees', 'payee_locations', 'months',
+                       'transactions', 'scheduled_transactions')
+
+
+class AsyncYNABSession(_SessionSettings):
+    """
+    This class holds and handles a YNAB (aiohttp) session including authentication.
+    The methods mirror the ones of YNABSession but are coroutines.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, ynab_access_token, json_backend=None, max_connections=10,
+                 bulk_chunk_size=1000, bulk_workers=4, bulk_retries=2, rate_limiter=None,
+                 retry_policy=None, timeout=(10.0, 60.0)):
+        """
+        Constructor
+        :param ynab_access_token: the personal access token for the YNAB API
+        :param json_backend: optional; 'orjson', 'ujson' or 'json'. If not set the fastest
+                installed backend will be used
+        :param max_connections: optional; size of the connection pool
+        :param bulk_chunk_size: optional; maximum number of transactions per bulk request
+        :param bulk_workers: optional; maximum number of bulk requests sent in parallel
+        :param bulk_retries: optional; how often a chunk of a bulk post is sent again after a
+                transient failure; takes the place of max_retries of retry_policy for chunks
+        :param rate_limiter: optional; RateLimiter shared by all requests of this session. If not
+                set a limiter for 200 requests per hour is used; waiting never blocks the loop and
+                a limiter with state_file is accessed from the default executor
+        :param retry_policy: optional; RetryPolicy for transient failures. If not set up to 3
+                retries with exponential backoff and jitter are done
+        :param timeout: optional; (connect timeout, read timeout) in seconds for every request
+        :throws: if aiohttp is not installed an exception is raised
+        """
+        if aiohttp is None:
+            raise Exception("AsyncYNABSession requires aiohttp")
+        super().__init__(ynab_access_token, json_backend, bulk_chunk_size, bulk_workers,
+                         bulk_retries, rate_limiter, retry_policy, timeout)
+        # the aiohttp session is created on first use inside the running event loop
+        self.session = None
+        self.max_connections = max_connections
+    # pylint: enable-msg=too-many-arguments
+
+    async def __aenter__(self):
+        """
+        async context manager entry
+        :return: the session itself
+        """
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        async context manager exit; closes the connection pool
+        """
+        await self.close()
+
+    async def close(self):
+        """
+        closes the aiohttp session and its connection pool
+        :return: nothing
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        """
+        internal helper returning the aiohttp session, creating it on first use
+        :return: the aiohttp session
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                headers=self.requests_header,
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.timeout[0],
+                                              sock_read=self.timeout[1]))
+        return self.session
+
+    async def _rate_limiter_call(self, function, *args):
+        """
+        calls a method of the rate limiter; a limiter sharing its state through a file locks and
+        syncs it on every call, so it is called in the default executor to keep the loop running
+        :param function: bound method of the rate limiter
+        :param args: arguments of the method
+        :return: the result of the method
+        """
+        if self.rate_limiter.state_file is None:
+            return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    async def _internal_request(self, method, url, json_data=None, retry_policy=None):
+        """
+        sends a request to YNAB
+        :param method: http method e.g. 'GET'
+        :param url: url part for the request appended to base_url member
+        :param json_data: optional; json data to be sent
+        :param retry_policy: optional; RetryPolicy replacing the one of the session
+        :return: 2 values are returned: status code, response body as bytes
+        :throws: the aiohttp exception if a connection error or timeout is not retried
+        """
+        policy = self.retry_policy if retry_policy is None else retry_policy
+        attempt = 0
+        while True:
+            wait = await self._rate_limiter_call(self.rate_limiter.try_acquire)
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                async with self._get_session().request(method, self.base_url + url,
+                                                       json=json_data) as result:
+                    status, headers, content = result.status, result.headers, await result.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                sent = not isinstance(error, aiohttp.ClientConnectorError)
+                if not policy.retry_error(attempt, sent, method, json_data):
+                    raise
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            if status == 429:
+                await self._rate_limiter_call(self.rate_limiter.exhaust)
+            elif RATE_LIMIT_HEADER in headers:
+                await self._rate_limiter_call(self.rate_limiter.update, headers[RATE_LIMIT_HEADER])
+            if not policy.retry_status(attempt, status, method, json_data):
+                return status, content
+            await asyncio.sleep(policy.delay(attempt, headers.get('Retry-After')))
+            attempt += 1
+
+    async def _internal_get_stuff(self, url, key1, key2, key2alt=None):
+        """
+        get information from YNAB the generic way
+        :param url: url part for the request appended to base_url member
+        :param key1: first key to access json dictionary after retrieval
+        :param key2: second key to access json dictionary after retrieval
+        :param key2alt: alternative second key to access json dictionary after retrieval
+        :return: (list of) object(s) with information about requested data
+                 if key2alt is set, then a second object is returned representing it
+        :throws: if an error occurs an exception is raised
+        """
+        status, content = await self._internal_request('GET', url)
+        if status == 200:
+            data = self._json_loads(content)[key1]
+            if key2alt is None:
+                return build_model(data[key2], key2)
+            return build_model(data[key2], key2), build_model(data[key2alt], key2alt)
+        # check for an empty account
+        if status == 404:
+            return None
+        # build error information and raise an exception
+        raise Exception(YNABSession._build_exception_string(self._json_loads(content)))
+
+    async def _internal_get_list(self, url, key2, url_vars, last_knowledge_of_server):
+        """
+        get a list from YNAB, optionally as delta since last_knowledge_of_server
+        :param url: url part for the request appended to base_url member
+        :param key2: key of the list inside the data dictionary
+        :param url_vars: dictionary with the query parameters of the request
+        :param last_knowledge_of_server: the starting server knowledge or None for a plain request
+        :return: list of objects; if last_knowledge_of_server is set a second return value stands
+                 for server_knowledge
+        :throws: if an error occurs an exception is raised
+        """
+        if last_knowledge_of_server is None:
+            return await self._internal_get_stuff(YNABSession._build_url(url, url_vars),
+                                                  'data', key2)
+        url_vars.update({'last_knowledge_of_server': last_knowledge_of_server})
+        return await self._internal_get_stuff(YNABSession._build_url(url, url_vars),
+                                              'data', key2, 'server_knowledge')
+
+    # pylint: disable-msg=too-many-arguments
+    async def _internal_send_stuff(self, method, url, json_data, key1, key2, status_ok,
+                                   retry_policy=None):
+        """
+        sends data to ynab URL the generic way
+        :param method: 'POST' or 'PUT'
+        :param url: url part for the request appended to base_url member
+        :param json_data: json data to be sent to ynab
+        :param key1: first key to access json dictionary after retrieval
+        :param key2: second key to access json dictionary after retrieval
+        :param status_ok: status code signalling success
+        :param retry_policy: optional; RetryPolicy replacing the one of the session
+        :return: object with the returned data if successful, None if a POST was rejected because
+                 the import_id already existed
+        :throws: if an error occurs (including 422 on PUT) an exception is raised
+        """
+        status, content = await self._internal_request(method, url, json_data, retry_policy)
+        if status == status_ok:
+            return build_model(self._json_loads(content)[key1][key2], key2)
+        # check for 422 (A transaction with the same import_id already exists); on PUT it
+        # reports an invalid update
+        if status == 422 and method == 'POST':
+            return None
+        # build error information and raise an exception
+        raise Exception(YNABSession._build_exception_string(self._json_loads(content)))
+    # pylint: enable-msg=too-many-arguments
+
+    async def get_user(self):
+        """
+        API call
+        gets user information from YNAB
+        :return: object with user information
+        :throws: if an error occurs an exception is raised
+        """
+        return await self._internal_get_stuff("user", 'data', 'user')
+
+    async def get_budgets(self, budget_id=None, last_knowledge_of_server=None):
+        """
+        API call
+        get budget(s) information from YNAB, see YNABSession.get_budgets
+        :param budget_id: optional; id of the budget to be received
+        :param last_knowledge_of_server: optional; The starting server knowledge
+        :return: (list of) object(s) with information about budget(s)
+                 if budget_id is presented a second return value stands for server_knowledge
+        :throws: if an error occurs an exception is raised
+        """
+        if budget_id is None:
+            return await self._internal_get_stuff("budgets", 'data', 'budgets')
+        url_vars = {}
+        if last_knowledge_of_server is not None:
+            url_vars.update({'last_knowledge_of_server': last_knowledge_of_server})
+        return await self._internal_get_stuff(
+            YNABSession._build_url("budgets/" + budget_id, url_vars),
+            'data', 'budget', 'server_knowledge')
+
+    async def get_accounts(self, budget_id, account_id=None, last_knowledge_of_server=None):
+        """
+        API call
+        get account(s) information from YNAB, see YNABSession.get_accounts
+        :param budget_id:  id of the budget to get the account data from
+        :param account_id: optional; id of the account to be received
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: (list of) object(s) with information about account(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/accounts"
+        if account_id is None:
+            return await self._internal_get_list(url, 'accounts', {}, last_knowledge_of_server)
+        return await self._internal_get_stuff(url + "/" + account_id, 'data', 'account')
+
+    async def get_categories(self, budget_id, category_id=None, last_knowledge_of_server=None):
+        """
+        API call
+        get categorie(s) information from YNAB, see YNABSession.get_categories
+        :param budget_id:  id of the budget to get the category data from
+        :param category_id: optional; id of the category to be received
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: (list of) object(s) with information about categorie(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/categories"
+        if category_id is None:
+            return await self._internal_get_list(url, 'category_groups', {},
+                                                 last_knowledge_of_server)
+        return await self._internal_get_stuff(url + "/" + category_id, 'data', 'category')
+
+    async def get_payees(self, budget_id, payee_id=None, last_knowledge_of_server=None):
+        """
+        API call
+        get payee(s) information from YNAB, see YNABSession.get_payees
+        :param budget_id:  id of the budget to get the payee data from
+        :param payee_id: optional; id of the payee to be received
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: (list of) object(s) with information about payee(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/payees"
+        if payee_id is None:
+            return await self._internal_get_list(url, 'payees', {}, last_knowledge_of_server)
+        return await self._internal_get_stuff(url + "/" + payee_id, 'data', 'payee')
+
+    async def get_payee_locations(self, budget_id, payee_location_id=None):
+        """
+        API call
+        get payee_location(s) information from YNAB, see YNABSession.get_payee_locations
+        :param budget_id:  id of the budget to get the payee_location data from
+        :param payee_location_id: optional; id of the payee_location to be received
+        :return: (list of) object(s) with information about payee_location(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/payee_locations"
+        if payee_location_id is None:
+            return await self._internal_get_stuff(url, 'data', 'payee_locations')
+        return await self._internal_get_stuff(url + "/" + payee_location_id,
+                                              'data', 'payee_location')
+
+    async def get_months(self, budget_id, month_id=None, last_knowledge_of_server=None):
+        """
+        API call
+        get month(s) information from YNAB, see YNABSession.get_months
+        :param budget_id:  id of the budget to get the month data from
+        :param month_id: optional; id of the month to be received
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: (list of) object(s) with information about month(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/months"
+        if month_id is None:
+            return await self._internal_get_list(url, 'months', {}, last_knowledge_of_server)
+        return await self._internal_get_stuff(url + "/" + month_id, 'data', 'month')
+
+    # pylint: disable-msg=too-many-arguments
+    async def get_transactions(self, budget_id, transaction_id=None, since_date=None, ttype=None,
+                               last_knowledge_of_server=None):
+        """
+        API call
+        get transaction(s) information from YNAB, see YNABSession.get_transactions
+        :param budget_id:       all transactions for this budget will be retrieved if set alone
+        :param transaction_id:  optional; only one specific transaction will be retrieved
+        :param since_date:      optional; limit the retrieved data to transactions since this date
+        :param ttype:           optional; limit the retrieved data to transactions matching the type
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: (list of) object(s) with information about transaction(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/transactions"
+        if transaction_id is None:
+            return await self._internal_get_list(url, 'transactions',
+                                                 _transactions_query(since_date, ttype),
+                                                 last_knowledge_of_server)
+        return await self._internal_get_stuff(url + "/" + transaction_id, 'data', 'transaction')
+    # pylint: enable-msg=too-many-arguments
+
+    async def _get_transactions_for(self, budget_id, parent, parent_id, since_date,
+                                    last_knowledge_of_server):
+        """
+        internal helper for the get_transactions_for_* calls
+        :param budget_id: the budget the transactions belong to
+        :param parent: 'accounts', 'categories' or 'payees'
+        :param parent_id: id of the account, category or payee
+        :param since_date: optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: list of objects with information about transactions
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/" + parent + "/" + parent_id + "/transactions"
+        return await self._internal_get_list(url, 'transactions', _transactions_query(since_date),
+                                             last_knowledge_of_server)
+
+    async def get_transactions_for_account(self, budget_id, account_id, since_date=None,
+                                           last_knowledge_of_server=None):
+        """
+        API call
+        get transaction(s) of one account, see YNABSession.get_transactions_for_account
+        :param budget_id:  the budget the transactions belong to
+        :param account_id: all transactions for this account will be retrieved
+        :param since_date: optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: list of objects with information about transactions
+        :throws: if an error occurs an exception is raised
+        """
+        return await self._get_transactions_for(budget_id, 'accounts', account_id, since_date,
+                                                last_knowledge_of_server)
+
+    async def get_transactions_for_category(self, budget_id, category_id, since_date=None,
+                                            last_knowledge_of_server=None):
+        """
+        API call
+        get transaction(s) of one category, see YNABSession.get_transactions_for_category
+        :param budget_id:   the budget the transactions belong to
+        :param category_id: all transactions for this category will be retrieved
+        :param since_date:  optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: list of objects with information about transactions
+        :throws: if an error occurs an exception is raised
+        """
+        return await self._get_transactions_for(budget_id, 'categories', category_id,
+                                                since_date, last_knowledge_of_server)
+
+    async def get_transactions_for_payee(self, budget_id, payees_id, since_date=None,
+                                         last_knowledge_of_server=None):
+        """
+        API call
+        get transaction(s) of one payee, see YNABSession.get_transactions_for_payee
+        :param budget_id:  the budget the transactions belong to
+        :param payees_id:  all transactions for this payee will be retrieved
+        :param since_date: optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: list of objects with information about transactions
+        :throws: if an error occurs an exception is raised
+        """
+        return await self._get_transactions_for(budget_id, 'payees', payees_id, since_date,
+                                                last_knowledge_of_server)
+
+    async def get_scheduled_transactions(self, budget_id, scheduled_transaction_id=None,
+                                         last_knowledge_of_server=None):
+        """
+        API call
+        get scheduled transaction(s), see YNABSession.get_scheduled_transactions
+        :param budget_id: all transactions for this budget will be retrieved if set alone
+        :param scheduled_transaction_id: optional; only one specific transaction will be retrieved
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all)
+        :return: (list of) object(s) with information about transaction(s)
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/scheduled_transactions"
+        if scheduled_transaction_id is None:
+            return await self._internal_get_list(url, 'scheduled_transactions', {},
+                                                 last_knowledge_of_server)
+        return await self._internal_get_stuff(url + "/" + scheduled_transaction_id,
+                                              'data', 'scheduled_transaction')
+
+    async def get_budget_entities(self, budget_id):
+        """
+        fetches all entity collections of a budget concurrently, so loading a budget takes
+        about as long as the slowest request instead of the sum of all of them
+        :param budget_id: the budget to be loaded
+        :return: dictionary entity name (see BUDGET_ENTITY_CALLS) -> list of objects
+        :throws: if an error occurs an exception is raised
+        """
+        results = await asyncio.gather(*[getattr(self, "get_" + name)(budget_id)
+                                         for name in BUDGET_ENTITY_CALLS])
+        return dict(zip(BUDGET_ENTITY_CALLS, results))
+
+    async def post_transaction(self, budget_id, transaction):
+        """
+        API call
+        posts a single transaction to YNAB
+        :param budget_id: the budget id which this transaction is for
+        :param transaction: object containing the transaction data from build_transaction
+        :return: object with created transaction if successful, None if import_id already existed
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/transactions"
+        return await self._internal_send_stuff('POST', url, transaction, 'data', 'transaction',
+                                               201)
+
+    async def post_transaction_bulk(self, budget_id, transactions):
+        """
+        API call
+        posts transactions as bulk to YNAB, see YNABSession.post_transaction_bulk
+        :param budget_id: the budget id which these transactions are for
+        :param transactions: json object from build_transactions_json
+        :return: json object with bulk import information (merged over all chunks)
+        :throws: BulkPostError if chunks failed, carrying the result of the successful ones
+        """
+        url = "budgets/" + budget_id + "/transactions/bulk"
+        items = transactions['transactions']
+        if len(items) <= self.bulk_chunk_size:
+            return await self._internal_send_stuff('POST', url, transactions, 'data', 'bulk', 201)
+        chunks = [items[start:start + self.bulk_chunk_size]
+                  for start in range(0, len(items), self.bulk_chunk_size)]
+        semaphore = asyncio.Semaphore(self.bulk_workers)
+        results = await asyncio.gather(*[self._post_bulk_chunk(url, chunk, semaphore)
+                                         for chunk in chunks], return_exceptions=True)
+        return _merge_bulk_results(
+            (chunk, None, result) if isinstance(result, Exception) else (chunk, result, None)
+            for chunk, result in zip(chunks, results))
+
+    async def _post_bulk_chunk(self, url, chunk, semaphore):
+        """
+        posts one chunk of a bulk post; transient failures are retried by retry_policy with
+        bulk_retries as limit
+        :param url: url part for the request appended to base_url member
+        :param chunk: list of transaction json objects
+        :param semaphore: semaphore bounding the number of parallel requests
+        :return: json object with bulk import information of this chunk
+        :throws: if an error occurs an exception is raised
+        """
+        async with semaphore:
+            return await self._internal_send_stuff(
+                'POST', url, {'transactions': chunk}, 'data', 'bulk', 201,
+                self.retry_policy.with_max_retries(self.bulk_retries))
+
+    async def put_transaction(self, budget_id, transaction_id, transaction):
+        """
+        API call
+        puts an update of an existing transaction to YNAB
+        :param budget_id: the budget id which this transaction is for
+        :param transaction_id: the id of the transaction to be updated
+        :param transaction: json object containing the transaction data
+        :return: object with the updated transaction
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/transactions/" + transaction_id
+        return await self._internal_send_stuff('PUT', url, transaction, 'data', 'transaction',
+                                               200)
+
+
+if __name__ == '__main__':
+    print("Module not ment to run on its own...")
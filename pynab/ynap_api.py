@@ -4,46 +4,429 @@
 This module provides a class for direct handling of the YNAB API.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
-from collections import namedtuple
+import importlib
 import json
+import logging
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from pynab.batch import TransactionBatch
+from pynab.http2 import HTTP2Session
+from pynab.json_stream import iter_json_array
+from pynab.metrics import RequestEvent, endpoint_template
+from pynab.models import build_model, lazy_model
+from pynab.rate_limit import RateLimiter, RATE_LIMIT_HEADER
+from pynab.response_cache import CachedResponse
+from pynab.retry import RetryPolicy
 
+_LOGGER = logging.getLogger(__name__)
 
-class YNABSession(object):
+# supported json backends for decoding responses, fastest first
+JSON_BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def _select_json_backend(json_backend=None):
     """
-    This class holds and handles a YNAB (requests) session including authentication.
+    selects the json backend used to decode responses
+    :param json_backend: optional; one of JSON_BACKENDS. If not set the fastest installed backend
+            will be used
+    :return: 2 values are returned: backend name, loads function accepting bytes
+    :throws: if the backend is unknown or not installed an exception is raised
+    """
+    if json_backend is not None and json_backend not in JSON_BACKENDS:
+        raise Exception("unknown json backend: " + json_backend)
+    for name in (JSON_BACKENDS if json_backend is None else (json_backend,)):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        return name, module.loads
+    raise Exception("json backend not installed: " + json_backend)
+
+
+class BulkPostError(Exception):
+    """
+    This exception is raised if chunks of a bulk post failed even after retrying them.
     """
 
-    def __init__(self, ynab_access_token):
+    def __init__(self, result, failed):
         """
         Constructor
+        :param result: merged bulk result of all chunks which went through
+        :param failed: list of (transactions, exception) tuples for every failed chunk
+        """
+        super().__init__("%d bulk chunk(s) failed: %s" % (len(failed),
+                                                          "; ".join(str(f[1]) for f in failed)))
+        self.result = result
+        self.failed = failed
+
+
+def _merge_bulk_results(chunk_results):
+    """
+    internal helper merging the results of the chunks of a bulk post
+    :param chunk_results: iterable of (chunk, result, exception) tuples; exception is None for
+            successful chunks
+    :return: json object with bulk import information (merged over all chunks)
+    :throws: BulkPostError if chunks failed, carrying the result of the successful ones
+    """
+    transaction_ids = []
+    duplicate_import_ids = []
+    failed = []
+    for chunk, result, error in chunk_results:
+        if error is not None:
+            failed.append((chunk, error))
+        elif result is not None:
+            transaction_ids.extend(result.transaction_ids)
+            duplicate_import_ids.extend(result.duplicate_import_ids)
+    result = build_model({'transaction_ids': transaction_ids,
+                          'duplicate_import_ids': duplicate_import_ids}, 'bulk')
+    if failed:
+        raise BulkPostError(result, failed)
+    return result
+
+
+def _transactions_query(since_date=None, ttype=None):
+    """
+    internal helper building the query parameters of a transactions request
+    :param since_date: optional; limit the retrieved data to transactions since this date
+    :param ttype: optional; limit the retrieved data to transactions matching the type
+    :return: dictionary with the query parameters
+    """
+    url_vars = {}
+    if since_date is not None:
+        url_vars.update({'since_date': since_date})
+    if ttype is not None:
+        url_vars.update({'type': ttype})
+    return url_vars
+
+
+class _SessionSettings(object):
+    """
+    This class holds the settings YNABSession and ynab_async.AsyncYNABSession share.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, ynab_access_token, json_backend, bulk_chunk_size, bulk_workers,
+                 bulk_retries, rate_limiter, retry_policy, timeout):
+        """
+        Constructor; see YNABSession for the parameters
         """
         # create the header with the Bearer token for YNAB
         self.requests_header = {"accept": "application/json",
                                 "Authorization": "Bearer " + ynab_access_token}
-        # create the requests session with the custom header fields
-        self.session = requests.Session()
-        self.session.headers.update(self.requests_header)
         # base url for all api calls
         self.base_url = "https://api.youneedabudget.com/v1/"
+        # json decoder used for all responses
+        self.json_backend, self._json_loads = _select_json_backend(json_backend)
+        # splitting and dispatching of bulk posts
+        self.bulk_chunk_size = bulk_chunk_size
+        self.bulk_workers = bulk_workers
+        self.bulk_retries = bulk_retries
+        # client side limiter for the YNAB request quota
+        self.rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+        # handling of timeouts and transient failures
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.timeout = timeout
+    # pylint: enable-msg=too-many-arguments
+
+    @property
+    def rate_limit_remaining(self):
+        """
+        number of requests which can be sent right now without exceeding the YNAB quota
+        :return: the remaining requests
+        """
+        return self.rate_limiter.remaining
+
+
+class YNABSession(_SessionSettings):
+    """
+    This class holds and handles a YNAB (requests) session including authentication.
+    One session can be shared by all worker threads: they reuse the keep-alive connections of
+    its pool. Close it with close() or use it as context manager.
+    """
+
+    # pylint: disable-msg=too-many-arguments
+    def __init__(self, ynab_access_token, json_backend=None, bulk_chunk_size=1000,
+                 bulk_workers=4, bulk_retries=2, rate_limiter=None, retry_policy=None,
+                 timeout=(10.0, 60.0), response_cache=None, pool_maxsize=None,
+                 pool_block=True, http2=False, decode_profiler=None):
+        """
+        Constructor
+        :param ynab_access_token: the personal access token for the YNAB API
+        :param json_backend: optional; 'orjson', 'ujson' or 'json'. If not set the fastest
+                installed backend will be used
+        :param bulk_chunk_size: optional; maximum number of transactions per bulk request
+        :param bulk_workers: optional; maximum number of bulk requests sent in parallel
+        :param bulk_retries: optional; how often a chunk of a bulk post is sent again after a
+                transient failure; takes the place of max_retries of retry_policy for chunks
+        :param rate_limiter: optional; RateLimiter shared by all requests of this session. If not
+                set a blocking limiter for 200 requests per hour is used
+        :param retry_policy: optional; RetryPolicy for transient failures. If not set up to 3
+                retries with exponential backoff and jitter are done
+        :param timeout: optional; (connect timeout, read timeout) in seconds for every request
+        :param response_cache: optional; ResponseCache for GET responses of reference data.
+                If not set nothing is cached
+        :param pool_maxsize: optional; maximum number of kept-alive connections to YNAB. If not
+                set max(10, bulk_workers) is used
+        :param pool_block: optional; if True threads wait for a free pooled connection instead
+                of opening a throw-away connection once pool_maxsize are in use
+        :param http2: optional; if True all requests are multiplexed over HTTP/2, see
+                http2.HTTP2Session. Requires httpx
+        :param decode_profiler: optional; cProfile.Profile which profiles the decoding of every
+                response. Profiled decodes are serialized between threads
+        """
+        super().__init__(ynab_access_token, json_backend, bulk_chunk_size, bulk_workers,
+                         bulk_retries, rate_limiter, retry_policy, timeout)
+        # create the requests session with the custom header fields
+        self.pool_maxsize = max(10, bulk_workers) if pool_maxsize is None else pool_maxsize
+        if http2:
+            self.session = HTTP2Session(max_connections=self.pool_maxsize,
+                                        max_keepalive=self.pool_maxsize)
+        else:
+            self.session = requests.Session()
+            # all requests go to one host, so a single pool sized for the worker threads
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                  pool_block=pool_block)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.session.headers.update(self.requests_header)
+        # cache for GET responses; None disables caching
+        self.response_cache = response_cache
+        # instrumentation, see add_observer
+        self.observers = []
+        self.decode_profiler = decode_profiler
+        self._profile_lock = threading.Lock()
+    # pylint: enable-msg=too-many-arguments
+
+    def __enter__(self):
+        """
+        context manager entry
+        :return: the session itself
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        context manager exit; closes the connection pool
+        """
+        self.close()
 
-    def __del__(self):
+    def close(self):
         """
-        Destructor
+        closes the requests session and all pooled connections
+        :return: nothing
         """
-        # close and destroy requests session
         self.session.close()
-        del self.session
+
+    def add_observer(self, observer):
+        """
+        registers an observer called with a metrics.RequestEvent after every API call, e.g.
+        metrics.RequestMetrics; calls failing without response are reported too
+        :param observer: function taking a RequestEvent; it is called from the calling thread
+        :return: nothing
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        """
+        unregisters an observer
+        :param observer: the observer passed to add_observer
+        :return: nothing
+        """
+        self.observers.remove(observer)
+
+    def _internal_request(self, method, url, json_data=None, retry_policy=None):
+        """
+        sends a request to YNAB; all requests of the session pass through here
+        GET requests are answered from response_cache while fresh and revalidated with
+        conditional requests once expired; other requests invalidate the affected entries.
+        :param method: http method e.g. 'GET'
+        :param url: url part for the request appended to base_url member
+        :param json_data: optional; json data to be sent
+        :param retry_policy: optional; RetryPolicy replacing the one of the session
+        :return: the response
+        :throws: the requests exception if a connection error or timeout is not retried
+        """
+        cache = self.response_cache
+        if cache is None:
+            return self._send_request(method, url, json_data, retry_policy=retry_policy)
+        if method != 'GET':
+            result = self._send_request(method, url, json_data, retry_policy=retry_policy)
+            cache.invalidate(url)
+            return result
+        authorization = self.requests_header['Authorization']
+        entry, fresh = cache.lookup(url, authorization)
+        if fresh:
+            return CachedResponse(entry)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        result = self._send_request(method, url, json_data, headers, retry_policy=retry_policy)
+        if result.status_code == 304 and entry is not None:
+            cache.revalidated(url, entry, authorization)
+            cached = CachedResponse(entry)
+            cached.request_timing = result.request_timing
+            return cached
+        if result.status_code == 200:
+            cache.store(url, result.content, result.headers, authorization)
+        return result
+
+    # pylint: disable-msg=too-many-arguments
+    def _internal_call(self, method, url, handle, json_data=None, retry_policy=None):
+        """
+        sends a request and hands the response to handle, which checks the status and decodes
+        the body; observers are notified with the timings of both steps, see _notify
+        :param method: http method e.g. 'GET'
+        :param url: url part for the request appended to base_url member
+        :param handle: function taking the response and returning the result of the call
+        :param json_data: optional; json data to be sent
+        :param retry_policy: optional; RetryPolicy replacing the one of the session
+        :return: the return value of handle
+        :throws: the exceptions of the request and of handle
+        """
+        start = time.perf_counter()
+        try:
+            result = self._internal_request(method, url, json_data, retry_policy)
+        except Exception as error:
+            if self.observers:
+                self._notify(method, url, None, 0, time.perf_counter() - start, 0.0, error)
+            raise
+        received = time.perf_counter()
+        try:
+            if self.decode_profiler is None:
+                return handle(result)
+            with self._profile_lock:
+                return self.decode_profiler.runcall(handle, result)
+        finally:
+            if self.observers:
+                self._notify(method, url, result, len(result.content), received - start,
+                             time.perf_counter() - received)
+    # pylint: enable-msg=too-many-arguments
+
+    # pylint: disable-msg=too-many-arguments
+    def _notify(self, method, url, result, size, elapsed, decode_time, error=None):
+        """
+        reports a finished API call to all observers
+        The latency of the event is the time spent in the requests to YNAB as measured by
+        _send_request; waiting for the rate limiter and between retries is reported apart.
+        An exception of an observer is logged and does not reach the caller.
+        :param method: http method of the request
+        :param url: url part of the request
+        :param result: the response; None if the request failed without response
+        :param size: number of body bytes received
+        :param elapsed: seconds until the response was available; the latency of a response
+                answered by the cache
+        :param decode_time: seconds spent decoding the response
+        :param error: optional; the exception of a request which failed without response
+        :return: nothing
+        """
+        timed = error if result is None else result
+        latency, wait_time, attempts = getattr(timed, 'request_timing', (elapsed, 0.0, 0))
+        event = RequestEvent(method, endpoint_template(url),
+                             None if result is None else result.status_code, size, latency,
+                             decode_time, getattr(result, 'from_cache', False), wait_time,
+                             attempts, error)
+        for observer in list(self.observers):
+            try:
+                observer(event)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("observer %r failed", observer)
+    # pylint: enable-msg=too-many-arguments
+
+    # pylint: disable-msg=too-many-arguments
+    def _send_request(self, method, url, json_data=None, headers=None, stream=False,
+                      retry_policy=None):
+        """
+        sends a request to YNAB passing the rate limiter
+        Transient failures (429, 5xx, connection errors and timeouts) are retried according to
+        retry_policy. Requests which could have reached YNAB are only replayed if this cannot
+        create anything twice, see retry.replay_safe.
+        :param method: http method e.g. 'GET'
+        :param url: url part for the request appended to base_url member
+        :param json_data: optional; json data or TransactionBatch to be sent
+        :param headers: optional; additional request headers
+        :param stream: optional; if True the body is not read before returning the response
+        :param retry_policy: optional; RetryPolicy replacing the one of the session
+        :return: the response; its request_timing attribute holds (seconds spent in requests,
+                 seconds waited for the rate limiter and between retries, number of attempts)
+        :throws: the requests exception if a connection error or timeout is not retried; it
+                 gets the request_timing attribute as well
+        """
+        policy = self.retry_policy if retry_policy is None else retry_policy
+        kwargs = {'timeout': self.timeout}
+        batch = json_data if isinstance(json_data, TransactionBatch) else None
+        if batch is not None:
+            headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+            body = None if batch.stream else batch.to_json()
+        elif json_data is not None:
+            kwargs['json'] = json_data
+        if headers:
+            kwargs['headers'] = headers
+        if stream:
+            kwargs['stream'] = True
+        network_time = wait_time = 0.0
+        attempt = 0
+        while True:
+            if batch is not None:
+                # a streamed body is consumed by the attempt, so every attempt gets a new one
+                kwargs['data'] = batch.iter_json() if batch.stream else body
+            waiting = time.perf_counter()
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            wait_time += started - waiting
+            try:
+                result = self.session.request(method, self.base_url + url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                waiting = time.perf_counter()
+                network_time += waiting - started
+                sent = not isinstance(error, requests.exceptions.ConnectTimeout)
+                if not policy.retry_error(attempt, sent, method, json_data):
+                    error.request_timing = (network_time, wait_time, attempt + 1)
+                    raise
+                policy.wait(attempt)
+                wait_time += time.perf_counter() - waiting
+                attempt += 1
+                continue
+            waiting = time.perf_counter()
+            network_time += waiting - started
+            if result.status_code == 429:
+                self.rate_limiter.exhaust()
+            elif RATE_LIMIT_HEADER in result.headers:
+                self.rate_limiter.update(result.headers[RATE_LIMIT_HEADER])
+            if not policy.retry_status(attempt, result.status_code, method, json_data):
+                result.request_timing = (network_time, wait_time, attempt + 1)
+                return result
+            policy.wait(attempt, result.headers.get('Retry-After'))
+            wait_time += time.perf_counter() - waiting
+            attempt += 1
+    # pylint: enable-msg=too-many-arguments
 
     @staticmethod
-    def _build_json_object(json_string):
+    def _build_json_object(json_string, key=None):
         """
         creates an object with attributes from json attributes
         :param json_string: json string representation
+        :param key: optional; json key the object was found under, selects the model class
         :return: python object
         """
-        return json.loads(json_string, object_hook=lambda d: namedtuple('X', d.keys())(*d.values()))
+        return build_model(json.loads(json_string), key)
+
+    @staticmethod
+    def _build_url(url, url_vars):
+        """
+        internal helper to append the query parameters to an url
+        :param url: url part for the request
+        :param url_vars: dictionary with the query parameters
+        :return: the url including the query string
+        """
+        if not url_vars:
+            return url
+        return url + "?" + urlencode(url_vars)
 
     @staticmethod
     def _build_exception_string(json_data):
@@ -56,60 +439,105 @@ class YNABSession(object):
                json_data["error"]["name"] + " (" + \
                json_data["error"]["detail"] + ")"
 
-    def _internal_get_stuff(self, url, key1, key2, key2alt=None):
+    def _internal_get_stuff(self, url, key1, key2, key2alt=None, lazy=False):
         """
         get information from YNAB the generic way
         :param url: url part for the request appended to base_url member
         :param key1: first key to access json dictionary after retrieval
         :param key2: second key to access json dictionary after retrieval
         :param key2alt: alternative second key to access json dictionary after retrieval
+        :param lazy: optional; if True the object under key2 is returned as models.LazyModel
         :return: (list of) object(s) with information about requested data
                  if key2alt is set, then a second object is returned representing it
         :throws: if an error occurs an exception is raised
         """
+        def handle(result):
+            # check for success
+            if result.status_code == 200:
+                # decode the body once and build the model objects from the sub tree(s)
+                data = self._json_loads(result.content)[key1]
+                build = lazy_model if lazy else build_model
+                if key2alt is None:
+                    return build(data[key2], key2)
+                return build(data[key2], key2), build_model(data[key2alt], key2alt)
+            # check for an empty account
+            if result.status_code == 404:
+                return None
+            # build error information and raise an exception
+            raise Exception(self._build_exception_string(self._json_loads(result.content)))
+
         # get the response from YNAB
-        result = self.session.get(self.base_url + url)
-        # check for success
-        if result.status_code == 200:
-            resultkey = json.dumps(json.loads(result.text)[key1][key2])
-            if key2alt is None:
-                return self._build_json_object(resultkey)
-            resultkey2 = json.dumps(json.loads(result.text)[key1][key2alt])
-            return self._build_json_object(resultkey), self._build_json_object(resultkey2)
-        # check for an empty account
-        if result.status_code == 404:
-            return None
-        # build error information and raise an exception
-        raise Exception(self._build_exception_string(json.loads(result.text)))
+        return self._internal_call('GET', url, handle)
+
+    def _internal_get_list(self, url, key2, url_vars, last_knowledge_of_server):
+        """
+        get a list from YNAB, optionally as delta since last_knowledge_of_server
+        :param url: url part for the request appended to base_url member
+        :param key2: key of the list inside the data dictionary
+        :param url_vars: dictionary with the query parameters of the request
+        :param last_knowledge_of_server: the starting server knowledge or None for a plain request
+        :return: list of objects; if last_knowledge_of_server is set a second return value stands
+                 for server_knowledge
+        :throws: if an error occurs an exception is raised
+        """
+        if last_knowledge_of_server is None:
+            return self._internal_get_stuff(self._build_url(url, url_vars), 'data', key2)
+        url_vars.update({'last_knowledge_of_server': last_knowledge_of_server})
+        return self._internal_get_stuff(self._build_url(url, url_vars),
+                                        'data',
+                                        key2,
+                                        'server_knowledge')
 
-    def _internal_put_stuff(self, url, json_data):
+    def _internal_put_stuff(self, url, json_data, key1, key2=None, method='PUT'):
         """
-        work in progress...
-        :param url:
-        :param data:
-        :return:
+        updates data at ynab URL the generic way
+        :param url: url part for the request appended to base_url member
+        :param json_data: json data to be sent to ynab
+        :param key1: first key to access json dictionary after retrieval
+        :param key2: optional; second key to access json dictionary after retrieval. If not set
+                the whole dictionary under key1 is returned
+        :param method: optional; 'PUT' or 'PATCH'
+        :return: object with the updated data
+        :throws: if an error occurs an exception is raised
         """
-        raise Exception("NOT YET IMPLEMENTED")
+        def handle(result):
+            # PATCH of multiple transactions answers with 209
+            if result.status_code in (200, 209):
+                data = self._json_loads(result.content)[key1]
+                if key2 is None:
+                    return build_model(data, key1)
+                return build_model(data[key2], key2)
+            # build error information and raise an exception
+            raise Exception(self._build_exception_string(self._json_loads(result.content)))
+
+        return self._internal_call(method, url, handle, json_data)
 
-    def _internal_post_stuff(self, url, json_data, key1, key2):
+    # pylint: disable-msg=too-many-arguments
+    def _internal_post_stuff(self, url, json_data, key1, key2, retry_policy=None):
         """
         posts data to ynab URL the generic way
         :param url: url part for the request appended to base_url member
         :param json_data: json data to be posted to ynab
         :param key1: first key to access json dictionary after retrieval
-        :param key2: second key to access json dictionary after retrieval
+        :param key2: second key to access json dictionary after retrieval; None returns the
+                object found under key1
+        :param retry_policy: optional; RetryPolicy replacing the one of the session
         :return: object with created transaction if successful, None if import_id already existed
         :throws: if an error occurs an exception is raised
         """
+        def handle(result):
+            if result.status_code == 201:
+                data = self._json_loads(result.content)[key1]
+                return build_model(data if key2 is None else data[key2], key2)
+            # check for 422 (A transaction with the same import_id already exists)
+            if result.status_code == 422:
+                return None
+            # build error information and raise an exception
+            raise Exception(self._build_exception_string(self._json_loads(result.content)))
+
         # post the data to YNAB
-        result = self.session.post(self.base_url + url, json=json_data)
-        if result.status_code == 201:
-            return self._build_json_object(json.dumps(json.loads(result.text)[key1][key2]))
-        # check for 422 (A transaction with the same import_id already exists)
-        if result.status_code == 422:
-            return None
-        # build error information and raise an exception
-        raise Exception(self._build_exception_string(json.loads(result.text)))
+        return self._internal_call('POST', url, handle, json_data, retry_policy)
+    # pylint: enable-msg=too-many-arguments
 
     def get_user(self):
         """
@@ -118,16 +546,9 @@ class YNABSession(object):
         :return: object with user information
         :throws: if an error occurs an exception is raised
         """
-        # get the response from YNAB
-        result = self.session.get(self.base_url + "user")
-        # check for success
-        if result.status_code == 200:
-            user = json.dumps(json.loads(result.text)["data"]["user"])
-            return self._build_json_object(user)
-        # build error information and raise an exception
-        raise Exception(self._build_exception_string(json.loads(result.text)))
+        return self._internal_get_stuff("user", "data", "user")
 
-    def get_budgets(self, budget_id=None, last_knowledge_of_server=None):
+    def get_budgets(self, budget_id=None, last_knowledge_of_server=None, lazy=False):
         """
         API call
         get budget(s) information from YNAB
@@ -135,6 +556,11 @@ class YNABSession(object):
                 will be retrieved
         :param last_knowledge_of_server: optional; The starting server knowledge. If provided,
                 only entities that have changed since last_knowledge_of_server will be included.
+                Only used together with budget_id.
+        :param lazy: optional; if True the budget is returned as models.LazyModel, which builds
+                the model objects of accounts, transactions etc. only when they are accessed;
+                worth it if only a few fields of a large budget are read.
+                Only used together with budget_id.
         :return: (list of) object(s) with information about budget(s)
                  if budget_id is presented a second return value stands for server_knowledge
         :throws: if an error occurs an exception is raised
@@ -143,59 +569,97 @@ class YNABSession(object):
         url = "budgets"
         if budget_id is None:
             return self._internal_get_stuff(url, 'data', 'budgets')
-        if last_knowledge_of_server is None:
-            return self._internal_get_stuff(url + "/" + budget_id,
-                                            'data',
-                                            'budget',
-                                            'server_knowledge')
-        return self._internal_get_stuff(url, 'data', 'budget')
+        url_vars = {}
+        if last_knowledge_of_server is not None:
+            url_vars.update({'last_knowledge_of_server': last_knowledge_of_server})
+        return self._internal_get_stuff(self._build_url(url + "/" + budget_id, url_vars),
+                                        'data',
+                                        'budget',
+                                        'server_knowledge',
+                                        lazy)
+
+    def get_budget_export(self, budget_id, last_knowledge_of_server=None):
+        """
+        API call
+        get the undecoded budget export from YNAB, e.g. to decode it in a decode_pool.DecodePool
+        :param budget_id: id of the budget to be received
+        :param last_knowledge_of_server: optional; The starting server knowledge. If provided,
+                only entities that have changed since last_knowledge_of_server will be included.
+        :return: the response body as bytes; None if the budget was not found
+        :throws: if an error occurs an exception is raised
+        """
+        url_vars = {}
+        if last_knowledge_of_server is not None:
+            url_vars.update({'last_knowledge_of_server': last_knowledge_of_server})
+
+        def handle(result):
+            if result.status_code == 200:
+                return result.content
+            if result.status_code == 404:
+                return None
+            raise Exception(self._build_exception_string(self._json_loads(result.content)))
+
+        return self._internal_call('GET', self._build_url("budgets/" + budget_id, url_vars),
+                                   handle)
 
-    def get_accounts(self, budget_id, account_id=None):
+    def get_accounts(self, budget_id, account_id=None, last_knowledge_of_server=None):
         """
         API call
         get account(s) information from YNAB
         :param budget_id:  id of the budget to get the account data from
         :param account_id: optional; id of the account to be received. If not set all accounts will
                 be retrieved
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only accounts that have changed since then will be included.
         :return: (list of) object(s) with information about account(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
         url = "budgets/" + budget_id + "/accounts"
         if account_id is None:
-            return self._internal_get_stuff(url, 'data', 'accounts')
+            return self._internal_get_list(url, 'accounts', {}, last_knowledge_of_server)
         return self._internal_get_stuff(url + "/" + account_id, 'data', 'account')
 
-    def get_categories(self, budget_id, category_id=None):
+    def get_categories(self, budget_id, category_id=None, last_knowledge_of_server=None):
         """
         API call
         get categorie(s) information from YNAB
         :param budget_id:  id of the budget to get the account data from
         :param category_id: optional; id of the category to be received. If not set all categories
                 will be retrieved
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only categories that have changed since then will be included.
         :return: (list of) object(s) with information about categorie(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
         url = "budgets/" + budget_id + "/categories"
         if category_id is None:
-            return self._internal_get_stuff(url, 'data', 'category_groups')
+            return self._internal_get_list(url, 'category_groups', {}, last_knowledge_of_server)
         return self._internal_get_stuff(url + "/" + category_id, 'data', 'category')
 
-    def get_payees(self, budget_id, payee_id=None):
+    def get_payees(self, budget_id, payee_id=None, last_knowledge_of_server=None):
         """
         API call
         get payee(s) information from YNAB
         :param budget_id:  id of the budget to get the account data from
         :param payee_id: optional; id of the payee to be received. If not set all payees will be
                 retrieved
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only payees that have changed since then will be included.
         :return: (list of) object(s) with information about payee(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
         url = "budgets/" + budget_id + "/payees"
         if payee_id is None:
-            return self._internal_get_stuff(url, 'data', 'payees')
+            return self._internal_get_list(url, 'payees', {}, last_knowledge_of_server)
         return self._internal_get_stuff(url + "/" + payee_id, 'data', 'payee')
 
     def get_payee_locations(self, budget_id, payee_location_id=None):
@@ -227,23 +691,29 @@ class YNABSession(object):
         url = "budgets/" + budget_id + "/payee" + payee_id + "/payee_locations"
         return self._internal_get_stuff(url, 'data', 'payee_locations')
 
-    def get_months(self, budget_id, month_id=None):
+    def get_months(self, budget_id, month_id=None, last_knowledge_of_server=None):
         """
         API call
         get month(s) information from YNAB
         :param budget_id:  id of the budget to get the account data from
         :param month_id: optional; id of the month to be received. If not set all months will be
                 retrieved
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only months that have changed since then will be included.
         :return: (list of) object(s) with information about month(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
         url = "budgets/" + budget_id + "/months"
         if month_id is None:
-            return self._internal_get_stuff(url, 'data', 'months')
+            return self._internal_get_list(url, 'months', {}, last_knowledge_of_server)
         return self._internal_get_stuff(url + "/" + month_id, 'data', 'month')
 
-    def get_transactions(self, budget_id, transaction_id=None, since_date=None, ttype=None):
+    # pylint: disable-msg=too-many-arguments
+    def get_transactions(self, budget_id, transaction_id=None, since_date=None, ttype=None,
+                         last_knowledge_of_server=None):
         """
         API call
         get transaction(s) information from YNAB
@@ -251,28 +721,78 @@ class YNABSession(object):
         :param transaction_id:  optional; only one specific transaction will be retrieved
         :param since_date:      optional; limit the retrieved data to transactions since this date
         :param ttype:           optional; limit the retrieved data to transactions matching the type
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only transactions that have changed since then will be included.
         :return: (list of) object(s) with information about transaction(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
         url = "budgets/" + budget_id + "/transactions"
-        url_vars = {}
         if transaction_id is None:
-            if since_date is not None:
-                url_vars.update({'since_date': since_date})
-            if ttype is not None:
-                url_vars.update({'type': ttype})
-            return self._internal_get_stuff(url + urlencode(url_vars), 'data', 'transactions')
+            return self._internal_get_list(url, 'transactions',
+                                           _transactions_query(since_date, ttype),
+                                           last_knowledge_of_server)
         return self._internal_get_stuff(url + "/" + transaction_id, 'data', 'transaction')
+    # pylint: enable-msg=too-many-arguments
 
-    def get_transactions_for_account(self, budget_id, account_id, since_date=None):
+    def iter_transactions(self, budget_id, since_date=None, ttype=None):
+        """
+        API call
+        get transactions from YNAB one at a time. The response is decoded incrementally while
+        it is received, so memory stays flat regardless of the size of the budget.
+        :param budget_id:  all transactions for this budget will be retrieved
+        :param since_date: optional; limit the retrieved data to transactions since this date
+        :param ttype:      optional; limit the retrieved data to transactions matching the type
+        :return: yields objects with information about a transaction
+        :throws: if an error occurs an exception is raised
+        """
+        url = self._build_url("budgets/" + budget_id + "/transactions",
+                              _transactions_query(since_date, ttype))
+        start = time.perf_counter()
+        try:
+            result = self._send_request('GET', url, stream=True)
+        except Exception as error:
+            if self.observers:
+                self._notify('GET', url, None, 0, time.perf_counter() - start, 0.0, error)
+            raise
+        received = time.perf_counter()
+        size = [0]
+
+        def chunks():
+            for chunk in result.iter_content(chunk_size=1 << 16):
+                size[0] += len(chunk)
+                yield chunk
+
+        try:
+            if result.status_code == 404:
+                return
+            if result.status_code != 200:
+                raise Exception(self._build_exception_string(self._json_loads(result.content)))
+            for transaction in iter_json_array(chunks(), 'transactions'):
+                yield build_model(transaction, 'transactions')
+        finally:
+            result.close()
+            if self.observers:
+                # the body is received while decoding, so decode_time includes its transfer
+                # and the time the caller spent between the transactions
+                self._notify('GET', url, result, size[0], received - start,
+                             time.perf_counter() - received)
+
+    def get_transactions_for_account(self, budget_id, account_id, since_date=None,
+                                     last_knowledge_of_server=None):
         """
         API call
         get transaction(s) information from YNAB
         :param budget_id:  all transactions for this budget will be retrieved if set alone
         :param account_id: all transactions for this account will be retrieved
         :param since_date: optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only transactions that have changed since then will be included.
         :return: (list of) object(s) with information about transaction(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
@@ -280,16 +800,21 @@ class YNABSession(object):
         url = "budgets/" + budget_id + "/accounts/" + account_id + "/transactions"
         if since_date is not None:
             url_vars.update({'since_date': since_date})
-        return self._internal_get_stuff(url + urlencode(url_vars), 'data', 'transactions')
+        return self._internal_get_list(url, 'transactions', url_vars, last_knowledge_of_server)
 
-    def get_transactions_for_category(self, budget_id, category_id, since_date=None):
+    def get_transactions_for_category(self, budget_id, category_id, since_date=None,
+                                      last_knowledge_of_server=None):
         """
         API call
         get transaction(s) information from YNAB
         :param budget_id:   all transactions for this budget will be retrieved if set alone
         :param category_id: all transactions for this category will be retrieved
         :param since_date:  optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only transactions that have changed since then will be included.
         :return: (list of) object(s) with information about transaction(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
@@ -297,16 +822,21 @@ class YNABSession(object):
         url = "budgets/" + budget_id + "/categories/" + category_id + "/transactions"
         if since_date is not None:
             url_vars.update({'since_date': since_date})
-        return self._internal_get_stuff(url + urlencode(url_vars), 'data', 'transactions')
+        return self._internal_get_list(url, 'transactions', url_vars, last_knowledge_of_server)
 
-    def get_transactions_for_payee(self, budget_id, payees_id, since_date=None):
+    def get_transactions_for_payee(self, budget_id, payees_id, since_date=None,
+                                   last_knowledge_of_server=None):
         """
         API call
         get transaction(s) information from YNAB
         :param budget_id:  all transactions for this budget will be retrieved if set alone
         :param payees_id:  all transactions for this payee will be retrieved
         :param since_date: optional; limit the retrieved data to transactions since this date
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only transactions that have changed since then will be included.
         :return: (list of) object(s) with information about transaction(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
@@ -314,21 +844,28 @@ class YNABSession(object):
         url = "budgets/" + budget_id + "/payees/" + payees_id + "/transactions"
         if since_date is not None:
             url_vars.update({'since_date': since_date})
-        return self._internal_get_stuff(url + urlencode(url_vars), 'data', 'transactions')
+        return self._internal_get_list(url, 'transactions', url_vars, last_knowledge_of_server)
 
-    def get_scheduled_transactions(self, budget_id, scheduled_transaction_id=None):
+    def get_scheduled_transactions(self, budget_id, scheduled_transaction_id=None,
+                                   last_knowledge_of_server=None):
         """
         API call
         get scheduled transaction(s) information from YNAB
         :param budget_id: all transactions for this budget will be retrieved if set alone
         :param scheduled_transaction_id: optional; only one specific transaction will be retrieved
+        :param last_knowledge_of_server: optional; The starting server knowledge (0 for all).
+                If provided, only scheduled transactions that have changed since then will be
+                included.
         :return: (list of) object(s) with information about transaction(s)
+                 if last_knowledge_of_server is presented a second return value stands for
+                 server_knowledge
         :throws: if an error occurs an exception is raised
         """
         # get the response from YNAB
         url = "budgets/" + budget_id + "/scheduled_transactions"
         if scheduled_transaction_id is None:
-            return self._internal_get_stuff(url, 'data', 'scheduled_transactions')
+            return self._internal_get_list(url, 'scheduled_transactions', {},
+                                           last_knowledge_of_server)
         return self._internal_get_stuff(url + "/" + scheduled_transaction_id,
                                         'data',
                                         'scheduled_transaction')
@@ -345,17 +882,72 @@ class YNABSession(object):
         url = "budgets/" + budget_id + "/transactions"
         return self._internal_post_stuff(url, transaction, 'data', 'transaction')
 
+    def post_transactions(self, budget_id, transactions):
+        """
+        API call
+        posts several transactions to YNAB with a single request
+        Unlike post_transaction_bulk the result holds the created transactions including their
+        import_id; the request is not split into chunks.
+        :param budget_id: the budget id which these transactions are for
+        :param transactions: json object from build_transactions_json
+        :return: object with transaction_ids, transactions and duplicate_import_ids
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/transactions"
+        return self._internal_post_stuff(url, transactions, 'data', None)
+
     def post_transaction_bulk(self, budget_id, transactions):
         """
         API call
         posts transactions as bulk to YNAB
+        More than bulk_chunk_size transactions are split into chunks which are sent by up to
+        bulk_workers threads; a chunk failing transiently is sent again up to bulk_retries times.
         :param budget_id: the budget id which these transactions are for
-        :param transactions: array of json objects containing the transaction data
-        :return: json object with bulk import information
-        :throws: if an error occurs an exception is raised
+        :param transactions: json object from build_transactions_json or batch.TransactionBatch;
+                a TransactionBatch is validated before anything is sent
+        :return: json object with bulk import information (merged over all chunks)
+        :throws: BulkPostError if chunks failed, carrying the result of the successful ones;
+                 the exception of TransactionBatch.validate for an invalid batch
         """
         url = "budgets/" + budget_id + "/transactions/bulk"
-        return self._internal_post_stuff(url, transactions, 'data', 'bulk')
+        if isinstance(transactions, TransactionBatch):
+            transactions.validate()
+            items = transactions
+        else:
+            items = transactions['transactions']
+        if len(items) <= self.bulk_chunk_size:
+            return self._internal_post_stuff(url, transactions, 'data', 'bulk')
+        return _merge_bulk_results(self._dispatch_chunks(
+            lambda chunk: self._post_bulk_chunk(url, chunk), items))
+
+    def _dispatch_chunks(self, function, items):
+        """
+        splits items into chunks of bulk_chunk_size and calls function for each of them using
+        up to bulk_workers threads
+        :param function: function taking a chunk (list of items)
+        :param items: list of items
+        :return: list of (chunk, result, exception) tuples in the order of the chunks;
+                 exception is None for successful chunks
+        """
+        chunks = [items[start:start + self.bulk_chunk_size]
+                  for start in range(0, len(items), self.bulk_chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.bulk_workers) as executor:
+            futures = [executor.submit(function, chunk) for chunk in chunks]
+        return [(chunk, None if future.exception() else future.result(), future.exception())
+                for chunk, future in zip(chunks, futures)]
+
+    def _post_bulk_chunk(self, url, chunk):
+        """
+        posts one chunk of a bulk post; transient failures are retried by retry_policy with
+        bulk_retries as limit
+        :param url: url part for the request appended to base_url member
+        :param chunk: list of transaction json objects or TransactionBatch
+        :return: json object with bulk import information of this chunk
+        :throws: if an error occurs an exception is raised
+        """
+        json_data = chunk if isinstance(chunk, TransactionBatch) else {'transactions': chunk}
+        return self._internal_post_stuff(url, json_data, 'data', 'bulk',
+                                         self.retry_policy.with_max_retries(self.bulk_retries))
 
     def put_transaction(self, budget_id, transaction_id, transaction):
         """
@@ -364,11 +956,24 @@ class YNABSession(object):
         :param budget_id: the budget id which this transaction is for
         :param transaction_id: the id of the transaction to be updated
         :param transaction: json object containing the transaction data
-        :return: True if a transaction has been created
+        :return: object with the updated transaction
         :throws: if an error occurs an exception is raised
         """
         url = "budgets/" + budget_id + "/transactions/" + transaction_id
-        return self._internal_put_stuff(url, transaction)
+        return self._internal_put_stuff(url, transaction, 'data', 'transaction')
+
+    def patch_transactions(self, budget_id, transactions):
+        """
+        API call
+        updates multiple existing transactions with one request
+        :param budget_id: the budget id which these transactions are for
+        :param transactions: json object {"transactions": [...]}; every transaction needs its id
+                and only the fields to be changed
+        :return: object with transaction_ids, transactions and server_knowledge
+        :throws: if an error occurs an exception is raised
+        """
+        url = "budgets/" + budget_id + "/transactions"
+        return self._internal_put_stuff(url, transactions, 'data', method='PATCH')
 
 
 if __name__ == '__main__':
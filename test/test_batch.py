@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the batch module (offline, no API token needed)
+"""
+
+import json
+import unittest
+from pynab.batch import FIELDS, TransactionBatch
+from pynab.pynab import YNAB
+from pynab.retry import RetryPolicy, replay_safe
+from test_ynap_api import BulkServer, FakeResponse, FakeSession
+
+
+def batch(count, stream=False, **fields):
+    """
+    builds a batch and the matching transactions from build_transaction_json
+    """
+    transactions = []
+    result = TransactionBatch(stream)
+    for index in range(count):
+        values = dict(account_id='a1', date='2018-03-%02d' % (index % 28 + 1),
+                      amount=-index * 10, payee_id=None, payee_name='Shöp "%d"' % index,
+                      category_id=None, memo=None if index % 2 else 'memo',
+                      cleared='cleared', approved=bool(index % 2), flag_color=None,
+                      import_id='YNAB:%d:2018-03-01:1' % index)
+        values.update(fields)
+        result.append(**values)
+        transactions.append(YNAB.build_transaction_json(**values))
+    return result, YNAB.build_transactions_json(transactions)
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Test class for batch.py
+    """
+
+    def test_serialization(self):
+        """
+        This tests that both encodings equal the json of build_transactions_json
+        :return: nothing
+        """
+        transactions, expected = batch(25)
+        self.assertEqual(json.loads(transactions.to_json()), expected)
+        self.assertEqual(json.loads(b''.join(transactions.iter_json(chunk_size=7))), expected)
+        self.assertEqual(json.loads(transactions[5:10].to_json())['transactions'],
+                         expected['transactions'][5:10])
+        self.assertEqual(json.loads(TransactionBatch().to_json()), {'transactions': []})
+        extended = TransactionBatch()
+        extended.extend(tuple(t[field] for field in FIELDS) for t in expected['transactions'])
+        self.assertEqual(extended.to_json(), transactions.to_json())
+        rows = [tuple(t[field] for field in FIELDS) for t in expected['transactions'][:2]]
+        rows.append(rows[0][:2] + (1.5,) + rows[0][3:])
+        self.assertRaises(TypeError, extended.extend, rows)
+        self.assertRaises(TypeError, extended.extend, [rows[0][:-1]])
+        self.assertEqual({len(column) for column in extended.columns.values()}, {25})
+
+    def test_validate(self):
+        """
+        This tests that invalid columns are reported with the first invalid row
+        :return: nothing
+        """
+        batch(10)[0].validate()
+        transactions, _ = batch(3)
+        transactions.columns['date'][2] = '2018-3-1'
+        self.assertRaisesRegex(Exception, "invalid date in transaction 2",
+                               transactions.validate)
+        self.assertRaisesRegex(Exception, "cleared", batch(2, cleared='maybe')[0].validate)
+        self.assertRaisesRegex(Exception, "import_id in transaction 1",
+                               batch(2, import_id='x')[0].validate)
+        transactions, _ = batch(4)
+        transactions.columns['import_id'][:] = [None, None, 'x', 'x']
+        self.assertRaisesRegex(Exception, "import_id in transaction 3", transactions.validate)
+        self.assertRaises(TypeError, TransactionBatch().append, 'a1', '2018-03-01', 1.5, None,
+                          None, None, None, 'cleared', False, None, None)
+        self.assertFalse(replay_safe('POST', batch(2, import_id=None)[0]))
+        self.assertTrue(replay_safe('POST', batch(2)[0]))
+
+    def test_post(self):
+        """
+        This tests that a batch is posted in chunks with streamed bodies
+        :return: nothing
+        """
+        ynab_session = YNAB('token', bulk_chunk_size=2, retry_policy=RetryPolicy(max_retries=0))
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(*[
+            FakeResponse(201, {"data": {"bulk": {"transaction_ids": ["t%d" % index],
+                                                 "duplicate_import_ids": []}}})
+            for index in range(3)])
+        transactions, expected = batch(5, stream=True)
+        result = ynab_session.post_transaction_bulk('b1', transactions)
+        self.assertEqual(len(result.transaction_ids), 3)
+        sent = []
+        for _, _, kwargs in ynab_session.session.requests:
+            self.assertEqual(kwargs['headers']['Content-Type'], 'application/json')
+            sent.extend(json.loads(b''.join(kwargs['data']))['transactions'])
+        self.assertEqual(sorted(t['import_id'] for t in sent),
+                         sorted(t['import_id'] for t in expected['transactions']))
+        self.assertRaisesRegex(Exception, "cleared", ynab_session.post_transaction_bulk, 'b1',
+                               batch(2, cleared='maybe')[0])
+        self.assertEqual(len(ynab_session.session.requests), 3)
+
+    def test_post_stream_server(self):
+        """
+        This tests that a streamed batch arrives complete over a real connection
+        :return: nothing
+        """
+        with BulkServer() as server:
+            with YNAB('token', bulk_chunk_size=3) as ynab_session:
+                ynab_session.base_url = server.url
+                transactions, _ = batch(7, stream=True)
+                result = ynab_session.post_transaction_bulk('b1', transactions)
+                self.assertEqual(len(result.transaction_ids), 7)
+                result = ynab_session.post_transaction_bulk('b1', batch(7, stream=True)[0])
+                self.assertEqual(len(result.duplicate_import_ids), 7)
+            self.assertEqual(server.created, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
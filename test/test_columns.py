@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the columns module
+"""
+
+import unittest
+from pynab.models import build_model
+
+try:
+    import numpy
+    from pynab.columns import to_columns, columns_to_frame
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumns(unittest.TestCase):
+    """
+    Test class for columns.py
+    """
+
+    def setUp(self):
+        self.transactions = build_model([
+            {"id": "t1", "date": "2018-03-31", "amount": -1000, "memo": None,
+             "cleared": "cleared", "approved": True, "flag_color": None, "account_id": "a1",
+             "payee_id": "p1", "category_id": "c1", "transfer_account_id": None,
+             "subtransactions": []},
+            {"id": "t2", "date": "2018-04-01", "amount": -3000, "memo": "split",
+             "cleared": "uncleared", "approved": False, "flag_color": "red", "account_id": "a1",
+             "payee_id": "p2", "category_id": None, "transfer_account_id": None,
+             "subtransactions": [
+                 {"id": "s1", "transaction_id": "t2", "amount": -1000, "memo": None,
+                  "payee_id": None, "category_id": "c1", "transfer_account_id": None,
+                  "deleted": False},
+                 {"id": "s2", "transaction_id": "t2", "amount": -2000, "memo": None,
+                  "payee_id": None, "category_id": "c2", "transfer_account_id": None,
+                  "deleted": False}]}], 'transactions')
+
+    def test_to_columns(self):
+        """
+        This tests types and subtransaction flattening of the columns
+        :return: nothing
+        """
+        columns = to_columns(self.transactions)
+        self.assertEqual(columns['amount'].dtype, numpy.int64)
+        self.assertEqual(columns['amount'].tolist(), [-1000, -1000, -2000])
+        self.assertEqual(str(columns['date'].dtype), 'datetime64[D]')
+        self.assertEqual(columns['parent_id'].codes.tolist(), [-1, 0, 0])
+        self.assertEqual(columns['category_id'].categories.tolist(), ['c1', 'c2'])
+        self.assertEqual(columns['approved'].tolist(), [True, False, False])
+        payees = columns['payee_id']
+        self.assertEqual([payees.categories[code] for code in payees.codes], ['p1', 'p2', 'p2'])
+        by_category = numpy.bincount(columns['category_id'].codes, weights=columns['amount'])
+        self.assertEqual(by_category.tolist(), [-2000, -2000])
+        self.assertEqual(len(to_columns(self.transactions, False)['amount']), 2)
+        self.assertEqual(len(to_columns([])['amount']), 0)
+
+    def test_frame(self):
+        """
+        This tests the pandas conversion
+        :return: nothing
+        """
+        try:
+            frame = columns_to_frame(to_columns(self.transactions))
+        except ImportError:
+            self.skipTest("pandas is not installed")
+        self.assertEqual(frame.groupby('account_id', observed=True)['amount'].sum()['a1'], -4000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the csv_import module
+"""
+
+import os
+import tempfile
+import unittest
+from pynab.csv_import import parse_amount, read_csv_transactions
+
+
+class TestCsvImport(unittest.TestCase):
+    """
+    Test class for csv_import.py
+    """
+
+    def test_parse_amount(self):
+        """
+        This tests plain, formatted and accounting style amounts
+        :return: nothing
+        """
+        self.assertEqual(parse_amount('$1,234.56'), 1234560)
+        self.assertEqual(parse_amount(' -5 '), -5000)
+        self.assertEqual(parse_amount(''), 0)
+        self.assertEqual(parse_amount(' \t'), 0)
+        self.assertEqual(parse_amount('1.234,5', decimal_separator=','), 1234500)
+        self.assertEqual(parse_amount('(12.34)'), -12340)
+        self.assertEqual(parse_amount('$(1,234.56)'), -1234560)
+        self.assertEqual(parse_amount('(12,34 €)', decimal_separator=','), -12340)
+        for value in ('(-12.34)', '(12.34', '12.34)', '((12))', 'abc.d', 'N/A', 'abc', '$'):
+            self.assertRaises(ValueError, parse_amount, value)
+
+    def test_invalid_row(self):
+        """
+        This tests that an amount without digits names its line instead of importing 0
+        :return: nothing
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'import.csv')
+            with open(filename, 'w', encoding='utf-8') as csv_file:
+                csv_file.write("Date,Payee,Outflow,Inflow\n"
+                               "2018-03-31,Shop,12.34,\n"
+                               "2018-04-01,Shop,N/A,\n")
+            with self.assertRaisesRegex(ValueError, "line 3 of .*: invalid amount: N/A"):
+                list(read_csv_transactions(filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
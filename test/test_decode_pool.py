@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the decode_pool module (offline, no API token needed)
+"""
+
+import json
+import unittest
+from pynab.decode_pool import DecodePool, decode_budget
+from pynab.columns import numpy
+from pynab.pynab import YNAB
+from test_ynap_api import FakeResponse, FakeSession
+
+BUDGET = {"data": {"server_knowledge": 5, "budget": {
+    "id": "b1", "name": "Testing", "currency_format": {"iso_code": "EUR"},
+    "accounts": [{"id": "a1", "name": "Bank"}, {"id": "a2", "name": "Cash", "note": "x"}],
+    "months": [{"month": "2018-01-01", "categories": [{"id": "c1", "budgeted": 10}]}],
+    "transactions": [{"id": "t1", "date": "2018-01-02", "amount": -1000, "account_id": "a1",
+                      "cleared": "cleared", "approved": True}]}}}
+
+
+class TestDecodePool(unittest.TestCase):
+    """
+    Test class for decode_pool.py
+    """
+
+    def test_decode_budget(self):
+        """
+        This tests the compact records and the models built from them
+        :return: nothing
+        """
+        decoded = decode_budget(json.dumps(BUDGET).encode('utf-8'))
+        self.assertEqual(decoded.server_knowledge, 5)
+        self.assertEqual(decoded.info['currency_format'], {"iso_code": "EUR"})
+        self.assertEqual(decoded.records['accounts'],
+                         (('id', 'name', 'note'), [('a1', 'Bank', None), ('a2', 'Cash', 'x')]))
+        accounts = decoded.models('accounts')
+        self.assertEqual(type(accounts[1]).__name__, 'Account')
+        self.assertEqual(accounts[1].note, 'x')
+        self.assertEqual(decoded.models('months')[0].categories[0].budgeted, 10)
+        self.assertEqual(decoded.models('payees'), [])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_fetch_all_budgets(self):
+        """
+        This tests decoding in worker processes with columnar transactions
+        :return: nothing
+        """
+        ynab_session = YNAB('token')
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(FakeResponse(200, BUDGET), FakeResponse(200, BUDGET))
+        with DecodePool(processes=2, columnar=True) as decode_pool:
+            decoded = list(ynab_session.fetch_all_budgets(budget_ids=['b1', 'b2'],
+                                                          decode_pool=decode_pool))
+        self.assertEqual(len(decoded), 2)
+        self.assertEqual(decoded[0].columns['amount'].tolist(), [-1000])
+        self.assertNotIn('transactions', decoded[0].records)
+        self.assertEqual(decoded[0].info['name'], 'Testing')
+
+    def test_fetch_not_found(self):
+        """
+        This tests that a budget which was not found is not handed to the workers
+        :return: nothing
+        """
+        ynab_session = YNAB('token')
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(FakeResponse(404, {"error": {
+            "id": "404.2", "name": "resource_not_found", "detail": "x"}}))
+        with DecodePool(processes=1) as decode_pool:
+            self.assertEqual(list(ynab_session.fetch_all_budgets(budget_ids=['b1'],
+                                                                 decode_pool=decode_pool)),
+                             [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
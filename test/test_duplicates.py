@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the duplicates module (offline, no API token needed)
+"""
+
+import os
+import tempfile
+import unittest
+from pynab.duplicates import BloomDuplicateBackend, DuplicateIndex, SqliteDuplicateBackend
+from pynab.models import build_model
+
+
+class TestDuplicates(unittest.TestCase):
+    """
+    Test class for duplicates.py
+    """
+
+    def check_backend(self, backend):
+        """
+        checks an index on the given backend
+        :param backend: the backend
+        :return: nothing
+        """
+        duplicate_index = DuplicateIndex(backend, fingerprints=True)
+        duplicate_index.add_transactions(build_model([
+            {"account_id": "a1", "amount": -1000, "date": "2018-03-31", "import_id": "bank-1"},
+            {"account_id": "a1", "amount": -5000, "date": "2018-04-01", "import_id": None},
+            {"account_id": "a1", "amount": -5000, "date": "2018-04-01", "import_id": None},
+            {"account_id": "a1", "amount": -7000, "date": "2018-04-02", "import_id": "x",
+             "deleted": True}], 'transactions'))
+        duplicate_index.add('a2', ['YNAB:1:2018-01-01:1', None])
+        self.assertEqual(duplicate_index.known('a1', [
+            'bank-1', 'YNAB:-5000:2018-04-01:1', 'YNAB:-5000:2018-04-01:2',
+            'YNAB:-5000:2018-04-01:3', 'x', None, 'YNAB:1:2018-01-01:1']),
+                         [True, True, True, False, False, False, False])
+        self.assertEqual(duplicate_index.known('a2', ['YNAB:1:2018-01-01:1', None]), [True, False])
+
+    def test_memory(self):
+        """
+        This tests the memory backend
+        :return: nothing
+        """
+        self.check_backend(None)
+
+    def test_sqlite(self):
+        """
+        This tests the SQLite backend
+        :return: nothing
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            backend = SqliteDuplicateBackend(os.path.join(directory, 'ids.sqlite'))
+            self.check_backend(backend)
+            backend.connection.close()
+
+    def test_bloom(self):
+        """
+        This tests the Bloom filter backend and that it survives saving
+        :return: nothing
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'ids.bloom')
+            backend = BloomDuplicateBackend(capacity=1000, filename=filename)
+            self.check_backend(backend)
+            backend.save()
+            loaded = BloomDuplicateBackend(capacity=10, filename=filename)
+            self.assertEqual(loaded.contains(['a1:bank-1', 'a1:bank-2']), [True, False])
+            self.assertEqual(len(loaded.bits), len(backend.bits))
+
+
+if __name__ == '__main__':
+    unittest.main()
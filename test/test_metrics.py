@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the metrics module and the instrumentation of YNABSession
+"""
+
+import cProfile
+import unittest
+import requests
+from pynab.retry import RetryPolicy
+from pynab.metrics import RequestEvent, RequestMetrics, endpoint_template
+from pynab.ynap_api import YNABSession
+from test_ynap_api import FakeResponse, FakeSession
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test class for metrics.py
+    """
+
+    def test_endpoint_template(self):
+        """
+        This tests that ids and query strings are removed from urls
+        :return: nothing
+        """
+        self.assertEqual(endpoint_template('budgets/b1/transactions/t1?type=x'),
+                         'budgets/{id}/transactions/{id}')
+        self.assertEqual(endpoint_template('budgets/b1/transactions/bulk'),
+                         'budgets/{id}/transactions/bulk')
+        self.assertEqual(endpoint_template('user'), 'user')
+
+    def test_prometheus(self):
+        """
+        This tests the counters and histograms of the text export
+        :return: nothing
+        """
+        events = []
+        metrics = RequestMetrics(buckets=(0.1, 1.0), callback=events.append)
+        metrics(RequestEvent('GET', 'budgets', 200, 10, 0.05, 0.5, False))
+        metrics(RequestEvent('GET', 'budgets', 200, 10, 2.0, 0.01, False))
+        metrics(RequestEvent('GET', 'budgets', 200, 10, 0.0, 0.01, True))
+        self.assertEqual(len(events), 3)
+        self.assertEqual(metrics.requests('budgets', from_cache=False), 2)
+        text = metrics.to_prometheus()
+        labels = 'method="GET",endpoint="budgets",status="200",cache="false"'
+        self.assertIn('pynab_requests_total{%s} 2\n' % labels, text)
+        self.assertIn('pynab_response_bytes_total{%s} 20\n' % labels, text)
+        self.assertIn('pynab_request_latency_seconds_bucket{%s,le="0.1"} 1\n' % labels, text)
+        self.assertIn('pynab_request_latency_seconds_bucket{%s,le="1.0"} 1\n' % labels, text)
+        self.assertIn('pynab_request_latency_seconds_bucket{%s,le="+Inf"} 2\n' % labels, text)
+        self.assertIn('pynab_decode_seconds_count{%s} 2\n' % labels, text)
+
+    def test_session_observer(self):
+        """
+        This tests that the session reports every call, including failed ones
+        :return: nothing
+        """
+        metrics = RequestMetrics()
+        profiler = cProfile.Profile()
+        ynab_session = YNABSession('token', decode_profiler=profiler)
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(
+            FakeResponse(200, {"data": {"accounts": [{"id": "a1"}]}}),
+            FakeResponse(404, {"error": {}}))
+        ynab_session.add_observer(metrics)
+        events = []
+        ynab_session.add_observer(events.append)
+        self.assertEqual(ynab_session.get_accounts('b1')[0].id, 'a1')
+        self.assertIsNone(ynab_session.get_accounts('b1', 'a2'))
+        self.assertEqual([(e.endpoint, e.status) for e in events],
+                         [('budgets/{id}/accounts', 200), ('budgets/{id}/accounts/{id}', 404)])
+        self.assertEqual(events[0].bytes, len(b'{"data": {"accounts": [{"id": "a1"}]}}'))
+        self.assertEqual(metrics.requests(), 2)
+        self.assertTrue(profiler.getstats())
+
+    def test_timings(self):
+        """
+        This tests that waiting between retries is not reported as latency and that failing
+        observers neither hide errors nor other observers
+        :return: nothing
+        """
+        ynab_session = YNABSession('token', retry_policy=RetryPolicy())
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(
+            FakeResponse(503, {"error": {}}, {'Retry-After': '0.05'}),
+            FakeResponse(200, {"data": {"user": {"id": "u1"}}}),
+            FakeResponse(400, {"error": {"id": "400", "name": "bad_request", "detail": "x"}}))
+        events = []
+
+        def failing(event):
+            raise ValueError(event)
+
+        ynab_session.add_observer(failing)
+        ynab_session.add_observer(events.append)
+        with self.assertLogs('pynab.ynap_api', 'ERROR'):
+            self.assertEqual(ynab_session.get_user().id, 'u1')
+        self.assertEqual(events[0].attempts, 2)
+        self.assertGreaterEqual(events[0].wait_time, 0.05)
+        self.assertLess(events[0].latency, 0.05)
+        with self.assertLogs('pynab.ynap_api', 'ERROR'):
+            self.assertRaisesRegex(Exception, "bad_request", ynab_session.get_user)
+        self.assertEqual(events[1].status, 400)
+
+    def test_request_errors(self):
+        """
+        This tests that calls failing without response are reported with the exception
+        :return: nothing
+        """
+        ynab_session = YNABSession('token', retry_policy=RetryPolicy(max_retries=1,
+                                                                     sleep=lambda _: None))
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(*[requests.exceptions.ConnectionError("down")] * 4)
+        metrics = RequestMetrics()
+        events = []
+        ynab_session.add_observer(metrics)
+        ynab_session.add_observer(events.append)
+        self.assertRaises(requests.exceptions.ConnectionError, ynab_session.get_user)
+        self.assertRaises(requests.exceptions.ConnectionError, list,
+                          ynab_session.iter_transactions('b1'))
+        self.assertEqual([(e.endpoint, e.status, e.attempts) for e in events],
+                         [('user', None, 2), ('budgets/{id}/transactions', None, 2)])
+        self.assertIsInstance(events[0].error, requests.exceptions.ConnectionError)
+        self.assertIn('status="error"', metrics.to_prometheus())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the models module (offline, no API token needed)
+"""
+
+import json
+import unittest
+from pynab.models import LazyModel, build_model, model_class, model_to_data
+from pynab.ynap_api import YNABSession
+
+
+class TestModels(unittest.TestCase):
+    """
+    Test class for models.py
+    """
+
+    def test_attribute_access(self):
+        """
+        This tests that nested json objects are reachable by attribute
+        :return: nothing
+        """
+        budget = build_model({"id": "b1",
+                              "name": "Testing",
+                              "currency_format": {"iso_code": "EUR"},
+                              "accounts": [{"id": "a1", "name": "Bank"}]}, 'budget')
+        self.assertEqual(budget.id, "b1")
+        self.assertEqual(budget.currency_format.iso_code, "EUR")
+        self.assertEqual(budget.accounts[0].name, "Bank")
+        self.assertEqual(type(budget).__name__, 'Budget')
+        self.assertEqual(type(budget.accounts[0]).__name__, 'Account')
+        self.assertEqual(type(budget.currency_format).__name__, 'CurrencyFormat')
+
+    def test_classes_are_cached(self):
+        """
+        This tests that objects with the same layout share one class
+        :return: nothing
+        """
+        transactions = YNABSession._build_json_object(
+            json.dumps([{"id": "t1", "amount": 1000}, {"id": "t2", "amount": -5}]),
+            'transactions')
+        self.assertIs(type(transactions[0]), type(transactions[1]))
+        self.assertIs(type(transactions[0]), model_class('Transaction', ('id', 'amount')))
+        self.assertFalse(hasattr(transactions[0], '__dict__'))
+
+    def test_invalid_identifiers(self):
+        """
+        This tests that keys which are no valid identifiers do not break decoding
+        :return: nothing
+        """
+        obj = build_model({"id": "x", "class": 1, "_private": 2})
+        self.assertEqual(obj.id, "x")
+        self.assertEqual(obj[1], 1)
+        self.assertEqual(obj[2], 2)
+
+    def test_lazy_model(self):
+        """
+        This tests that a lazy model builds fields on first access only
+        :return: nothing
+        """
+        data = {"id": "b1", "accounts": [{"id": "a1"}], "transactions": [{"id": "t1"}]}
+        budget = LazyModel(data, 'budget')
+        self.assertEqual(budget.id, "b1")
+        self.assertEqual(type(budget.accounts[0]).__name__, 'Account')
+        self.assertEqual(set(budget._values), {'id', 'accounts'})
+        self.assertIs(budget.accounts, budget.accounts)
+        self.assertEqual(budget._fields, ('id', 'accounts', 'transactions'))
+        self.assertEqual(budget[2][0].id, "t1")
+        self.assertEqual(dict(zip(budget._fields, budget))['id'], "b1")
+        self.assertRaises(AttributeError, getattr, budget, 'payees')
+        self.assertIs(model_to_data(budget), data)
+        self.assertEqual(budget.materialize(), build_model(data, 'budget'))
+        self.assertEqual(budget, build_model(data, 'budget'))
+        self.assertEqual(build_model(data, 'budget'), budget)
+        self.assertNotEqual(budget, LazyModel(dict(data, id="b2"), 'budget'))
+        self.assertEqual(budget._asdict(), build_model(data, 'budget')._asdict())
+        renamed = budget._replace(id="b2")
+        self.assertEqual((renamed.id, budget.id), ("b2", "b1"))
+        self.assertEqual(model_to_data(renamed)['id'], "b2")
+        self.assertRaises(ValueError, budget._replace, payees=[])
+        self.assertEqual(hash(LazyModel({"id": "x"})), hash(build_model({"id": "x"})))
+
+
+if __name__ == '__main__':
+    unittest.main()
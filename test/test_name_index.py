@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the name_index module
+"""
+
+import unittest
+from collections import namedtuple
+from pynab.name_index import NameIndexCache
+
+Named = namedtuple('Named', ('id', 'name'))
+
+
+class TestNameIndexCache(unittest.TestCase):
+    """
+    Test class for name_index.py
+    """
+
+    def setUp(self):
+        self.loads = []
+
+    def _loader(self, *objects):
+        """
+        creates a loader which records its calls
+        :param objects: the objects to be returned
+        :return: the loader function
+        """
+        def loader():
+            self.loads.append(objects)
+            return list(objects)
+        return loader
+
+    def test_first_match_wins(self):
+        """
+        This tests that duplicate names resolve like the former linear search
+        :return: nothing
+        """
+        cache = NameIndexCache()
+        index = cache.get('b1', 'payees', self._loader(Named('p1', 'Shop'), Named('p2', 'Shop')))
+        self.assertEqual(index.lookup('Shop'), 'p1')
+        self.assertIsNone(index.lookup('shop'))
+
+    def test_expiry_eviction_invalidation(self):
+        """
+        This tests TTL expiry, LRU eviction and explicit invalidation
+        :return: nothing
+        """
+        cache = NameIndexCache(ttl=None, max_entries=2)
+        cache.get('b1', 'payees', self._loader(Named('p1', 'Shop')))
+        cache.get('b1', 'accounts', self._loader(Named('a1', 'Bank')))
+        cache.get('b1', 'payees', self._loader())
+        self.assertEqual(len(self.loads), 2)
+        cache.get('b1', 'categories', self._loader(Named('c1', 'Rent')))
+        cache.get('b1', 'payees', self._loader())
+        cache.get('b1', 'accounts', self._loader(Named('a1', 'Bank')))
+        self.assertEqual(len(self.loads), 4)
+        cache.invalidate('b1', 'accounts')
+        cache.get('b1', 'accounts', self._loader(Named('a1', 'Bank')))
+        self.assertEqual(len(self.loads), 5)
+        cache = NameIndexCache(ttl=0)
+        cache.get('b1', 'payees', self._loader())
+        cache.get('b1', 'payees', self._loader())
+        self.assertEqual(len(self.loads), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,10 +4,15 @@
 This module tests the pynab module
 """
 
+import json
 import os
+import tempfile
 import unittest
 import uuid
+from pynab.models import build_model
+from pynab.name_index import NameIndexCache
 from pynab.pynab import YNAB
+from test_ynap_api import FakeResponse, FakeSession
 
 
 class TestYNABModule(unittest.TestCase):
@@ -407,5 +412,244 @@ class TestYNABModule(unittest.TestCase):
         self.assertEqual(len(result.duplicate_import_ids), 2)
 
 
+class TestYNABOffline(unittest.TestCase):
+    """
+    Test class for pynab.py running against canned responses
+    """
+
+    def _session(self, *responses, **kwargs):
+        """
+        creates a YNAB object talking to a FakeSession
+        :param responses: the responses to be returned in order
+        :return: the YNAB object
+        """
+        ynab_session = YNAB('token', **kwargs)
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(*responses)
+        return ynab_session
+
+    def test_sync(self):
+        """
+        This tests that sync() downloads the budget once and merges deltas afterwards
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"server_knowledge": 10, "budget": {
+                "id": "b1", "name": "Testing",
+                "accounts": [{"id": "a1", "name": "Bank", "deleted": False}],
+                "transactions": [{"id": "t1", "amount": 1000, "deleted": False},
+                                 {"id": "t2", "amount": 2000, "deleted": False}]}}}),
+            FakeResponse(200, {"data": {"server_knowledge": 12, "budget": {
+                "id": "b1", "name": "Testing",
+                "accounts": [],
+                "transactions": [{"id": "t1", "amount": 1500, "deleted": False},
+                                 {"id": "t2", "amount": 2000, "deleted": True},
+                                 {"id": "t3", "amount": 3000, "deleted": False}]}}}))
+        local_budget, changes = ynab_session.sync('b1')
+        self.assertEqual(local_budget.server_knowledge, 10)
+        self.assertEqual(len(local_budget.transactions), 2)
+        self.assertEqual(len(changes['transactions']), 2)
+        local_budget, changes = ynab_session.sync('b1')
+        self.assertTrue(ynab_session.session.requests[1][1].endswith(
+            "budgets/b1?last_knowledge_of_server=10"))
+        self.assertEqual(local_budget.server_knowledge, 12)
+        self.assertEqual(local_budget.name, 'Testing')
+        self.assertEqual(sorted((t.id, t.amount) for t in local_budget.transactions),
+                         [('t1', 1500), ('t3', 3000)])
+        self.assertEqual(len(local_budget.accounts), 1)
+        self.assertEqual([(old.amount, new.amount) for old, new in changes['transactions']
+                          if old is not None and new is not None], [(1000, 1500)])
+
+    def test_sync_months(self):
+        """
+        This tests that delta months are merged by category and that a missing budget raises
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"server_knowledge": 1, "budget": {
+                "id": "b1", "months": [{"month": "2018-03-01", "categories": [
+                    {"id": "c1", "budgeted": 10}, {"id": "c2", "budgeted": 20},
+                    {"id": "c3", "budgeted": 30}]}]}}}),
+            FakeResponse(200, {"data": {"server_knowledge": 2, "budget": {
+                "id": "b1", "months": [{"month": "2018-03-01", "categories": [
+                    {"id": "c2", "budgeted": 25},
+                    {"id": "c3", "budgeted": 30, "deleted": True}]}]}}}),
+            FakeResponse(404, {"error": {"id": "404.2", "name": "not_found", "detail": "x"}}))
+        ynab_session.sync('b1')
+        local_budget, changes = ynab_session.sync('b1')
+        self.assertEqual([(c.id, c.budgeted) for c in local_budget.months[0].categories],
+                         [('c1', 10), ('c2', 25)])
+        self.assertEqual(len(changes['months'][0][0].categories), 3)
+        self.assertRaisesRegex(Exception, "budget not found", ynab_session.sync, 'b2')
+
+    def test_resolve_names(self):
+        """
+        This tests that name lookups are answered from one download per collection
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"payees": [{"id": "p1", "name": "Shop"},
+                                                   {"id": "p2", "name": "Caf\u00e9  Bar"}]}}),
+            FakeResponse(200, {"data": {"category_groups": [
+                {"id": "g1", "name": "Bills", "categories": [{"id": "c1", "name": "Rent"}]}]}}),
+            name_index=NameIndexCache(case_sensitive=False, normalize=True))
+        self.assertEqual(ynab_session.get_payee_id('b1', 'shop'), 'p1')
+        self.assertEqual(ynab_session.resolve_names('b1', 'payees', ['CAFE\u0301 bar', 'x']),
+                         {'CAFE\u0301 bar': 'p2', 'x': None})
+        self.assertEqual(ynab_session.get_category_id('b1', 'Rent'), 'c1')
+        self.assertEqual(ynab_session.get_category_id('b1', 'rent'), 'c1')
+        self.assertEqual(len(ynab_session.session.requests), 2)
+
+    def test_import_csv(self):
+        """
+        This tests that import_csv posts chunks with YNAB import ids and counts the results
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"payees": [{"id": "p1", "name": "Shop"}]}}),
+            FakeResponse(201, {"data": {"bulk": {"transaction_ids": ["t1", "t2"],
+                                                 "duplicate_import_ids": []}}}),
+            FakeResponse(201, {"data": {"bulk": {"transaction_ids": [],
+                                                 "duplicate_import_ids": ["YNAB:-5000:2018-04-01:1"]
+                                                 }}}))
+        with tempfile.TemporaryDirectory() as directory:
+            csv_filename = os.path.join(directory, 'bank.csv')
+            with open(csv_filename, 'w') as csv_file:
+                csv_file.write("Date,Payee,Memo,Outflow,Inflow\n"
+                               "03/31/2018,Shop,,\"$1,000.50\",\n"
+                               "03/31/2018,New Payee,rent,\"1,000.50\",\n"
+                               "04/01/2018,Shop,,5.00,\n")
+            self.assertEqual(ynab_session.import_csv('b1', 'a1', csv_filename, chunk_size=2),
+                             (2, 1))
+        first_chunk = json.loads(ynab_session.session.requests[1][2]['data'])['transactions']
+        self.assertEqual([t['import_id'] for t in first_chunk],
+                         ['YNAB:-1000500:2018-03-31:1', 'YNAB:-1000500:2018-03-31:2'])
+        self.assertEqual(first_chunk[0]['payee_id'], 'p1')
+        self.assertEqual(first_chunk[1]['payee_name'], 'New Payee')
+        self.assertEqual(first_chunk[1]['memo'], 'rent')
+
+    def test_import_csv_duplicate_index(self):
+        """
+        This tests that known import ids are not sent and posted ones are remembered
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"transactions": [
+                {"id": "t1", "account_id": "a1", "amount": -5000, "date": "2018-04-01",
+                 "import_id": "YNAB:-5000:2018-04-01:1"}]}}),
+            FakeResponse(201, {"data": {"bulk": {"transaction_ids": ["t2"],
+                                                 "duplicate_import_ids": []}}}))
+        duplicate_index = ynab_session.build_duplicate_index('b1')
+        with tempfile.TemporaryDirectory() as directory:
+            csv_filename = os.path.join(directory, 'bank.csv')
+            with open(csv_filename, 'w') as csv_file:
+                csv_file.write("Date,Outflow,Inflow\n"
+                               "04/01/2018,5.00,\n"
+                               "04/01/2018,5.00,\n")
+            self.assertEqual(ynab_session.import_csv('b1', 'a1', csv_filename,
+                                                     duplicate_index=duplicate_index), (1, 1))
+            sent = json.loads(ynab_session.session.requests[1][2]['data'])['transactions']
+            self.assertEqual([t['import_id'] for t in sent], ['YNAB:-5000:2018-04-01:2'])
+            self.assertEqual(ynab_session.import_csv('b1', 'a1', csv_filename,
+                                                     duplicate_index=duplicate_index), (0, 2))
+        self.assertEqual(len(ynab_session.session.requests), 2)
+
+    def test_update_transactions(self):
+        """
+        This tests that only changed fields are sent in chunks and results are per item
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"server_knowledge": 1, "budget": {
+                "id": "b1", "transactions": [
+                    {"id": "t%d" % i, "category_id": "c1", "memo": None, "deleted": False}
+                    for i in range(4)]}}}),
+            FakeResponse(209, {"data": {"transaction_ids": ["t0", "t1"], "server_knowledge": 2,
+                                        "transactions": [{"id": "t0", "category_id": "c2"},
+                                                         {"id": "t1", "category_id": "c2"}]}}),
+            FakeResponse(400, {"error": {"id": "400", "name": "bad_request", "detail": "x"}}),
+            bulk_chunk_size=2, bulk_workers=1)
+        ynab_session.sync('b1')
+        results = ynab_session.update_transactions('b1', [
+            {"id": "t0", "category_id": "c2", "memo": None},
+            {"id": "t1", "category_id": "c2"},
+            {"id": "t2", "category_id": "c1"},
+            {"id": "t3", "memo": "x"}])
+        self.assertEqual([r.status for r in results], ['updated', 'updated', 'unchanged',
+                                                       'failed'])
+        self.assertEqual(results[0].transaction.category_id, 'c2')
+        method, url, kwargs = ynab_session.session.requests[1]
+        self.assertEqual(method, 'PATCH')
+        self.assertTrue(url.endswith('budgets/b1/transactions'))
+        self.assertEqual(kwargs['json'], {"transactions": [{"id": "t0", "category_id": "c2"},
+                                                           {"id": "t1", "category_id": "c2"}]})
+
+    def test_update_transactions_revert(self):
+        """
+        This tests that reverting an edit is sent, since the local copy follows the updates
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"server_knowledge": 1, "budget": {
+                "id": "b1", "transactions": [{"id": "t0", "category_id": "c1"}]}}}),
+            FakeResponse(209, {"data": {"transaction_ids": ["t0"], "server_knowledge": 2,
+                                        "transactions": [{"id": "t0", "category_id": "c2"}]}}),
+            FakeResponse(209, {"data": {"transaction_ids": ["t0"], "server_knowledge": 3,
+                                        "transactions": [{"id": "t0", "category_id": "c1"}]}}))
+        ynab_session.sync('b1')
+        first = ynab_session.update_transactions('b1', [{"id": "t0", "category_id": "c2"}])
+        second = ynab_session.update_transactions('b1', [{"id": "t0", "category_id": "c1"}])
+        self.assertEqual([first[0].status, second[0].status], ['updated', 'updated'])
+        self.assertEqual([method for method, _, _ in ynab_session.session.requests],
+                         ['GET', 'PATCH', 'PATCH'])
+        self.assertEqual(ynab_session.local_budgets['b1'].entities['transactions']['t0']
+                         .category_id, 'c1')
+
+    def test_update_transactions_originals(self):
+        """
+        This tests that supplied originals are left alone and duplicate ids are rejected
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(209, {"data": {"transaction_ids": ["t0"], "server_knowledge": 2,
+                                        "transactions": [{"id": "t0", "category_id": "c2"}]}}))
+        original = build_model({"id": "t0", "category_id": "c1"}, 'transaction')
+        originals = {"t0": original}
+        self.assertRaisesRegex(ValueError, "t0", ynab_session.update_transactions, 'b1',
+                               [{"id": "t0", "category_id": "c2"},
+                                {"id": "t0", "category_id": "c3"}], originals)
+        self.assertEqual(ynab_session.session.requests, [])
+        results = ynab_session.update_transactions('b1', [{"id": "t0", "category_id": "c2"}],
+                                                   originals)
+        self.assertEqual(results[0].transaction.category_id, 'c2')
+        self.assertEqual(originals, {"t0": original})
+
+    def test_put_transaction(self):
+        """
+        This tests updating a single transaction
+        :return: nothing
+        """
+        ynab_session = self._session(FakeResponse(200, {"data": {"transaction": {
+            "id": "t1", "memo": "new"}}}))
+        result = ynab_session.put_transaction('b1', 't1', {"transaction": {"memo": "new"}})
+        self.assertEqual(result.memo, 'new')
+        self.assertEqual(ynab_session.session.requests[0][0], 'PUT')
+
+    def test_fetch_all_budgets(self):
+        """
+        This tests that every budget of the list is downloaded once
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"budgets": [{"id": "b%d" % i} for i in range(3)]}}),
+            *[FakeResponse(200, {"data": {"budget": {"id": "x"}, "server_knowledge": i}})
+              for i in range(3)])
+        results = list(ynab_session.fetch_all_budgets(concurrency=3))
+        self.assertEqual(sorted(knowledge for _, knowledge in results), [0, 1, 2])
+        self.assertEqual(sorted(url.rsplit('/', 1)[1]
+                                for _, url, _ in ynab_session.session.requests[1:]),
+                         ['b0', 'b1', 'b2'])
+
+
 if __name__ == '__main__':
     unittest.main()
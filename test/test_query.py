@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the query module (offline, no API token needed)
+"""
+
+import unittest
+from pynab.models import build_model
+from pynab.query import DateRange, Equals, TransactionIndex, Where
+
+
+def transaction(transaction_id, date, amount, account_id='a1', category_id='c1', **fields):
+    """
+    builds a transaction object
+    """
+    data = {"id": transaction_id, "date": date, "amount": amount, "account_id": account_id,
+            "category_id": category_id, "payee_id": "p1", "cleared": "cleared",
+            "flag_color": None, "approved": True, "deleted": False, "subtransactions": []}
+    data.update(fields)
+    return build_model(data, 'transaction')
+
+
+class TestQuery(unittest.TestCase):
+    """
+    Test class for query.py
+    """
+
+    def setUp(self):
+        self.index = TransactionIndex([
+            transaction('t1', '2018-01-05', -1000),
+            transaction('t2', '2018-01-31', -2000, category_id='c2', cleared='uncleared'),
+            transaction('t3', '2018-02-01', -3000, account_id='a2'),
+            transaction('t4', '2018-02-10', -5000, category_id=None, subtransactions=[
+                {"id": "s1", "amount": -4000, "category_id": "c1", "payee_id": None,
+                 "deleted": False},
+                {"id": "s2", "amount": -1000, "category_id": "c2", "payee_id": None,
+                 "deleted": False}]),
+        ])
+
+    def test_filters(self):
+        """
+        This tests indexed, ranged and scanning filters and their combinations
+        :return: nothing
+        """
+        def ids(query):
+            return [t.id for t in self.index.select(query)]
+
+        self.assertEqual(ids(Equals('account_id', 'a1')), ['t1', 't2', 't4'])
+        self.assertEqual(ids(DateRange('2018-01-31', '2018-02-01')), ['t2', 't3'])
+        self.assertEqual(ids(DateRange(end='2018-01-31') & Equals('cleared', 'cleared')), ['t1'])
+        self.assertEqual(ids(Equals('category_id', 'c2') | Equals('account_id', 'a2')),
+                         ['t2', 't3', 't4'])
+        self.assertEqual(ids(~Equals('account_id', 'a1')), ['t3'])
+        self.assertEqual(ids(Equals('account_id', 'a1') & Where('amount', lambda a: a < -1500)),
+                         ['t2', 't4'])
+        self.assertEqual(len(self.index), 4)
+
+    def test_sums(self):
+        """
+        This tests that splits are summed per subtransaction
+        :return: nothing
+        """
+        self.assertEqual(self.index.total(), -11000)
+        self.assertEqual(self.index.group_sum('category_id'), {'c1': -8000, 'c2': -3000})
+        self.assertEqual(self.index.group_sum(('month', 'account_id'),
+                                              Equals('category_id', 'c1')),
+                         {('2018-01', 'a1'): -1000, ('2018-02', 'a2'): -3000,
+                          ('2018-02', 'a1'): -4000})
+        # subtransactions without payee inherit the one of their transaction
+        self.assertEqual(self.index.group_sum('payee_id'), {'p1': -11000})
+        self.assertEqual(self.index.total(Equals('payee_id', 'p1') & Equals('category_id', 'c2')),
+                         -3000)
+
+    def test_export_subtransactions(self):
+        """
+        This tests that subtransactions of a budget export are joined to their transaction
+        :return: nothing
+        """
+        split = build_model({"id": "t5", "date": "2018-03-01", "amount": -3000,
+                             "account_id": "a1", "category_id": None, "payee_id": "p2"},
+                            'transaction')
+
+        def subtransaction(subtransaction_id, amount, category_id, deleted=False):
+            return build_model({"id": subtransaction_id, "transaction_id": "t5",
+                                "amount": amount, "category_id": category_id,
+                                "payee_id": None, "deleted": deleted}, 'subtransaction')
+
+        index = TransactionIndex([split], [subtransaction('s5', -1000, 'c1'),
+                                           subtransaction('s6', -2000, 'c2')])
+        self.assertEqual(index.group_sum(('payee_id', 'category_id')),
+                         {('p2', 'c1'): -1000, ('p2', 'c2'): -2000})
+        index.apply([], [(None, subtransaction('s7', -2000, 'c3')),
+                         (index.rows['s6'][1], None)])
+        self.assertEqual(index.group_sum('category_id'), {'c1': -1000, 'c3': -2000})
+        index.update([], [subtransaction('s5', -1000, 'c1', deleted=True)])
+        self.assertEqual(index.group_sum('category_id'), {'c3': -2000})
+        self.assertEqual(index.select(Equals('category_id', 'c3'))[0].id, 't5')
+
+    def test_updates(self):
+        """
+        This tests that replaced and deleted transactions leave no stale index entries
+        :return: nothing
+        """
+        old = self.index.select(Equals('category_id', 'c2'))[0]
+        self.index.update([transaction('t2', '2018-03-01', -7000, category_id='c3')])
+        self.index.apply([(self.index.select(DateRange('2018-02-10'))[0], None)])
+        self.assertNotEqual(old.date, '2018-03-01')
+        self.assertEqual(self.index.group_sum('category_id'), {'c1': -4000, 'c3': -7000})
+        self.assertEqual(self.index.select(DateRange('2018-02-01'))[-1].amount, -7000)
+        self.assertNotIn('c2', self.index.indexes['category_id'])
+        self.index.update([transaction('t1', '2018-01-05', -1000, deleted=True)])
+        self.assertEqual(len(self.index), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
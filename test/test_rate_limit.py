@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the rate_limit module
+"""
+
+import os
+import tempfile
+import unittest
+from pynab.rate_limit import RateLimiter, RateLimitError
+from pynab.ynap_api import YNABSession
+from test_ynap_api import FakeResponse, FakeSession
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Test class for rate_limit.py
+    """
+
+    def test_blocking(self):
+        """
+        This tests that an empty bucket waits (blocking) or raises (non blocking)
+        :return: nothing
+        """
+        waits = []
+        limiter = RateLimiter(limit=2, period=3600, sleep=waits.append)
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(limiter.remaining, 0)
+        limiter.update("0/2")
+        limiter.acquire()
+        self.assertEqual(waits, [])
+        limiter.exhaust()
+        limiter.block = False
+        with self.assertRaises(RateLimitError) as context:
+            limiter.acquire()
+        self.assertAlmostEqual(context.exception.wait, 1800, delta=1)
+
+    def test_shared_state_file(self):
+        """
+        This tests that two limiters share one bucket through a state file
+        :return: nothing
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = os.path.join(directory, 'quota.json')
+            first = RateLimiter(limit=3, state_file=state_file, block=False)
+            second = RateLimiter(limit=3, state_file=state_file, block=False)
+            first.acquire()
+            second.acquire()
+            first.acquire()
+            self.assertRaises(RateLimitError, second.acquire)
+
+    def test_session_reads_header(self):
+        """
+        This tests that the session feeds the limiter from the X-Rate-Limit header
+        :return: nothing
+        """
+        ynab_session = YNABSession('token')
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(
+            FakeResponse(200, {"data": {"user": {"id": "u1"}}}, {'X-Rate-Limit': '150/200'}))
+        ynab_session.get_user()
+        self.assertEqual(ynab_session.rate_limit_remaining, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
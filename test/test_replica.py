@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the replica module offline against canned responses
+"""
+
+import os
+import tempfile
+import unittest
+from pynab.replica import BudgetReplica
+from pynab.ynap_api import YNABSession
+from test_ynap_api import FakeResponse, FakeSession
+
+
+class TestBudgetReplica(unittest.TestCase):
+    """
+    Test class for replica.py
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'budget.sqlite')
+        self.ynab_session = YNABSession('token')
+        self.ynab_session.session.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_refresh_and_reopen(self):
+        """
+        This tests a full load, reopening without requests and a delta refresh
+        :return: nothing
+        """
+        self.ynab_session.session = FakeSession(
+            FakeResponse(200, {"data": {"server_knowledge": 3, "budget": {
+                "id": "b1", "name": "Testing", "currency_format": {"iso_code": "EUR"},
+                "accounts": [{"id": "a1", "name": "Bank", "deleted": False}],
+                "months": [{"month": "2018-03-01", "deleted": False, "categories": [
+                    {"id": "c1", "budgeted": 10}, {"id": "c2", "budgeted": 20}]}],
+                "transactions": [{"id": "t1", "amount": 1000, "deleted": False},
+                                 {"id": "t2", "amount": 2000, "deleted": False}]}}}),
+            FakeResponse(200, {"data": {"server_knowledge": 4, "budget": {
+                "id": "b1", "name": "Testing", "currency_format": {"iso_code": "EUR"},
+                "months": [{"month": "2018-03-01", "deleted": False, "categories": [
+                    {"id": "c2", "budgeted": 25}]}],
+                "transactions": [{"id": "t2", "amount": 2000, "deleted": True}]}}}),
+            FakeResponse(404, {"error": {"id": "404.2", "name": "not_found", "detail": "x"}}))
+        with BudgetReplica(self.ynab_session, 'b1', self.filename) as replica:
+            self.assertIsNone(replica.server_knowledge())
+            replica.refresh()
+            self.assertEqual(replica.server_knowledge(), 3)
+        with BudgetReplica(self.ynab_session, 'b1', self.filename) as replica:
+            self.assertEqual(len(self.ynab_session.session.requests), 1)
+            self.assertEqual(replica.get_info().currency_format.iso_code, 'EUR')
+            self.assertEqual(replica.get('accounts', 'a1').name, 'Bank')
+            self.assertEqual(replica.get('months', '2018-03-01').month, '2018-03-01')
+            self.assertEqual(len(replica.get('transactions')), 2)
+            replica.refresh()
+            self.assertTrue(self.ynab_session.session.requests[1][1].endswith(
+                "budgets/b1?last_knowledge_of_server=3"))
+            self.assertEqual([t.id for t in replica.get('transactions')], ['t1'])
+            self.assertEqual(replica.server_knowledge('transactions'), 4)
+            self.assertEqual([(c.id, c.budgeted)
+                              for c in replica.get('months', '2018-03-01').categories],
+                             [('c1', 10), ('c2', 25)])
+            self.assertRaisesRegex(Exception, "budget not found", replica.refresh)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the response_cache module
+"""
+
+import os
+import tempfile
+import unittest
+from pynab.response_cache import CacheEntry, DiskCacheBackend, MemoryCacheBackend, \
+    ResponseCache, cache_key, endpoint_of
+from pynab.ynap_api import YNABSession
+from test_ynap_api import FakeResponse, FakeSession
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Test class for response_cache.py
+    """
+
+    def test_endpoint_of(self):
+        """
+        This tests the endpoint names derived from urls
+        :return: nothing
+        """
+        self.assertEqual(endpoint_of('budgets'), 'budgets')
+        self.assertEqual(endpoint_of('budgets/b1'), 'budget')
+        self.assertEqual(endpoint_of('budgets/b1/payees?x=1'), 'payees')
+        self.assertEqual(endpoint_of('budgets/b1/payees/p1'), 'payees')
+        self.assertEqual(endpoint_of('budgets/b1/accounts/a1/transactions'), 'transactions')
+
+    def test_backends(self):
+        """
+        This tests LRU eviction by size for both backends
+        :return: nothing
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in (MemoryCacheBackend(max_bytes=10),
+                            DiskCacheBackend(os.path.join(directory, 'cache.sqlite'),
+                                             max_bytes=10)):
+                backend.set('a', CacheEntry(b'1234', None, None, 0))
+                backend.set('b', CacheEntry(b'1234', 'etag', None, 0))
+                self.assertEqual(backend.get('a').content, b'1234')
+                backend.set('c', CacheEntry(b'1234', None, None, 0))
+                self.assertIsNone(backend.get('b'))
+                self.assertIsNotNone(backend.get('a'))
+                backend.delete_prefix('')
+                self.assertIsNone(backend.get('a'))
+
+    def test_session_cache(self):
+        """
+        This tests fresh hits, revalidation and invalidation by writes
+        :return: nothing
+        """
+        payees = {"data": {"payees": [{"id": "p1", "name": "Shop"}]}}
+        ynab_session = YNABSession('token', response_cache=ResponseCache(ttls={'payees': 300}))
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(
+            FakeResponse(200, payees, {'ETag': '"v1"'}),
+            FakeResponse(201, {"data": {"transaction": {"id": "t1"}}}),
+            FakeResponse(200, payees, {'ETag': '"v2"'}),
+            FakeResponse(304, {}))
+        ynab_session.get_payees('b1')
+        self.assertEqual(ynab_session.get_payees('b1')[0].name, 'Shop')
+        self.assertEqual(len(ynab_session.session.requests), 1)
+        ynab_session.post_transaction('b1', {"transaction": {"payee_name": "New"}})
+        ynab_session.get_payees('b1')
+        self.assertEqual(len(ynab_session.session.requests), 3)
+        ynab_session.response_cache.ttls['payees'] = 0
+        key = cache_key('budgets/b1/payees', 'Bearer token')
+        ynab_session.response_cache.revalidated(
+            'budgets/b1/payees', ynab_session.response_cache.backend.get(key), 'Bearer token')
+        self.assertEqual(ynab_session.get_payees('b1')[0].id, 'p1')
+        self.assertEqual(ynab_session.session.requests[3][2]['headers'],
+                         {'If-None-Match': '"v2"'})
+
+    def test_shared_cache(self):
+        """
+        This tests that sessions of two tokens sharing a disk cache never see each other's
+        responses while writes still invalidate the budget for both
+        :return: nothing
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            backend = DiskCacheBackend(os.path.join(directory, 'cache.sqlite'))
+            sessions = []
+            for token in ('alice', 'bob'):
+                ynab_session = YNABSession(token, response_cache=ResponseCache(backend))
+                ynab_session.session.close()
+                ynab_session.session = FakeSession(
+                    FakeResponse(200, {"data": {"user": {"id": token}}}, {'ETag': token}),
+                    FakeResponse(200, {"data": {"payees": [{"id": token}]}}),
+                    FakeResponse(201, {"data": {"transaction": {"id": "t1"}}}))
+                sessions.append(ynab_session)
+            for ynab_session, token in zip(sessions, ('alice', 'bob')):
+                self.assertEqual(ynab_session.get_user().id, token)
+                self.assertEqual(ynab_session.get_user().id, token)
+                self.assertEqual(ynab_session.get_payees('b1')[0].id, token)
+                self.assertEqual(len(ynab_session.session.requests), 2)
+            sessions[0].post_transaction('b1', {"transaction": {"payee_name": "New"}})
+            self.assertIsNone(backend.get(cache_key('budgets/b1/payees', 'Bearer bob')))
+            self.assertIsNotNone(backend.get(cache_key('user', 'Bearer bob')))
+
+
+if __name__ == '__main__':
+    unittest.main()
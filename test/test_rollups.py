@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the rollups module (offline, no API token needed)
+"""
+
+import unittest
+from pynab.models import build_model
+from pynab.rollups import BudgetRollups, CategoryTotals
+from pynab.sync import LocalBudget
+
+
+def budget(months=(), transactions=()):
+    """
+    builds a budget export object
+    """
+    return build_model({"id": "b1", "months": list(months), "transactions": list(transactions)},
+                       'budget')
+
+
+def transaction(transaction_id, date, amount, account_id='a1', deleted=False):
+    """
+    builds transaction json data
+    """
+    return {"id": transaction_id, "date": date, "amount": amount, "account_id": account_id,
+            "deleted": deleted}
+
+
+class TestRollups(unittest.TestCase):
+    """
+    Test class for rollups.py
+    """
+
+    def test_incremental(self):
+        """
+        This tests building the rollups and maintaining them from sync deltas
+        :return: nothing
+        """
+        local_budget = LocalBudget('b1')
+        local_budget.merge(budget(
+            [{"month": "2018-01-01", "categories": [
+                {"id": "c1", "budgeted": 5000, "activity": -1000, "balance": 4000,
+                 "deleted": False}]}],
+            [transaction('t1', '2018-01-05', -1000), transaction('t2', '2018-02-03', 3000)]), 1)
+        rollups = BudgetRollups(local_budget)
+        self.assertEqual(rollups.month_totals('2018-01-01'),
+                         {'c1': CategoryTotals(5000, -1000, 4000)})
+        self.assertEqual(rollups.account_running_balances('a1'),
+                         [('2018-01-01', -1000), ('2018-02-01', 2000)])
+        changes = local_budget.merge(budget(
+            [{"month": "2018-02-01", "categories": [
+                {"id": "c1", "budgeted": 0, "activity": -500, "balance": 3500,
+                 "deleted": False}]}],
+            [transaction('t1', '2018-02-05', -1500), transaction('t2', '', 0, deleted=True),
+             transaction('t3', '2018-01-10', 200, account_id='a2')]), 2)
+        rollups.apply(changes)
+        self.assertEqual(rollups.months(), ['2018-01-01', '2018-02-01'])
+        self.assertEqual(rollups.category_totals('c1')[1],
+                         ('2018-02-01', CategoryTotals(0, -500, 3500)))
+        self.assertEqual(rollups.account_running_balances('a1'), [('2018-02-01', -1500)])
+        self.assertEqual(rollups.account_balance('a1'), -1500)
+        self.assertEqual(rollups.account_balance('a2'), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
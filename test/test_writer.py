@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the writer module
+"""
+
+import unittest
+from pynab.pynab import YNAB
+from test_ynap_api import FakeResponse, FakeSession
+
+
+def _transaction(import_id):
+    """
+    builds a transaction json object
+    :param import_id: the import id
+    :return: object from build_transaction_json
+    """
+    return YNAB.build_transaction_json('a1', '2018-03-31', 1000, None, 'Shop', None, None,
+                                       'cleared', False, None, import_id)
+
+
+def _saved(*transactions, duplicates=()):
+    """
+    builds the data of a response to a post of several transactions
+    :param transactions: (id, import id) tuples of the created transactions
+    :param duplicates: import ids skipped as duplicates
+    :return: json data
+    """
+    return {"transaction_ids": [transaction_id for transaction_id, _ in transactions],
+            "transactions": [{"id": transaction_id, "import_id": import_id}
+                             for transaction_id, import_id in transactions],
+            "duplicate_import_ids": list(duplicates)}
+
+
+class TestTransactionWriter(unittest.TestCase):
+    """
+    Test class for writer.py
+    """
+
+    def setUp(self):
+        self.ynab_session = YNAB('token')
+        self.ynab_session.session.close()
+
+    def test_size_threshold_and_exit(self):
+        """
+        This tests flushing on max_batch, on exit and the per transaction futures
+        :return: nothing
+        """
+        self.ynab_session.session = FakeSession(
+            FakeResponse(201, {"data": _saved(("t2", "i2"), ("t3", "i3"), duplicates=["i1"])}),
+            FakeResponse(201, {"data": _saved(("t4", "i4"))}))
+        with self.ynab_session.transaction_writer('b1', max_batch=3, max_delay=60) as writer:
+            first = writer.submit(_transaction('i1'))
+            third = writer.submit(_transaction('i3'))
+            second = writer.submit(_transaction('i2'))
+            self.assertIsNone(first.result(timeout=5))
+            self.assertEqual(second.result(timeout=5), 't2')
+            self.assertEqual(third.result(timeout=5), 't3')
+            fourth = writer.submit(_transaction('i4'))
+        self.assertEqual(fourth.result(timeout=0), 't4')
+        self.assertEqual([len(kwargs['json']['transactions'])
+                          for _, _, kwargs in self.ynab_session.session.requests], [3, 1])
+
+    def test_generated_import_id(self):
+        """
+        This tests that transactions without import_id get one without changing the caller's
+        object
+        :return: nothing
+        """
+        transaction = _transaction(None)
+        self.ynab_session.session = FakeSession(
+            FakeResponse(201, {"data": _saved(("t1", "generated"))}))
+        with self.ynab_session.transaction_writer('b1', max_delay=60) as writer:
+            future = writer.submit(transaction)
+        sent = self.ynab_session.session.requests[0][2]['json']['transactions'][0]
+        self.assertIsNone(transaction['transaction']['import_id'])
+        self.assertEqual(len(sent['import_id']), 36)
+        # the fake server did not echo the generated import_id, so nothing was matched
+        self.assertIsNone(future.result(timeout=0))
+
+    def test_max_pending(self):
+        """
+        This tests that submit blocks while max_pending transactions are waiting
+        :return: nothing
+        """
+        self.ynab_session.session = FakeSession(
+            FakeResponse(201, {"data": _saved(("t1", "i1"))}),
+            FakeResponse(201, {"data": _saved(("t2", "i2"))}))
+        with self.ynab_session.transaction_writer('b1', max_batch=100, max_delay=0.05,
+                                                  max_pending=1) as writer:
+            first = writer.submit(_transaction('i1'))
+            second = writer.submit(_transaction('i2'))
+            self.assertEqual(first.result(timeout=5), 't1')
+        self.assertEqual(second.result(timeout=0), 't2')
+        self.assertEqual([len(kwargs['json']['transactions'])
+                          for _, _, kwargs in self.ynab_session.session.requests], [1, 1])
+
+    def test_time_threshold_and_errors(self):
+        """
+        This tests flushing after max_delay and failing futures
+        :return: nothing
+        """
+        self.ynab_session.session = FakeSession(
+            FakeResponse(400, {"error": {"id": "400", "name": "bad_request", "detail": "x"}}))
+        with self.ynab_session.transaction_writer('b1', max_batch=100, max_delay=0.05) as writer:
+            future = writer.submit(_transaction(None))
+            self.assertIn('bad_request', str(future.exception(timeout=5)))
+        self.assertRaises(Exception, writer.submit, _transaction(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the ynab_async module against a local aiohttp server
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pynab.rate_limit import RateLimiter
+from pynab.ynab_async import AsyncYNABSession, BUDGET_ENTITY_CALLS
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+# key of the list returned by every entity endpoint
+_LIST_KEYS = {'categories': 'category_groups'}
+
+# error body of a rejected write
+_ERROR_422 = {"error": {"id": "422", "name": "unprocessable_entity", "detail": "rejected"}}
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class TestAsyncYNABSession(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for ynab_async.py
+    """
+
+    async def asyncSetUp(self):
+        self.delay = 0.2
+
+        async def entities(request):
+            await asyncio.sleep(self.delay)
+            name = request.match_info['entity']
+            return web.json_response({"data": {_LIST_KEYS.get(name, name): [{"id": name}],
+                                               "server_knowledge": 1}})
+
+        async def transaction(request):
+            body = await request.json()
+            if body["transaction"].get("import_id") == "dup":
+                return web.json_response(_ERROR_422, status=422)
+            return web.json_response({"data": {"transaction": body["transaction"]}}, status=201)
+
+        async def rejected(request):
+            return web.json_response(_ERROR_422, status=422)
+
+        app = web.Application()
+        app.router.add_get('/v1/budgets/{budget_id}/{entity}', entities)
+        app.router.add_post('/v1/budgets/{budget_id}/transactions', transaction)
+        app.router.add_put('/v1/budgets/{budget_id}/transactions/{transaction_id}', rejected)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+        self.ynab_session = AsyncYNABSession('token')
+        self.ynab_session.base_url = "http://127.0.0.1:%d/v1/" % port
+
+    async def asyncTearDown(self):
+        await self.ynab_session.close()
+        await self.runner.cleanup()
+
+    async def test_get_budget_entities(self):
+        """
+        This tests that all entity collections are fetched concurrently
+        :return: nothing
+        """
+        start = time.monotonic()
+        entities = await self.ynab_session.get_budget_entities('b1')
+        elapsed = time.monotonic() - start
+        self.assertEqual(sorted(entities), sorted(BUDGET_ENTITY_CALLS))
+        self.assertEqual(entities['payees'][0].id, 'payees')
+        self.assertLess(elapsed, self.delay * len(BUDGET_ENTITY_CALLS) / 2)
+
+    async def test_post_transaction_and_delta(self):
+        """
+        This tests posting a transaction and a delta list request
+        :return: nothing
+        """
+        result = await self.ynab_session.post_transaction('b1', {"transaction": {"id": "t1"}})
+        self.assertEqual(result.id, 't1')
+        accounts, server_knowledge = await self.ynab_session.get_accounts('b1', None, 0)
+        self.assertEqual(accounts[0].id, 'accounts')
+        self.assertEqual(server_knowledge, 1)
+
+    async def test_unprocessable(self):
+        """
+        This tests that 422 means a duplicate only for posts and fails a put
+        :return: nothing
+        """
+        self.assertIsNone(await self.ynab_session.post_transaction(
+            'b1', {"transaction": {"import_id": "dup"}}))
+        with self.assertRaises(Exception) as context:
+            await self.ynab_session.put_transaction('b1', 't1', {"transaction": {"id": "t1"}})
+        self.assertIn('unprocessable_entity', str(context.exception))
+
+    async def test_file_rate_limiter(self):
+        """
+        This tests that a rate limiter with state file is used outside the event loop thread
+        :return: nothing
+        """
+        threads = []
+        with tempfile.TemporaryDirectory() as directory:
+            limiter = RateLimiter(state_file=os.path.join(directory, 'state.json'))
+            try_acquire = limiter.try_acquire
+
+            def recording_try_acquire():
+                threads.append(threading.current_thread())
+                return try_acquire()
+
+            limiter.try_acquire = recording_try_acquire
+            self.ynab_session.rate_limiter = limiter
+            accounts = await self.ynab_session.get_accounts('b1')
+            self.assertEqual(accounts[0].id, 'accounts')
+            self.assertEqual(limiter.remaining, 199)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
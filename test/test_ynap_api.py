@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+"""
+This module tests the ynap_api module offline against canned responses
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import unittest
+import requests
+from pynab.models import LazyModel
+from pynab.retry import RetryPolicy
+from pynab.ynap_api import YNABSession, BulkPostError, JSON_BACKENDS
+
+
+class FakeResponse(object):
+    """
+    Minimal stand-in for requests.Response
+    """
+
+    def __init__(self, status_code, data, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode('utf-8')
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        """
+        yields the body in chunks
+        """
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        """
+        nothing to close
+        """
+
+
+class FakeSession(object):
+    """
+    Minimal stand-in for requests.Session returning queued responses
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.headers = {}
+
+    def request(self, method, url, **kwargs):
+        """
+        records the request and returns the next queued response
+        """
+        with self.lock:
+            self.requests.append((method, url, kwargs))
+            response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def get(self, url, **kwargs):
+        """
+        GET shortcut
+        """
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        POST shortcut
+        """
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        """
+        PUT shortcut
+        """
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        """
+        PATCH shortcut
+        """
+        return self.request('PATCH', url, **kwargs)
+
+    def close(self):
+        """
+        nothing to close
+        """
+
+
+class _BulkHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of BulkServer
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """
+        keeps the test output clean
+        """
+
+    def _read_body(self):
+        """
+        reads the request body, sent with Content-Length or chunked transfer encoding
+        """
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        parts = []
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            if not size:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        answers a bulk post, skipping known import ids
+        """
+        transactions = json.loads(self._read_body())['transactions']
+        body = json.dumps({"data": {"bulk": self.server.bulk.create(transactions)}})
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+
+class BulkServer(object):
+    """
+    Minimal local HTTP server answering bulk posts, for tests which need a real connection
+    """
+
+    def __init__(self):
+        self.import_ids = set()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _BulkHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.bulk = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """
+        base url to be used instead of the YNAB one
+        """
+        return "http://127.0.0.1:%d/v1/" % self.httpd.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def create(self, transactions):
+        """
+        creates transactions, skipping known import ids
+        :return: dictionary like the data of a bulk response
+        """
+        transaction_ids = []
+        duplicate_import_ids = []
+        with self.lock:
+            for transaction in transactions:
+                if transaction['import_id'] in self.import_ids:
+                    duplicate_import_ids.append(transaction['import_id'])
+                    continue
+                self.import_ids.add(transaction['import_id'])
+                self.created += 1
+                transaction_ids.append("t%d" % self.created)
+        return {"transaction_ids": transaction_ids, "duplicate_import_ids": duplicate_import_ids}
+
+
+class TestYNABSession(unittest.TestCase):
+    """
+    Test class for ynap_api.py
+    """
+
+    def _session(self, *responses, **kwargs):
+        """
+        creates a YNABSession talking to a FakeSession
+        :param responses: the responses to be returned in order
+        :return: the YNABSession
+        """
+        ynab_session = YNABSession('token', **kwargs)
+        ynab_session.session.close()
+        ynab_session.session = FakeSession(*responses)
+        return ynab_session
+
+    def test_json_backends(self):
+        """
+        This tests the selection of the json backend
+        :return: nothing
+        """
+        self.assertIn(YNABSession('token').json_backend, JSON_BACKENDS)
+        self.assertEqual(YNABSession('token', json_backend='json').json_backend, 'json')
+        self.assertRaises(Exception, YNABSession, 'token', json_backend='yaml')
+
+    def test_get_with_alternative_key(self):
+        """
+        This tests decoding of data.<key> and data.<key2alt> from a single response
+        :return: nothing
+        """
+        ynab_session = self._session(FakeResponse(200, {"data": {
+            "budget": {"id": "b1", "accounts": [{"id": "a1", "name": "Bank"}]},
+            "server_knowledge": 42}}))
+        budget, server_knowledge = ynab_session.get_budgets('b1')
+        self.assertNotIsInstance(budget, LazyModel)
+        self.assertEqual(budget.accounts[0].name, 'Bank')
+        self.assertEqual(server_knowledge, 42)
+
+    def test_delta_request(self):
+        """
+        This tests that last_knowledge_of_server is sent and server_knowledge returned
+        :return: nothing
+        """
+        ynab_session = self._session(
+            FakeResponse(200, {"data": {"transactions": [{"id": "t1"}], "server_knowledge": 7}}),
+            FakeResponse(200, {"data": {"budget": {"id": "b1"}, "server_knowledge": 8}}))
+        transactions, server_knowledge = ynab_session.get_transactions(
+            'b1', since_date='2018-01-01', last_knowledge_of_server=5)
+        self.assertEqual(transactions[0].id, 't1')
+        self.assertEqual(server_knowledge, 7)
+        self.assertTrue(ynab_session.session.requests[0][1].endswith(
+            "budgets/b1/transactions?since_date=2018-01-01&last_knowledge_of_server=5"))
+        budget, server_knowledge = ynab_session.get_budgets('b1', 7, lazy=True)
+        self.assertIsInstance(budget, LazyModel)
+        self.assertEqual(budget.id, 'b1')
+        self.assertEqual(server_knowledge, 8)
+        self.assertTrue(ynab_session.session.requests[1][1].endswith(
+            "budgets/b1?last_knowledge_of_server=7"))
+
+    def test_bulk_chunks(self):
+        """
+        This tests splitting of bulk posts, retrying of single chunks and merging of results
+        :return: nothing
+        """
+        error = FakeResponse(500, {"error": {"id": "500", "name": "internal", "detail": "boom"}})
+
+        def bulk(ids, duplicates):
+            return FakeResponse(201, {"data": {"bulk": {"transaction_ids": ids,
+                                                        "duplicate_import_ids": duplicates}}})
+
+        ynab_session = self._session(bulk(['t1', 't2'], []),
+                                     error, bulk(['t3'], ['i4']),
+                                     error, error, error,
+                                     bulk_chunk_size=2, bulk_workers=1, bulk_retries=2)
+        transactions = {"transactions": [{"import_id": "i%d" % i} for i in range(5)]}
+        with self.assertRaises(BulkPostError) as context:
+            ynab_session.post_transaction_bulk('b1', transactions)
+        self.assertEqual(context.exception.result.transaction_ids, ['t1', 't2', 't3'])
+        self.assertEqual(context.exception.result.duplicate_import_ids, ['i4'])
+        self.assertEqual(context.exception.failed[0][0], [{"import_id": "i4"}])
+        sent = [kwargs['json']['transactions'] for _, _, kwargs in ynab_session.session.requests]
+        self.assertEqual([len(chunk) for chunk in sent], [2, 2, 2, 1, 1, 1])
+
+    def test_bulk_chunks_not_retried(self):
+        """
+        This tests that chunks failing with a client error are not sent again
+        :return: nothing
+        """
+        def error(status):
+            return FakeResponse(status, {"error": {"id": str(status), "name": "x", "detail": "x"}})
+
+        ynab_session = self._session(error(400), error(401), error(404),
+                                     bulk_chunk_size=1, bulk_workers=1, bulk_retries=2)
+        transactions = {"transactions": [{"import_id": "i%d" % i} for i in range(3)]}
+        with self.assertRaises(BulkPostError) as context:
+            ynab_session.post_transaction_bulk('b1', transactions)
+        self.assertEqual(len(context.exception.failed), 3)
+        self.assertEqual(len(ynab_session.session.requests), 3)
+
+    def test_retry(self):
+        """
+        This tests retrying of transient failures and the replay protection for POST
+        :return: nothing
+        """
+        waits = []
+        unavailable = FakeResponse(503, {"error": {"id": "503", "name": "x", "detail": "x"}},
+                                   {'Retry-After': '7'})
+        user = FakeResponse(200, {"data": {"user": {"id": "u1"}}})
+        created = FakeResponse(201, {"data": {"transaction": {"id": "t1"}}})
+        ynab_session = self._session(requests.exceptions.ConnectionError(), unavailable, user,
+                                     unavailable,
+                                     requests.exceptions.ConnectTimeout(), unavailable, created,
+                                     retry_policy=RetryPolicy(sleep=waits.append))
+        self.assertEqual(ynab_session.get_user().id, 'u1')
+        self.assertEqual(waits[1], 7.0)
+        self.assertEqual(ynab_session.session.requests[0][2]['timeout'], (10.0, 60.0))
+        # without import_id a 503 on POST is not replayed
+        self.assertRaises(Exception, ynab_session.post_transaction, 'b1',
+                          {"transaction": {"import_id": None}})
+        # a connect timeout never reached YNAB and a POST with import_id is replay safe
+        self.assertEqual(ynab_session.post_transaction(
+            'b1', {"transaction": {"import_id": "YNAB:1000:2018-03-31:1"}}).id, 't1')
+        self.assertEqual(len(waits), 4)
+
+    def test_iter_transactions(self):
+        """
+        This tests incremental decoding of the transactions array
+        :return: nothing
+        """
+        transactions = [{"id": "t%d" % i, "amount": -i, "memo": "\"transactions\": [\u00e4",
+                         "subtransactions": [{"id": "s%d" % i, "amount": 1.5}]}
+                        for i in range(50)]
+        ynab_session = self._session(FakeResponse(200, {"data": {
+            "transactions": transactions, "server_knowledge": 9}}))
+        ynab_session.session.responses[0].iter_content = \
+            lambda chunk_size, content=ynab_session.session.responses[0].content: \
+            (content[start:start + 7] for start in range(0, len(content), 7))
+        result = list(ynab_session.iter_transactions('b1', since_date='2018-01-01'))
+        self.assertEqual([t.id for t in result], ["t%d" % i for i in range(50)])
+        self.assertEqual(result[3].subtransactions[0].amount, 1.5)
+        self.assertEqual(result[3].memo, '"transactions": [\u00e4')
+        self.assertTrue(ynab_session.session.requests[0][2]['stream'])
+
+    def test_error(self):
+        """
+        This tests that errors are raised with the YNAB error information
+        :return: nothing
+        """
+        ynab_session = self._session(FakeResponse(401, {"error": {
+            "id": "401", "name": "unauthorized", "detail": "Unauthorized"}}))
+        self.assertRaises(Exception, ynab_session.get_user)
+
+    def test_connection_pool(self):
+        """
+        This tests the pool configuration and the deterministic close
+        :return: nothing
+        """
+        with YNABSession('token', bulk_workers=16) as ynab_session:
+            adapter = ynab_session.session.get_adapter(ynab_session.base_url)
+            self.assertEqual(adapter._pool_maxsize, 16)
+            self.assertTrue(adapter._pool_block)
+            closed = []
+            ynab_session.session.close = lambda: closed.append(True)
+        self.assertEqual(closed, [True])
+        ynab_session = YNABSession('token', pool_maxsize=3, pool_block=False)
+        adapter = ynab_session.session.get_adapter(ynab_session.base_url)
+        self.assertEqual((adapter._pool_maxsize, adapter._pool_block), (3, False))
+        ynab_session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()